@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ContactMessage
+from .models import ContactMessage, CrawledURL, Job, OutboundEmail, URLCheck
 
 # Register your models here.
 
@@ -8,3 +8,30 @@ class ContactMessageAdmin(admin.ModelAdmin):
     list_display = ('name', 'email', 'subject', 'submitted_at')
     search_fields = ('name', 'email', 'subject', 'message')
     list_filter = ('submitted_at',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'progress', 'total', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('result',)
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'last_error')
+
+
+@admin.register(CrawledURL)
+class CrawledURLAdmin(admin.ModelAdmin):
+    list_display = ('url', 'host', 'last_status_code', 'last_checked_at')
+    search_fields = ('url',)
+
+
+@admin.register(URLCheck)
+class URLCheckAdmin(admin.ModelAdmin):
+    list_display = ('url', 'checked_at', 'final_status_code', 'status_changed', 'seo_changed', 'redirect_changed')
+    list_filter = ('source', 'status_changed', 'seo_changed', 'redirect_changed')
+    raw_id_fields = ('url', 'chain')
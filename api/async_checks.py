@@ -0,0 +1,143 @@
+"""Async versions of the outbound checks, for the views in ``async_views``.
+
+``check_url_async`` drives the same ``check_steps`` as ``check_url``, and
+``fetch_robots_async`` goes through the same ``RobotsFetchCache``, so results
+and cache entries are identical whichever server answered; only the I/O is
+done on the event loop with ``async_http_client``. Cache backends other than
+the in-process one may block (a database cache, say), so they are called in
+a worker thread.
+"""
+import asyncio
+from time import perf_counter
+
+import aiohttp
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import async_http_client, metrics
+from .cache_backends import MemoryCacheBackend
+from .fetch_cache import CACHE_BYPASS, conditional_headers, get_fetch_cache
+from .robots_cache import get_robots_fetch_cache
+from .sitemap_checker import STATUS_ERROR, STATUS_TIMEOUT
+from .url_checker import (
+    CLOSE, DEFAULT_USER_AGENT, DRAIN, FETCH, MAX_DRAIN_BYTES, READ,
+    cached_hit, check_steps, finish_check,
+)
+
+
+async def call_cache(cache, func, *args):
+    if isinstance(cache.backend, MemoryCacheBackend):
+        return func(*args)
+    return await sync_to_async(func)(*args)
+
+
+async def drain(response, timings):
+    start = perf_counter()
+    read = 0
+    try:
+        async for chunk in response.iter_content(16 * 1024):
+            read += len(chunk)
+            if read > MAX_DRAIN_BYTES:
+                break
+    finally:
+        response.close()
+    timings['download'] = perf_counter() - start
+
+
+async def read_body(response, timings, reader):
+    start = perf_counter()
+    try:
+        if not reader.done:
+            async for chunk in response.iter_content(settings.FETCH_CHUNK_SIZE):
+                if not reader.feed(chunk):
+                    break
+    finally:
+        response.close()
+    timings['download'] = perf_counter() - start - reader.parse_time
+
+
+async def run_steps(steps):
+    """Drive ``check_steps`` with the event loop's async client."""
+    outcome = None
+    response = None
+    try:
+        while True:
+            action, argument = steps.send(outcome)
+            outcome = None
+            if action == FETCH:
+                target_url, headers = argument
+                response = await async_http_client.stream('GET', target_url, headers=headers)
+                outcome = response, response.timings
+            elif action == DRAIN:
+                await drain(*argument)
+            elif action == READ:
+                await read_body(*argument)
+            elif action == CLOSE:
+                argument.close()
+    except StopIteration as stop:
+        return stop.value
+    except BaseException:
+        if response is not None:
+            response.close()
+        raise
+
+
+async def check_url_async(url, user_agent=None, use_cache=True):
+    """``check_url`` for async views; same result dict and fetch cache."""
+    user_agent = user_agent or DEFAULT_USER_AGENT
+    cache = get_fetch_cache() if use_cache else None
+    cached_entry = None
+    if cache is not None:
+        cached_entry, is_fresh = await call_cache(cache, cache.get, url, user_agent)
+        if is_fresh:
+            return cached_hit(cached_entry)
+
+    with metrics.CHECKS_IN_PROGRESS.track_inprogress():
+        outcome = await run_steps(check_steps(url, user_agent, cached_entry))
+    if cache is None:
+        return finish_check(cache, url, user_agent, cached_entry, *outcome)
+    return await call_cache(cache, finish_check, cache, url, user_agent, cached_entry, *outcome)
+
+
+async def fetch_robots_async(url, use_cache=True):
+    """``robots_cache.fetch_robots`` for async views."""
+    cache = get_robots_fetch_cache() if use_cache else None
+    if cache is None:
+        response = await async_http_client.get(url)
+        return {'status_code': response.status_code, 'content': response.text, 'cache_status': CACHE_BYPASS}
+    entry, result = await call_cache(cache, cache.lookup, url)
+    if result is not None:
+        return result
+    headers = conditional_headers(entry) if entry is not None else {}
+    response = await async_http_client.get(url, headers=headers)
+    return await call_cache(cache, cache.update, url, entry, response)
+
+
+async def check_sitemap_async(url, timeout):
+    try:
+        return (await async_http_client.head(url, timeout=timeout)).status_code
+    except asyncio.TimeoutError:
+        return STATUS_TIMEOUT
+    except Exception:
+        return STATUS_ERROR
+
+
+async def check_sitemaps_async(urls, concurrency=None, timeout=None, deadline=None):
+    """``sitemap_checker.check_sitemaps`` on the event loop instead of a thread pool."""
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return []
+    semaphore = asyncio.Semaphore(concurrency or settings.SITEMAP_CHECK_CONCURRENCY)
+    timeout = timeout or aiohttp.ClientTimeout(sock_connect=settings.HTTP_CONNECT_TIMEOUT,
+                                               sock_read=settings.SITEMAP_CHECK_TIMEOUT)
+
+    async def check(url):
+        async with semaphore:
+            return await check_sitemap_async(url, timeout)
+
+    tasks = {asyncio.ensure_future(check(url)): url for url in urls}
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    statuses = {tasks[task]: task.result() for task in done}
+    return [{'url': url, 'status': statuses.get(url, STATUS_TIMEOUT)} for url in urls]
@@ -0,0 +1,131 @@
+"""Shared outbound HTTP client for the async views.
+
+The aiohttp counterpart of ``http_client``: one ``ClientSession`` per event
+loop, so everything served by an ASGI worker shares one connection pool,
+with the same timeouts and the same no-cookies policy as the blocking
+session. Responses are wrapped in ``Response``, which has the attributes of
+a ``requests.Response`` that the shared checking code reads.
+
+Streamed responses carry the same ``timings`` as ``fetch_timing`` records
+for the blocking client, from aiohttp's request tracing. aiohttp connects
+and handshakes in one step, so ``connect`` includes TLS and ``tls`` is None.
+"""
+import asyncio
+from time import perf_counter
+import weakref
+
+import aiohttp
+from django.conf import settings
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# A ClientSession can only be used from the loop it was created on
+_sessions = weakref.WeakKeyDictionary()
+
+
+class Response:
+    def __init__(self, raw, text=None, timings=None):
+        self.raw = raw
+        self.status_code = raw.status
+        self.headers = raw.headers
+        self.text = text
+        self.timings = timings
+
+    @property
+    def is_redirect(self):
+        return self.status_code in REDIRECT_STATUSES and 'Location' in self.headers
+
+    def iter_content(self, chunk_size):
+        return self.raw.content.iter_chunked(chunk_size)
+
+    def close(self):
+        # Releasing a partly read response drops its connection instead of reusing it
+        self.raw.release()
+
+
+def build_trace_config():
+    """Fill the ``timings`` dict passed as ``trace_request_ctx``, if any."""
+    async def request_start(session, context, params):
+        if context.trace_request_ctx is not None:
+            context.ready = perf_counter()
+            context.trace_request_ctx.update(dns=0.0, connect=0.0, tls=None, reused=True)
+
+    async def dns_start(session, context, params):
+        context.dns_started = perf_counter()
+
+    async def dns_end(session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx['dns'] = perf_counter() - context.dns_started
+
+    async def connection_start(session, context, params):
+        context.connection_started = perf_counter()
+
+    async def connection_end(session, context, params):
+        timings = context.trace_request_ctx
+        if timings is not None:
+            context.ready = perf_counter()
+            timings['connect'] = context.ready - context.connection_started - timings['dns']
+            timings['reused'] = False
+
+    async def request_end(session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx['ttfb'] = perf_counter() - context.ready
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(request_start)
+    config.on_dns_resolvehost_start.append(dns_start)
+    config.on_dns_resolvehost_end.append(dns_end)
+    config.on_connection_create_start.append(connection_start)
+    config.on_connection_create_end.append(connection_end)
+    config.on_request_end.append(request_end)
+    return config
+
+
+def default_timeout():
+    return aiohttp.ClientTimeout(sock_connect=settings.HTTP_CONNECT_TIMEOUT, sock_read=settings.HTTP_READ_TIMEOUT)
+
+
+def build_session():
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=settings.ASYNC_HTTP_MAX_CONNECTIONS),
+        timeout=default_timeout(),
+        # Fetches are made on behalf of many unrelated users, so never carry
+        # cookies from one response into the next request.
+        cookie_jar=aiohttp.DummyCookieJar(),
+        trace_configs=[build_trace_config()],
+    )
+
+
+def get_session():
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = _sessions[loop] = build_session()
+    return session
+
+
+async def reset_session():
+    """Close the running loop's session and its pooled connections."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+async def stream(method, url, **kwargs):
+    """Send a request without reading the body; the caller must ``close()`` the response."""
+    kwargs.setdefault('allow_redirects', False)
+    timings = {}
+    raw = await get_session().request(method, url, trace_request_ctx=timings, **kwargs)
+    return Response(raw, timings=timings)
+
+
+async def get(url, **kwargs):
+    """GET ``url``, following redirects, with the body read into ``text``."""
+    async with get_session().get(url, **kwargs) as raw:
+        return Response(raw, await raw.text(errors='replace'))
+
+
+async def head(url, **kwargs):
+    kwargs.setdefault('allow_redirects', False)
+    async with get_session().head(url, **kwargs) as raw:
+        return Response(raw)
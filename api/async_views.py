@@ -0,0 +1,151 @@
+"""Async versions of the fetch-heavy endpoints, for ASGI workers.
+
+These are plain Django async views (DRF views are sync only) mounted under
+``async/``. They take the same input and return the same JSON as their sync
+counterparts, but wait for origins on the event loop, so one ASGI worker can
+hold hundreds of slow checks at once. Under WSGI they still work, but each
+request then runs on its own short-lived event loop, with its own session.
+
+aiohttp is imported on the first async request rather than with the URLconf,
+so WSGI workers and management commands don't pay for it.
+"""
+from functools import wraps
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from .crawl_history import record_results
+from .job_views import job_payload
+from .jobs import submit_job
+from .models import Job
+from .robots_views import analysis_payload, fetch_failure_payload, test_url_results
+from .serializers import RobotsTxtInputSerializer, TestURLSerializer
+from .url_checker import DEFAULT_USER_AGENT
+
+
+def request_data(request):
+    """The parsed body of a JSON or form request, like DRF's ``request.data``.
+
+    Raises ValueError unless a JSON body is an object.
+    """
+    if request.content_type == 'application/json':
+        data = json.loads(request.body or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError('The JSON body must be an object.')
+        return data
+    return request.POST
+
+
+def cpu_bound(func):
+    """``func`` as a coroutine function run in a worker thread, outside the thread that serves the ORM."""
+    return sync_to_async(func, thread_sensitive=False)
+
+
+def async_view(methods):
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                if not isinstance(request, ASGIRequest):
+                    from . import async_http_client
+                    # The request's event loop ends with it; so must its connections
+                    await async_http_client.reset_session()
+        return csrf_exempt(require_http_methods(methods)(wrapper))
+    return decorator
+
+
+def bad_request(errors):
+    return JsonResponse(errors, status=400)
+
+
+@async_view(['GET', 'POST'])
+async def check_url_status_async(request):
+    try:
+        data = request.GET if request.method == 'GET' else request_data(request)
+    except ValueError:
+        return bad_request({'error': 'Invalid JSON body.'})
+    url = data.get('url')
+    user_agent = data.get('user_agent') or request.META.get('HTTP_USER_AGENT', DEFAULT_USER_AGENT)
+    use_cache = str(data.get('no_cache')).lower() not in ('1', 'true', 'yes')
+    if not url:
+        return bad_request({'error': 'URL is required.'})
+    from .async_checks import check_url_async
+    try:
+        result = await check_url_async(url, user_agent, use_cache=use_cache)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    await sync_to_async(record_results)([result], 'check')
+    return JsonResponse(result)
+
+
+@async_view(['POST'])
+async def robots_analyze_async(request):
+    try:
+        serializer = RobotsTxtInputSerializer(data=request_data(request))
+    except ValueError:
+        return bad_request({'error': 'Invalid JSON body.'})
+    if not serializer.is_valid():
+        return bad_request(serializer.errors)
+    url = serializer.validated_data.get('url')
+    from .async_checks import check_sitemaps_async, fetch_robots_async
+
+    if url:
+        try:
+            fetched = await fetch_robots_async(url, use_cache=not serializer.validated_data['no_cache'])
+        except Exception as e:
+            return bad_request({'error': str(e)})
+        if fetched['status_code'] != 200:
+            return JsonResponse(fetch_failure_payload(fetched))
+        robots_content, fetch_status, cache_status = fetched['content'], fetched['status_code'], fetched['cache_status']
+    else:
+        robots_content, fetch_status, cache_status = serializer.validated_data.get('content'), None, None
+    # Parsing is CPU-bound: off the event loop, so the other requests of this worker keep going
+    data, sitemap_urls = await cpu_bound(analysis_payload)(robots_content, fetch_status, cache_status)
+    if sitemap_urls is None:
+        return JsonResponse(data)
+
+    mode = serializer.validated_data['sitemap_checks']
+    if mode == 'sync':
+        data['parsed_data']['sitemaps'] = await check_sitemaps_async(sitemap_urls, deadline=settings.SITEMAP_CHECK_DEADLINE)
+    elif mode == 'async' and sitemap_urls:
+        job = await sync_to_async(submit_job)(Job.KIND_SITEMAP_CHECK, params={'urls': sitemap_urls})
+        data['sitemap_job'] = job_payload(request, job)
+    return JsonResponse(data)
+
+
+@async_view(['POST'])
+async def robots_test_url_async(request):
+    try:
+        serializer = TestURLSerializer(data=request_data(request))
+    except ValueError:
+        return bad_request({'error': 'Invalid JSON body.'})
+    if not serializer.is_valid():
+        return bad_request(serializer.errors)
+    robots_url = serializer.validated_data.get('robots_url')
+    robots_content = serializer.validated_data.get('robots_content')
+    user_agents = serializer.validated_data.get('user_agents') or ['*']
+
+    cache_status = None
+    if robots_url:
+        from .async_checks import fetch_robots_async
+        try:
+            fetched = await fetch_robots_async(robots_url, use_cache=not serializer.validated_data['no_cache'])
+        except Exception as e:
+            return bad_request({'error': str(e)})
+        robots_content = fetched['content']
+        cache_status = fetched['cache_status']
+
+    if not robots_content:
+        return bad_request({'error': 'No robots.txt content provided.'})
+
+    # Matching every URL for every agent is CPU-bound: off the event loop
+    results = await cpu_bound(test_url_results)(robots_content, serializer.validated_data.get('test_urls'),
+                                                user_agents)
+    return JsonResponse({'results': results, 'cache_status': cache_status})
@@ -0,0 +1 @@
+"""Performance benchmarks for the api app, run through management commands."""
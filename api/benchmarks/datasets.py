@@ -0,0 +1,28 @@
+"""Synthetic inputs shaped like real crawl exports."""
+import random
+
+SECTIONS = ['products', 'category', 'blog', 'news', 'help', 'de', 'fr', 'account', 'search', 'tag']
+PARAMS = ['utm_source', 'utm_medium', 'page', 'sort', 'color', 'size', 'ref', 'q']
+
+
+def synthetic_crawl_rows(count, seed=0, host='https://www.example.com'):
+    """Yield ``(url, is_indexable)`` rows for a site with deep, parameter-heavy paths."""
+    rng = random.Random(seed)
+    for index in range(count):
+        depth = rng.choice((0, 1, 2, 2, 3, 3, 3, 4, 5))
+        segments = [rng.choice(SECTIONS)] + [
+            f'{rng.choice(SECTIONS)}-{rng.randint(0, 40)}' for _ in range(depth - 1)
+        ] if depth else []
+        url = f"{host}/{'/'.join(segments)}"
+        if rng.random() < 0.3:
+            url += '?' + '&'.join(
+                f'{rng.choice(PARAMS)}={rng.randint(0, 20)}' for _ in range(rng.randint(1, 3))
+            )
+        yield url, rng.random() > 0.15
+
+
+def write_crawl_csv(path, count, seed=0):
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        for url, indexable in synthetic_crawl_rows(count, seed):
+            handle.write(f'{url},{"true" if indexable else "false"}\n')
+    return path
@@ -0,0 +1,83 @@
+"""Compare the single-pass SEO extractor with the former BeautifulSoup path."""
+from pathlib import Path
+import random
+
+from ..seo_extractor import extract_seo_fields
+from .stats import summarize, time_calls
+
+
+def extract_with_beautifulsoup(html):
+    """The extraction ``check_url_status`` used to run on the full DOM."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    meta_title = soup.title.string.strip() if soup.title and soup.title.string else None
+    if not meta_title:
+        og_title = soup.find('meta', property='og:title')
+        meta_title = og_title.get('content', '').strip() if og_title else None
+
+    meta_description_tag = soup.find('meta', attrs={'name': 'description'})
+    meta_description = meta_description_tag.get('content', '').strip() if meta_description_tag else None
+    if not meta_description:
+        og_description = soup.find('meta', property='og:description')
+        meta_description = og_description.get('content', '').strip() if og_description else None
+
+    h1_tags = [h1.get_text(strip=True) for h1 in soup.find_all('h1')]
+    return {'meta_title': meta_title, 'meta_description': meta_description, 'h1_tags': h1_tags}
+
+
+def synthetic_page(size, seed=0):
+    """Build an HTML page of roughly ``size`` bytes shaped like a product listing."""
+    rng = random.Random(seed)
+    head = (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        '<title>Synthetic page %d</title>'
+        '<meta name="description" content="A generated page used for benchmarks.">'
+        '<meta property="og:title" content="Synthetic">'
+        '<link rel="canonical" href="https://example.com/page">'
+        '<link rel="alternate" hreflang="de" href="https://example.com/de/page">'
+        '<style>body{font-family:sans-serif}</style>'
+        '<script>window.dataLayer=[];</script>'
+        '</head><body><header><h1>Synthetic <span>page</span></h1></header><main>'
+    ) % seed
+    parts = [head]
+    length = len(head)
+    item = 0
+    while length < size:
+        host = 'example.com' if rng.random() < 0.8 else 'other.example.org'
+        block = (
+            '<div class="product" data-id="%d"><h2>Product %d</h2>'
+            '<p>Lorem ipsum dolor sit amet, <b>consectetur</b> adipiscing elit &amp; more.</p>'
+            '<a href="https://%s/p/%d">View</a> <a href="/cart?add=%d">Add</a></div>'
+        ) % (item, item, host, item, item)
+        parts.append(block)
+        length += len(block)
+        item += 1
+    parts.append('</main></body></html>')
+    return ''.join(parts)
+
+
+def load_pages(pages_dir=None, sizes=(50_000, 500_000, 2_000_000)):
+    if pages_dir:
+        return [(path.name, path.read_text(encoding='utf-8', errors='replace'))
+                for path in sorted(Path(pages_dir).glob('*.htm*'))]
+    return [(f'synthetic-{size}', synthetic_page(size, seed=index))
+            for index, size in enumerate(sizes)]
+
+
+def run(pages, repeat=3):
+    results = []
+    for name, html in pages:
+        bs_samples = time_calls(extract_with_beautifulsoup, [(html,)], repeat)
+        extractor_samples = time_calls(extract_seo_fields, [(html,)], repeat)
+        bs_summary = summarize(bs_samples)
+        extractor_summary = summarize(extractor_samples)
+        results.append({
+            'page': name,
+            'bytes': len(html.encode('utf-8')),
+            'beautifulsoup': bs_summary,
+            'extractor': extractor_summary,
+            'speedup': bs_summary['p50'] / extractor_summary['p50'] if extractor_summary['p50'] else None,
+        })
+    return results
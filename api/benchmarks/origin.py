@@ -0,0 +1,164 @@
+"""A local stand-in origin server for fetch benchmarks.
+
+``StandInOrigin`` serves on 127.0.0.1, one thread per connection, after a
+fixed delay per request, so a benchmark measures how the app handles
+origins rather than how fast a real site or the network is:
+
+- ``/robots.txt``: the ``robots`` text given to the origin, or a 404 page
+  when it is None.
+- ``/sitemap.xml``: a sitemap of ``sitemap_urls`` pages.
+- ``/redirect/<n>/<path>``: a chain of ``n`` 301s ending at ``/<path>``.
+- Anything else: an HTML page, of ``page_size`` bytes or of the ``size``
+  query parameter (a small fixed page by default).
+
+Pages and the robots.txt carry an ETag and are answered 304 when it matches
+If-None-Match.
+
+``connections``, ``requests`` and ``peak_in_flight`` count what it
+received, for tests of connection reuse and of how many fetches run at once.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+import zlib
+
+from .extraction import synthetic_page
+
+PAGE = (b'<html><head><title>Stand-in origin</title>'
+        b'<meta name="description" content="A page served after a fixed delay."></head>'
+        b'<body><h1>Stand-in origin</h1>' + b'<p>filler</p>' * 200 + b'</body></html>')
+
+
+class StandInOriginHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body, content_type, status=200, headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def send_validated(self, body, content_type):
+        etag = f'"{zlib.crc32(body):08x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_body(b'', content_type, status=304, headers=[('ETag', etag)])
+        else:
+            self.send_body(body, content_type, headers=[('ETag', etag)])
+
+    def handle(self):
+        self.server.count_connection()
+        super().handle()
+
+    def do_GET(self):
+        self.server.enter()
+        try:
+            self.respond()
+        finally:
+            self.server.leave()
+
+    def respond(self):
+        time.sleep(self.server.delay)
+        parts = urlsplit(self.path)
+        path = parts.path
+        if path == '/robots.txt' and self.server.robots is None:
+            self.send_body(b'<html><body>Not found</body></html>', 'text/html', status=404)
+        elif path == '/robots.txt':
+            self.send_validated(self.server.robots.encode('utf-8'), 'text/plain; charset=utf-8')
+        elif path == '/sitemap.xml':
+            self.send_body(self.server.sitemap(), 'application/xml')
+        elif path.startswith('/redirect/'):
+            hops, _, rest = path[len('/redirect/'):].partition('/')
+            hops = int(hops) if hops.isdigit() else 1
+            location = f'/redirect/{hops - 1}/{rest}' if hops > 1 else f'/{rest}'
+            if parts.query:
+                location += f'?{parts.query}'
+            self.send_body(b'', 'text/html', status=301, headers=[('Location', location)])
+        else:
+            size = parse_qs(parts.query).get('size', [None])[0]
+            self.send_validated(self.server.page(int(size) if size else None), 'text/html; charset=utf-8')
+
+    do_HEAD = do_GET
+
+
+class StandInOriginServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # Benchmarks open hundreds of connections at once
+
+    def __init__(self, address, delay, page_size, robots, sitemap_urls):
+        super().__init__(address, StandInOriginHandler)
+        self.delay = delay
+        self.page_size = page_size
+        self.robots = robots
+        self.sitemap_urls = sitemap_urls
+        self._pages = {}
+        self._sitemap = None
+        self.connections = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def enter(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def handle_error(self, request, client_address):
+        # Checks stop reading a large page at their byte budget and hang up
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def page(self, size=None):
+        size = size or self.page_size
+        if not size:
+            return PAGE
+        if size not in self._pages:
+            self._pages[size] = synthetic_page(size).encode('utf-8')
+        return self._pages[size]
+
+    def sitemap(self):
+        if self._sitemap is None:
+            base = f'http://127.0.0.1:{self.server_address[1]}'
+            entries = ''.join(f'<url><loc>{base}/page/{index}</loc></url>' for index in range(self.sitemap_urls))
+            self._sitemap = ('<?xml version="1.0" encoding="UTF-8"?>'
+                             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                             f'{entries}</urlset>').encode('utf-8')
+        return self._sitemap
+
+
+class StandInOrigin:
+    """Run the stand-in origin in a background thread for the duration of a ``with`` block."""
+
+    def __init__(self, delay=0.0, port=0, page_size=None, robots='User-agent: *\nDisallow:\n', sitemap_urls=100):
+        self.server = StandInOriginServer(('127.0.0.1', port), delay, page_size, robots, sitemap_urls)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
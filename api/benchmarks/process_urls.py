@@ -0,0 +1,30 @@
+"""Serial vs. parallel ``/process-csv/`` aggregation."""
+import json
+import time
+
+from ..url_structure import URLStructureAggregator, aggregate_parallel
+from .datasets import synthetic_crawl_rows
+
+
+def run(rows_count, worker_counts, chunk_size=20000, seed=0):
+    rows = list(synthetic_crawl_rows(rows_count, seed))
+
+    start = time.perf_counter()
+    expected = json.dumps(URLStructureAggregator().add_many(rows).result())
+    serial_time = time.perf_counter() - start
+
+    runs = [{'workers': 1, 'mode': 'serial', 'seconds': serial_time, 'speedup': 1.0, 'identical': True}]
+    for workers in worker_counts:
+        if workers < 2:
+            continue
+        start = time.perf_counter()
+        output = json.dumps(aggregate_parallel(iter(rows), workers, chunk_size).result())
+        elapsed = time.perf_counter() - start
+        runs.append({
+            'workers': workers,
+            'mode': 'parallel',
+            'seconds': elapsed,
+            'speedup': serial_time / elapsed,
+            'identical': output == expected,
+        })
+    return {'rows': rows_count, 'chunk_size': chunk_size, 'runs': runs}
@@ -0,0 +1,69 @@
+"""Compiled robots.txt matcher vs. ``RobotExclusionRulesParser``."""
+import random
+import time
+
+from ..robots_matcher import CompiledRobots, url_path
+from .datasets import PARAMS, SECTIONS, synthetic_crawl_rows
+
+AGENTS = ['*', 'Googlebot', 'Googlebot-Image', 'Bingbot']
+
+
+def synthetic_robots(rule_count, seed=0):
+    """Build a robots.txt with ``rule_count`` rules per group, about a fifth of them wildcards."""
+    rng = random.Random(seed)
+    lines = []
+    for agent in ('*', 'Googlebot', 'Bingbot'):
+        lines.append(f'User-agent: {agent}')
+        for _ in range(rule_count):
+            section = rng.choice(SECTIONS)
+            roll = rng.random()
+            if roll < 0.1:
+                pattern = f'/*?{rng.choice(PARAMS)}='
+            elif roll < 0.2:
+                pattern = f'/{section}/*-{rng.randint(0, 40)}$'
+            elif roll < 0.5:
+                pattern = f'/{section}/{rng.choice(SECTIONS)}-{rng.randint(0, 40)}'
+            else:
+                pattern = f'/{section}/{rng.choice(SECTIONS)}-{rng.randint(0, 40)}/{rng.choice(SECTIONS)}'
+            directive = 'Allow' if rng.random() < 0.3 else 'Disallow'
+            lines.append(f'{directive}: {pattern}')
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def run(rule_count, url_count, agents=None, seed=0):
+    from robotexclusionrulesparser import RobotExclusionRulesParser
+
+    agents = agents or AGENTS
+    content = synthetic_robots(rule_count, seed)
+    urls = [url for url, _ in synthetic_crawl_rows(url_count, seed)]
+
+    start = time.perf_counter()
+    parser = RobotExclusionRulesParser()
+    parser.parse(content)
+    expected = [[parser.is_allowed(agent, url) for agent in agents] for url in urls]
+    parser_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    robots = CompiledRobots(content)
+    matchers = [robots.matcher(agent) for agent in agents]
+    decisions = []
+    for url in urls:
+        path = url_path(url)
+        decisions.append([matcher.is_allowed_path(path) for matcher in matchers])
+    compiled_time = time.perf_counter() - start
+
+    checks = len(urls) * len(agents)
+    # The parser applies the first matching rule, the matcher the most specific one,
+    # so some disagreement is expected when Allow and Disallow rules overlap.
+    agreed = sum(a == b for row, other in zip(expected, decisions) for a, b in zip(row, other))
+    return {
+        'rules': rule_count * 3,
+        'urls': len(urls),
+        'agents': agents,
+        'parser_seconds': parser_time,
+        'compiled_seconds': compiled_time,
+        'speedup': parser_time / compiled_time if compiled_time else None,
+        'checks_per_second': checks / compiled_time if compiled_time else None,
+        'agreement': agreed / checks if checks else None,
+    }
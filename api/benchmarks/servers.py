@@ -0,0 +1,131 @@
+"""WSGI vs. ASGI throughput of URL checks against a slow origin.
+
+Each server is started the way the ``Procfile`` starts it (gunicorn, with
+the uvicorn worker for ASGI) on a free local port, and sent ``requests``
+checks of a slow ``StandInOrigin`` page, ``concurrency`` at a time: the
+WSGI server through ``/api/check-url/``, the ASGI server through
+``/api/async/check-url/``.
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+
+from .origin import StandInOrigin
+from .stats import summarize
+
+PATHS = {
+    'wsgi': '/api/check-url/',
+    'asgi': '/api/async/check-url/',
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    ends_at = time.monotonic() + timeout
+    while time.monotonic() < ends_at:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Server on port {port} did not start within {timeout}s')
+
+
+def start_server(kind, port, workers, threads):
+    command = [sys.executable, '-m', 'gunicorn', f'backend_project.{kind}',
+               '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--timeout', '300']
+    if kind == 'asgi':
+        command += ['-k', 'uvicorn.workers.UvicornWorker']
+    else:
+        command += ['--threads', str(threads)]
+    env = {**os.environ, 'ALLOWED_HOSTS': '127.0.0.1', 'SECURE_SSL_REDIRECT': 'false'}
+    process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+    except Exception:
+        process.kill()
+        raise
+    return process
+
+
+async def http_get(port, path):
+    """GET over a fresh connection; returns ``(status_code, body)``.
+
+    A bare-bones client, so the load generator costs next to nothing next
+    to the server it measures.
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nConnection: close\r\n\r\n'.encode('ascii'))
+        raw = await reader.read()
+    finally:
+        writer.close()
+    head, _, body = raw.partition(b'\r\n\r\n')
+    return int(head.split(b' ', 2)[1]), body
+
+
+async def load(port, path, origin_url, request_count, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(index):
+        nonlocal errors
+        query = urlencode({'url': f'{origin_url}/page/{index}', 'no_cache': '1'})
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                status_code, body = await http_get(port, f'{path}?{query}')
+                ok = status_code == 200 and json.loads(body).get('final_status_code') == 200
+            except (OSError, ValueError):
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    # The first request imports the URLconf and views; keep that out of the numbers
+    await http_get(port, f"{path}?{urlencode({'url': origin_url, 'no_cache': '1'})}")
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(request_count)))
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': request_count,
+        'errors': errors,
+        'seconds': elapsed,
+        'requests_per_second': request_count / elapsed,
+        'latency': summarize(latencies),
+    }
+
+
+def run(request_count, concurrency, delay, workers=1, threads=1, kinds=('wsgi', 'asgi')):
+    runs = []
+    with StandInOrigin(delay) as origin:
+        for kind in kinds:
+            port = free_port()
+            process = start_server(kind, port, workers, threads)
+            try:
+                result = asyncio.run(load(port, PATHS[kind], origin.url, request_count, concurrency))
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+            runs.append({'server': kind, **result})
+    return {
+        'origin_delay': delay,
+        'concurrency': concurrency,
+        'workers': workers,
+        'wsgi_threads': threads,
+        'runs': runs,
+    }
@@ -0,0 +1,90 @@
+"""A local stand-in SMTP server for outbox benchmarks.
+
+``StandInSMTP`` accepts every message on 127.0.0.1 and keeps nothing. It
+waits ``delay`` seconds before its greeting and before accepting each
+message, like a slow mail server: the greeting stands for the connection,
+TLS and login cost paid once per connection, the second for delivery.
+``connections`` and ``messages`` count what it received.
+"""
+import socketserver
+import threading
+import time
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode('ascii'))
+
+    def handle(self):
+        server = self.server
+        server.count('connections')
+        time.sleep(server.delay)
+        self.reply('220 stand-in ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].decode('ascii', 'replace').upper()
+            if command == 'EHLO':
+                self.reply('250-stand-in')
+                self.reply('250 8BITMIME')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                time.sleep(server.delay)
+                server.count('messages')
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:  # HELO, MAIL, RCPT, RSET, NOOP
+                self.reply('250 OK')
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, delay):
+        super().__init__(address, StandInSMTPHandler)
+        self.delay = delay
+        self.connections = 0
+        self.messages = 0
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+class StandInSMTP:
+    """Run the stand-in SMTP server in a background thread for the duration of a ``with`` block."""
+
+    def __init__(self, delay=0.0, port=0):
+        self.server = StandInSMTPServer(('127.0.0.1', port), delay)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def email_settings(self):
+        """Settings that point Django's SMTP backend at this server."""
+        return {
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': '127.0.0.1',
+            'EMAIL_PORT': self.port,
+            'EMAIL_HOST_USER': '',
+            'EMAIL_HOST_PASSWORD': '',
+            'EMAIL_USE_TLS': False,
+            'EMAIL_USE_SSL': False,
+        }
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
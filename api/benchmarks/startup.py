@@ -0,0 +1,103 @@
+"""Cold-start cost of the processes the Procfile runs.
+
+Each stage runs ``repeat`` times in a fresh interpreter and is timed from
+launch to exit, so the numbers include everything a restarted or newly
+scaled dyno pays before it is useful:
+
+- ``interpreter``: Python itself, the floor of every other stage.
+- ``settings``: importing ``backend_project.settings``.
+- ``setup``: ``django.setup()``, what every management command pays.
+- ``job_worker``: setup and the modules of ``run_jobs``.
+- ``urlconf``: setup and the URLconf, i.e. every view and what it imports.
+- ``first_request``: the WSGI application answering its first request.
+
+One more run of each stage under ``python -X importtime`` gives its import
+time by top-level package, the first place to look when a stage regresses.
+"""
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+from .stats import summarize
+
+SETUP = 'import django; django.setup()\n'
+FIRST_REQUEST = '''
+from wsgiref.util import setup_testing_defaults
+from backend_project.wsgi import application
+environ = {}
+setup_testing_defaults(environ)
+statuses = []
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+if not statuses[0].startswith('200'):
+    raise SystemExit(f'The first request answered {statuses[0]}')
+'''
+
+STAGES = {
+    'interpreter': '',
+    'settings': 'import backend_project.settings\n',
+    'setup': SETUP,
+    'job_worker': SETUP + 'import api.management.commands.run_jobs\n',
+    'urlconf': SETUP + 'from django.urls import get_resolver; get_resolver().url_patterns\n',
+    'first_request': FIRST_REQUEST,
+}
+# Appended to every stage: the child's peak resident memory in kilobytes. On Linux
+# ru_maxrss carries over the parent's peak through fork and exec; VmHWM does not.
+REPORT_RSS = '''
+try:
+    print(next(line.split()[1] for line in open('/proc/self/status') if line.startswith('VmHWM:')))
+except OSError:
+    import resource
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def run_stage(code, importtime=False):
+    """Run ``code`` in a fresh interpreter; returns ``(seconds, max_rss_bytes, stderr)``."""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code + REPORT_RSS]
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'backend_project.settings',
+           'ALLOWED_HOSTS': '127.0.0.1', 'SECURE_SSL_REDIRECT': 'false'}
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if completed.returncode:
+        raise RuntimeError(f'Stage failed: {completed.stderr.strip()[-500:]}')
+    return elapsed, int(completed.stdout.split()[-1]) * 1024, completed.stderr
+
+
+def import_times(stderr, top):
+    """Self import time (seconds) summed by top-level package, from ``-X importtime`` output; the ``top`` largest."""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1e6
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {'total': sum(packages.values()), 'packages': dict(ranked[:top])}
+
+
+def run(stages, repeat, top, progress=None):
+    results = []
+    for stage in stages:
+        if progress is not None:
+            progress(stage)
+        code = STAGES[stage]
+        samples, rss = [], []
+        for _ in range(repeat):
+            elapsed, max_rss, _ = run_stage(code)
+            samples.append(elapsed)
+            rss.append(max_rss)
+        _, _, stderr = run_stage(code, importtime=True)
+        results.append({
+            'scenario': 'startup',
+            'case': stage,
+            'params': {},
+            **summarize(samples),
+            'max_rss_bytes': max(rss),
+            'imports': import_times(stderr, top),
+        })
+    return results
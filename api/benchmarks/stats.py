@@ -0,0 +1,32 @@
+import statistics
+import time
+
+
+def percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, max(0, round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def summarize(samples):
+    """Summarize a list of durations (seconds) as the numbers we compare runs on."""
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'mean': statistics.fmean(ordered) if ordered else None,
+        'p50': percentile(ordered, 0.50),
+        'p95': percentile(ordered, 0.95),
+        'p99': percentile(ordered, 0.99),
+        'max': ordered[-1] if ordered else None,
+    }
+
+
+def time_calls(func, args_list, repeat=1):
+    samples = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            func(*args)
+            samples.append(time.perf_counter() - start)
+    return samples
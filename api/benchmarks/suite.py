@@ -0,0 +1,247 @@
+"""The baseline benchmark suite behind ``manage.py benchmark``.
+
+Every scenario runs against synthetic, seeded inputs and a local
+``StandInOrigin``, so two runs on the same machine are comparable. A case
+is first timed ``repeat`` times, then run once more under ``tracemalloc``
+for its peak memory, so that tracing does not inflate the timings.
+
+- ``check_url``: ``check_url_status`` on plain pages, redirect chains and
+  large pages, one uncached check per sample.
+- ``contact``: the contact view with a fast and a slow ``StandInSMTP``,
+  against sending the email inline and draining the outbox.
+- ``process_urls``: ``ProcessCSVView.process_urls`` on crawls of each size.
+- ``compare_csv``: ``compare_crawls`` on two crawl-export files of each size.
+- ``robots_analyze``: the analyzer on a robots.txt fetched from the origin,
+  with and without sitemaps to check.
+- ``parse_robots``: ``parse_robots`` on robots.txt files of each rule count.
+- ``robots_test_url`` and ``robots_multi_test_url``: the robots test views
+  on batches of URLs.
+"""
+from datetime import datetime, timezone
+import os
+import platform
+import subprocess
+import tempfile
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from ..contact_view import ContactMessageView
+from ..crawl_compare import compare_crawls
+from ..csv_views import ProcessCSVView
+from ..models import OutboundEmail
+from ..outbox import enqueue_email, send_pending
+from ..robots_parser import parse_robots
+from ..robots_views import MultiRobotsTestView, RobotsTxtAnalyzerView, TestURLAgainstRobotsView
+from ..views import check_url_status
+from .datasets import synthetic_crawl_rows, write_crawl_csv
+from .origin import StandInOrigin
+from .robots import AGENTS, synthetic_robots
+from .smtp import StandInSMTP
+from .stats import summarize, time_calls
+
+SCENARIOS = {}
+
+
+def scenario(name, repeat_option=None):
+    """Register a generator of ``(case, params, func)``, timed ``options[repeat_option]`` times if given."""
+    def register(func):
+        SCENARIOS[name] = (func, repeat_option)
+        return func
+    return register
+
+
+def measure(func, repeat):
+    """Time ``func`` ``repeat`` times, after one warm-up call, and trace its peak memory once."""
+    func()
+    summary = summarize(time_calls(func, [()], repeat))
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {**summary, 'peak_memory_bytes': peak}
+
+
+def call_view(view, request):
+    response = view(request)
+    response.render()
+    if response.status_code >= 300:
+        raise RuntimeError(f'{request.path} answered {response.status_code}: {response.content[:200]!r}')
+    return response
+
+
+@scenario('check_url', repeat_option='requests')
+def check_url_cases(options):
+    factory = APIRequestFactory()
+    counter = iter(range(10 ** 9))
+
+    def check(path):
+        # A new URL each time, so no sample is served by the redirect graph or a warm page
+        url = f'{origin.url}{path.format(next(counter))}'
+        call_view(check_url_status, factory.get('/api/check-url/', {'url': url, 'no_cache': '1'}))
+
+    cases = [
+        ('page', '/page/{}'),
+        ('redirect_chain', '/redirect/3/page/{}'),
+        ('large_page', '/page/{}?size=2000000'),
+    ]
+    with StandInOrigin(options['origin_delay']) as origin:
+        for name, path in cases:
+            yield name, {'path': path, 'origin_delay': options['origin_delay']}, lambda: check(path)
+
+
+@scenario('robots_analyze')
+def robots_analyze_cases(options):
+    factory = APIRequestFactory()
+    view = RobotsTxtAnalyzerView.as_view()
+    with StandInOrigin(options['origin_delay']) as origin:
+        for sitemaps in (0, 10):
+            origin.server.robots = synthetic_robots(options['rule_counts'][0]) + ''.join(
+                f'\nSitemap: {origin.url}/sitemap.xml?n={index}' for index in range(sitemaps))
+            body = {'url': f'{origin.url}/robots.txt', 'no_cache': True, 'sitemap_checks': 'sync'}
+            params = {'sitemaps': sitemaps, 'origin_delay': options['origin_delay']}
+            yield f'{sitemaps}_sitemaps', params, lambda: call_view(
+                view, factory.post('/api/robots-analyze/', body, format='json'))
+
+
+@scenario('contact')
+def contact_cases(options):
+    factory = APIRequestFactory()
+    view = ContactMessageView.as_view()
+    body = {'name': 'Benchmark', 'email': 'bench@example.com', 'subject': 'Benchmark', 'message': 'Hello'}
+    delay = options['smtp_delay']
+
+    def send_outbox(count):
+        for _ in range(count):
+            enqueue_email('Benchmark', 'Hello', ['inbox@example.com'], 'bench@example.com')
+        if send_pending()['sent'] != count:
+            raise RuntimeError('The outbox did not send every email.')
+
+    # Nothing the scenario writes is kept, and real pending emails are hidden from its sender
+    with transaction.atomic():
+        OutboundEmail.objects.filter(status=OutboundEmail.STATUS_PENDING).update(status=OutboundEmail.STATUS_FAILED)
+        for smtp_delay in (0.0, delay):
+            with StandInSMTP(smtp_delay) as smtp, override_settings(**smtp.email_settings()):
+                params = {'smtp_delay': smtp_delay}
+                yield f'request_smtp_delay_{smtp_delay:g}', params, lambda: call_view(
+                    view, factory.post('/api/contact/', body, format='json'))
+                OutboundEmail.objects.filter(status=OutboundEmail.STATUS_PENDING).delete()
+                if smtp_delay:
+                    # What each request waited for when it sent the email itself
+                    yield f'inline_send_mail_smtp_delay_{smtp_delay:g}', params, lambda: send_mail(
+                        'Benchmark', 'Hello', 'bench@example.com', ['inbox@example.com'])
+                    count = options['outbox_batch']
+                    yield f'outbox_{count}_emails_smtp_delay_{smtp_delay:g}', {**params, 'emails': count}, (
+                        lambda: send_outbox(count))
+        transaction.set_rollback(True)
+
+
+@scenario('process_urls')
+def process_urls_cases(options):
+    view = ProcessCSVView()
+    for size in options['sizes']:
+        urls, indexability = zip(*synthetic_crawl_rows(size))
+        yield f'{size}_urls', {'urls': size}, lambda: view.process_urls(urls, indexability)
+
+
+@scenario('compare_csv')
+def compare_csv_cases(options):
+    def compare(previous_path, current_path):
+        with open(previous_path, 'rb') as previous, open(current_path, 'rb') as current:
+            compare_crawls(previous, current)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in options['sizes']:
+            previous_path = write_crawl_csv(os.path.join(directory, f'previous-{size}.csv'), size, seed=0)
+            current_path = write_crawl_csv(os.path.join(directory, f'current-{size}.csv'), size, seed=1)
+            yield f'{size}_urls', {'urls': size}, lambda: compare(previous_path, current_path)
+
+
+@scenario('parse_robots')
+def parse_robots_cases(options):
+    for rule_count in options['rule_counts']:
+        content = synthetic_robots(rule_count)
+        yield f'{rule_count * 3}_rules', {'rules': rule_count * 3, 'bytes': len(content)}, lambda: parse_robots(content)
+
+
+@scenario('robots_test_url')
+def robots_test_url_cases(options):
+    factory = APIRequestFactory()
+    view = TestURLAgainstRobotsView.as_view()
+    content = synthetic_robots(options['rule_counts'][0])
+    for count in options['url_counts']:
+        body = {
+            'robots_content': content,
+            'test_urls': [url for url, _ in synthetic_crawl_rows(count)],
+            'user_agents': AGENTS,
+        }
+        yield f'{count}_urls', {'urls': count, 'agents': len(AGENTS)}, lambda: call_view(
+            view, factory.post('/api/robots-test-url/', body, format='json'))
+
+
+@scenario('robots_multi_test_url')
+def robots_multi_test_url_cases(options):
+    factory = APIRequestFactory()
+    view = MultiRobotsTestView.as_view()
+    contents = [synthetic_robots(options['rule_counts'][0], seed) for seed in range(3)]
+    for count in options['url_counts']:
+        for output_format in ('verbose', 'bitset'):
+            body = {
+                'robots_contents': contents,
+                'test_urls': [url for url, _ in synthetic_crawl_rows(count)],
+                'user_agents': AGENTS,
+                'output_format': output_format,
+            }
+            params = {'urls': count, 'robots_files': len(contents), 'agents': len(AGENTS), 'format': output_format}
+            yield f'{count}_urls_{output_format}', params, lambda: call_view(
+                view, factory.post('/api/robots-multi-test-url/', body, format='json'))
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run(names, options, progress=None):
+    report = {'environment': environment(), 'options': options, 'results': []}
+    for name in names:
+        cases, repeat_option = SCENARIOS[name]
+        repeat = options[repeat_option or 'repeat']
+        for case, params, func in cases(options):
+            if progress is not None:
+                progress(f'{name}/{case}')
+            report['results'].append({'scenario': name, 'case': case, 'params': params, **measure(func, repeat)})
+    return report
+
+
+def compare(report, baseline):
+    """Annotate each result of ``report`` with its ratio to the same case in ``baseline`` (above 1 is slower)."""
+    previous = {(result['scenario'], result['case']): result for result in baseline.get('results', [])}
+    for result in report['results']:
+        old = previous.get((result['scenario'], result['case']))
+        if old is None:
+            continue
+        result['baseline'] = {
+            key: result[key] / old[key] if old.get(key) else None
+            for key in ('p50', 'p95', 'p99', 'peak_memory_bytes')
+        }
+    report['baseline_commit'] = baseline.get('environment', {}).get('commit')
+    return report
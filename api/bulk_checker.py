@@ -0,0 +1,135 @@
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+import logging
+import time
+
+from .politeness import HostScheduler, robots_url_for
+from .redirect_graph import RedirectGraph
+from .robots_cache import compile_robots, fetch_robots
+from .url_checker import DEFAULT_USER_AGENT, check_url
+
+logger = logging.getLogger(__name__)
+
+
+def host_of(url):
+    return (urlparse(url).hostname or '').lower()
+
+
+class BulkURLChecker:
+    """Run ``check_url`` for many URLs on a thread pool.
+
+    At most ``concurrency`` checks run at once overall and at most
+    ``per_host_limit`` of them against the same host, and each host is
+    paced by ``scheduler`` (a ``HostScheduler``): its token bucket, its
+    backoff after 429/503 answers and, when asked for, its robots.txt
+    Crawl-delay. Work is only handed to the pool when its host is free to
+    take it, so a slow or throttled host never parks pool threads that could
+    be serving other hosts. Throttled URLs are checked again after the
+    backoff. Redirect hops are shared between the checks through
+    ``redirect_graph``.
+    """
+
+    def __init__(self, concurrency=32, per_host_limit=4, user_agent=None, use_cache=True,
+                 redirect_graph=None, scheduler=None):
+        self.concurrency = max(1, concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        self.user_agent = user_agent
+        self.use_cache = use_cache
+        self.redirect_graph = redirect_graph if redirect_graph is not None else RedirectGraph()
+        self.scheduler = scheduler if scheduler is not None else HostScheduler()
+
+    def check_one(self, url):
+        try:
+            return check_url(url, self.user_agent, use_cache=self.use_cache,
+                             redirect_graph=self.redirect_graph)
+        except Exception as e:
+            return {'url': url, 'error': str(e)}
+
+    def load_crawl_delay(self, url):
+        """The Crawl-delay for our user agent in the robots.txt of ``url``'s host, or None."""
+        try:
+            fetched = fetch_robots(robots_url_for(url))
+            if fetched['status_code'] != 200:
+                return None
+            return compile_robots(fetched['content']).crawl_delay(self.user_agent or DEFAULT_USER_AGENT)
+        except Exception:
+            return None
+
+    def run(self, urls, on_result=None):
+        """Check ``urls`` and return their results in input order.
+
+        ``on_result(done_count)`` is called from the calling thread after each
+        check completes; an exception raised from it stops the run.
+        """
+        results = [None] * len(urls)
+        attempts = [0] * len(urls)
+        scheduler = self.scheduler
+
+        # Pending work grouped by host; hosts are visited round-robin.
+        pending = OrderedDict()
+        for index, url in enumerate(urls):
+            pending.setdefault(host_of(url), deque()).append(index)
+        host_in_flight = {host: 0 for host in pending}
+        # With honor_crawl_delay, a host's robots.txt is read before any of its URLs
+        robots_unread = set(pending) if scheduler.honor_crawl_delay else set()
+        robots_loading = set()
+        in_flight = {}
+        completed = 0
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while pending or in_flight:
+                now = time.monotonic()
+                next_ready = None
+                submitted = True
+                while submitted and len(in_flight) < self.concurrency:
+                    submitted = False
+                    for host in list(pending):
+                        if len(in_flight) >= self.concurrency:
+                            break
+                        if host_in_flight[host] >= self.per_host_limit or host in robots_loading:
+                            continue
+                        throttle = scheduler.throttle(host)
+                        ready_at = throttle.ready_at(now)
+                        if ready_at > now:
+                            next_ready = ready_at if next_ready is None else min(next_ready, ready_at)
+                            continue
+                        throttle.take(now)
+                        host_in_flight[host] += 1
+                        if host in robots_unread:
+                            robots_unread.discard(host)
+                            robots_loading.add(host)
+                            future = executor.submit(self.load_crawl_delay, urls[pending[host][0]])
+                            in_flight[future] = (None, host)
+                        else:
+                            index = pending[host].popleft()
+                            if not pending[host]:
+                                del pending[host]
+                            future = executor.submit(self.check_one, urls[index])
+                            in_flight[future] = (index, host)
+                        submitted = True
+
+                timeout = None if next_ready is None else max(0.0, next_ready - time.monotonic())
+                if not in_flight:
+                    # Every pending host is waiting for its throttle
+                    time.sleep(timeout or 0)
+                    continue
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, host = in_flight.pop(future)
+                    host_in_flight[host] -= 1
+                    if index is None:
+                        robots_loading.discard(host)
+                        scheduler.set_crawl_delay(host, future.result())
+                        continue
+                    result = future.result()
+                    attempts[index] += 1
+                    if scheduler.record(host, result, attempts[index]):
+                        pending.setdefault(host, deque()).appendleft(index)
+                        continue
+                    results[index] = result
+                    completed += 1
+                    if on_result is not None:
+                        on_result(completed)
+
+        return results
@@ -0,0 +1,70 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from django.conf import settings
+from .serializers import BulkURLCheckSerializer
+from .bulk_checker import BulkURLChecker
+from .politeness import HostScheduler
+from .redirect_graph import RedirectGraph
+from .url_checker import DEFAULT_USER_AGENT
+from .csv_ingest import iter_url_rows
+from .crawl_history import record_results
+import time
+
+
+class BulkURLStatusView(APIView):
+    def post(self, request):
+        serializer = BulkURLCheckSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        urls = serializer.validated_data.get('urls') or []
+        csv_file = serializer.validated_data.get('file')
+        if csv_file:
+            try:
+                urls = urls + [url.strip() for url, _ in iter_url_rows(csv_file) if url.strip()]
+            except Exception as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(urls) > settings.BULK_CHECK_MAX_URLS:
+            return Response(
+                {'error': f"Too many URLs. The limit is {settings.BULK_CHECK_MAX_URLS} per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user_agent = (serializer.validated_data.get('user_agent')
+                      or request.META.get('HTTP_USER_AGENT', DEFAULT_USER_AGENT))
+        checker = BulkURLChecker(
+            concurrency=settings.BULK_CHECK_CONCURRENCY,
+            per_host_limit=settings.BULK_CHECK_PER_HOST_LIMIT,
+            user_agent=user_agent,
+            use_cache=not serializer.validated_data['no_cache'],
+            redirect_graph=RedirectGraph(
+                max_chain_length=(serializer.validated_data.get('max_chain_length')
+                                  or settings.REDIRECT_LONG_CHAIN_HOPS),
+            ),
+            scheduler=HostScheduler(honor_crawl_delay=serializer.validated_data['honor_crawl_delay']),
+        )
+
+        start_time = time.time()
+        results = checker.run(urls)
+        record_results(results, 'bulk_check')
+        failed = sum(1 for result in results if 'error' in result)
+        cache_hits = sum(1 for result in results if result.get('cache_status') == 'hit')
+
+        redirect_analysis = checker.redirect_graph.stats()
+        if serializer.validated_data['include_redirect_graph']:
+            redirect_analysis['edges'] = checker.redirect_graph.edges()
+
+        return Response({
+            'results': results,
+            'redirect_analysis': redirect_analysis,
+            'summary': {
+                'total': len(results),
+                'succeeded': len(results) - failed,
+                'failed': failed,
+                'cache_hits': cache_hits,
+                'elapsed': time.time() - start_time,
+            },
+            'politeness': checker.scheduler.stats(),
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,100 @@
+"""Key/value backends for the app's result caches.
+
+``MemoryCacheBackend`` is a size-bounded LRU private to the process;
+``DjangoCacheBackend`` stores entries in one of the configured Django caches
+(``CACHES``) so gunicorn workers can share them. Both expose the same small
+``get``/``set``/``delete`` interface and count hits and misses.
+"""
+from collections import OrderedDict
+import threading
+import time
+
+
+class CacheBackend:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else None,
+        }
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, max_entries=1000):
+        super().__init__()
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires_at = time.time() + timeout if timeout is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DjangoCacheBackend(CacheBackend):
+    def __init__(self, alias='default', key_prefix=''):
+        super().__init__()
+        from django.core.cache import caches
+
+        self.cache = caches[alias]
+        self.key_prefix = key_prefix
+
+    def _get(self, key):
+        return self.cache.get(self.key_prefix + key)
+
+    def set(self, key, value, timeout=None):
+        self.cache.set(self.key_prefix + key, value, timeout)
+
+    def delete(self, key):
+        self.cache.delete(self.key_prefix + key)
+
+    def clear(self):
+        self.cache.clear()
+
+
+def build_backend(name, max_entries=1000, alias='default', key_prefix=''):
+    if name == 'django':
+        return DjangoCacheBackend(alias=alias, key_prefix=key_prefix)
+    if name == 'memory':
+        return MemoryCacheBackend(max_entries=max_entries)
+    raise ValueError(f"Unknown cache backend '{name}'.")
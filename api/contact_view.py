@@ -1,10 +1,10 @@
-
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .serializers import ContactMessageSerializer
-from django.core.mail import send_mail
+from .outbox import enqueue_email
 from django.conf import settings
+from django.db import transaction
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,24 +14,21 @@ class ContactMessageView(APIView):
         logger.info("Received data: %s", request.data)
         serializer = ContactMessageSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
-            # Send email notification
             name = serializer.validated_data['name']
             email = serializer.validated_data['email']
             subject = serializer.validated_data['subject']
             message = serializer.validated_data['message']
             full_message = f"From: {name} <{email}>\n\n{message}"
-            try:
-                send_mail(
+            # The notification is sent by the outbox sender, so a slow mail server never delays the request
+            with transaction.atomic():
+                contact_message = serializer.save()
+                enqueue_email(
                     subject,
                     full_message,
-                    settings.DEFAULT_FROM_EMAIL,  # Sender's email
                     [settings.CONTACT_EMAIL],     # Receiver's email
-                    fail_silently=False,
+                    settings.DEFAULT_FROM_EMAIL,  # Sender's email
+                    contact_message=contact_message,
                 )
-            except Exception as e:
-                logger.error("Error sending email: %s", e)
-                return Response({'error': 'Error sending email'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             return Response({'message': 'Message sent successfully!'}, status=status.HTTP_201_CREATED)
         else:
             logger.error("Form submission errors: %s", serializer.errors)
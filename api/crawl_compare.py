@@ -0,0 +1,289 @@
+"""Crawl-to-crawl comparison of two crawl-export CSVs for ``/compare-csv/``.
+
+Neither crawl is held in memory as URL strings. The previous crawl is
+streamed into a ``URLHashTable``, an open-addressing table of 64-bit
+blake2b URL hashes in one flat ``array`` (12 to 24 bytes per distinct URL,
+where a set of the URLs themselves takes well over 100). The current crawl
+is then streamed and probed against it, a hash join that finds the added
+URLs and the indexability changes. A second pass over the previous crawl
+finds the URLs the current crawl never matched: the removed ones.
+
+Folders are those of ``ProcessCSVView``: the first ``depth`` segments of the
+path, padded with 'root'. Folder counts are of rows, as in ``/process-csv/``;
+added, removed and changed URLs are counted once however often they repeat.
+
+The low 4 bits of each hash hold the URL's state, so two distinct URLs are
+confused only if they share the other 60 bits: across two crawls of
+millions of URLs, odds of a few in a million.
+"""
+from array import array
+from hashlib import blake2b
+import logging
+from urllib.parse import parse_qs, urlparse
+
+from .csv_ingest import iter_url_rows
+from .url_structure import folder_levels
+
+logger = logging.getLogger(__name__)
+
+# The state kept in the low bits of a stored hash
+INDEXABILITY_BITS = {None: 0, True: 1, False: 2}
+INDEXABILITY = {bits: indexable for indexable, bits in INDEXABILITY_BITS.items()}
+MATCHED = 4  # Seen in the current crawl
+ADDED = 8  # Only in the current crawl
+STATE_MASK = 15
+KEY_MASK = ~STATE_MASK & 0xFFFFFFFFFFFFFFFF
+
+# Counters of a FolderDelta
+PREVIOUS, CURRENT, ADDED_URLS, REMOVED_URLS = 0, 1, 2, 3
+PREVIOUS_NON_INDEXABLE, CURRENT_NON_INDEXABLE, BECAME_INDEXABLE, BECAME_NON_INDEXABLE = 4, 5, 6, 7
+SAMPLED = {ADDED_URLS: 'added', REMOVED_URLS: 'removed',
+           BECAME_INDEXABLE: 'becameIndexable', BECAME_NON_INDEXABLE: 'becameNonIndexable'}
+
+
+def url_key(url):
+    """The 64-bit blake2b hash of ``url`` with its state bits cleared (never 0, which marks a free slot)."""
+    key = int.from_bytes(blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+    return (key & KEY_MASK) or STATE_MASK + 1
+
+
+class URLHashTable:
+    """Open-addressing (linear probing) set of URL keys, each with its state bits, kept at most 2/3 full."""
+
+    def __init__(self, capacity=1 << 16):
+        self.slots = array('Q', bytes(8 * capacity))
+        self.mask = capacity - 1
+        self.size = 0
+
+    def _index(self, key):
+        slots, mask = self.slots, self.mask
+        index = (key >> 4) & mask
+        while True:
+            slot = slots[index]
+            if not slot or slot & KEY_MASK == key:
+                return index
+            index = (index + 1) & mask
+
+    def add(self, key, state):
+        """Store ``key`` with ``state`` unless it is already there; returns whether it was added."""
+        index = self._index(key)
+        if self.slots[index]:
+            return False
+        self.slots[index] = key | state
+        self.size += 1
+        if self.size * 3 > len(self.slots) * 2:
+            self._grow()
+        return True
+
+    def get(self, key):
+        """The state bits of ``key``, or None when it is not stored."""
+        slot = self.slots[self._index(key)]
+        return slot & STATE_MASK if slot else None
+
+    def set_flag(self, key, flag):
+        self.slots[self._index(key)] |= flag
+
+    def _grow(self):
+        old = self.slots
+        self.slots = array('Q', bytes(16 * len(old)))
+        self.mask = len(self.slots) - 1
+        for slot in old:
+            if slot:
+                self.slots[self._index(slot & KEY_MASK)] = slot
+
+
+class FolderDelta:
+    __slots__ = ('counts', 'samples', 'children')
+
+    def __init__(self, leaf=False):
+        self.counts = [0] * 8
+        self.samples = None
+        self.children = None if leaf else {}
+
+    def sample(self, counter, url):
+        if self.samples is None:
+            self.samples = {}
+        self.samples.setdefault(SAMPLED[counter], url)
+
+
+class CrawlComparison:
+    """Compare two crawls, given as callables that each open a fresh ``(url, is_indexable)`` row iterator.
+
+    The previous crawl is read twice, hence callables rather than iterators.
+    """
+
+    def __init__(self, depth=3, sample_size=100):
+        self.depth = max(1, depth)
+        self.sample_size = sample_size
+        self.root = FolderDelta()
+        self.table = URLHashTable()
+        self.params = {}  # key -> [previous count, current count, {level 1 folder: [previous, current]}, sample URL]
+        self.rows = [0, 0]
+        self.distinct = [0, 0]
+        self.totals = [0] * 8
+        self.samples = {name: [] for name in SAMPLED.values()}
+        self.indexability_data_provided = False
+
+    def folders(self, url):
+        """The ``FolderDelta`` of each level of ``url``'s path, its first-level folder and its query."""
+        parsed_url = urlparse(url)
+        levels = folder_levels(parsed_url.path, self.depth)
+        nodes = []
+        node = self.root
+        last_level = self.depth - 1
+        for level, segment in enumerate(levels):
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = FolderDelta(leaf=level == last_level)
+            nodes.append(child)
+            node = child
+        return nodes, levels[0], parsed_url.query
+
+    def count(self, nodes, counter, url=None):
+        for node in nodes:
+            node.counts[counter] += 1
+            if url is not None:
+                node.sample(counter, url)
+        self.totals[counter] += 1
+        if url is not None:
+            samples = self.samples[SAMPLED[counter]]
+            if len(samples) < self.sample_size:
+                samples.append(url)
+
+    def count_params(self, query, side, url, level1):
+        for key, values in parse_qs(query).items():
+            param = self.params.get(key)
+            if param is None:
+                param = self.params[key] = [0, 0, {}, url]
+            param[side] += len(values)
+            folder = param[2].get(level1)
+            if folder is None:
+                folder = param[2][level1] = [0, 0]
+            folder[side] += len(values)
+
+    def read(self, rows, side, on_row):
+        """Count ``rows`` into folders and params for ``side``, then call ``on_row(key, indexable, nodes, url)``."""
+        non_indexable = PREVIOUS_NON_INDEXABLE if side == PREVIOUS else CURRENT_NON_INDEXABLE
+        for url, indexable in rows:
+            self.rows[side] += 1
+            if indexable is not None:
+                self.indexability_data_provided = True
+            try:
+                nodes, level1, query = self.folders(url)
+            except Exception as e:
+                logger.debug('Error processing URL %s: %s', url, e)
+                continue
+            self.count(nodes, side)  # The row counters are PREVIOUS and CURRENT themselves
+            if indexable is False:
+                self.count(nodes, non_indexable)
+            if query:
+                self.count_params(query, side, url, level1)
+            on_row(url_key(url.strip()), indexable, nodes, url)
+
+    def build(self, key, indexable, nodes, url):
+        if self.table.add(key, INDEXABILITY_BITS[indexable]):
+            self.distinct[PREVIOUS] += 1
+
+    def probe(self, key, indexable, nodes, url):
+        state = self.table.get(key)
+        if state is None:
+            self.table.add(key, INDEXABILITY_BITS[indexable] | MATCHED | ADDED)
+            self.distinct[CURRENT] += 1
+            self.count(nodes, ADDED_URLS, url)
+            return
+        if state & MATCHED:
+            return  # A repeated row of the current crawl
+        self.table.set_flag(key, MATCHED)
+        self.distinct[CURRENT] += 1
+        previous = INDEXABILITY[state & 3]
+        if previous is not None and indexable is not None and previous != indexable:
+            self.count(nodes, BECAME_INDEXABLE if indexable else BECAME_NON_INDEXABLE, url)
+
+    def find_removed(self, previous_rows):
+        for url, _ in previous_rows:
+            key = url_key(url.strip())
+            state = self.table.get(key)
+            if state is not None and not state & MATCHED:
+                self.table.set_flag(key, MATCHED)  # Counted once, whatever the repeats
+                try:
+                    nodes, _, _ = self.folders(url)
+                except Exception:
+                    continue
+                self.count(nodes, REMOVED_URLS, url)
+
+    def run(self, open_previous, open_current):
+        self.read(open_previous(), PREVIOUS, self.build)
+        self.read(open_current(), CURRENT, self.probe)
+        self.find_removed(open_previous())
+        return self
+
+    def result(self):
+        with_indexability = self.indexability_data_provided
+        summary = {
+            'previousRows': self.rows[PREVIOUS],
+            'currentRows': self.rows[CURRENT],
+            'previousUrls': self.distinct[PREVIOUS],
+            'currentUrls': self.distinct[CURRENT],
+            'added': self.totals[ADDED_URLS],
+            'removed': self.totals[REMOVED_URLS],
+        }
+        if with_indexability:
+            summary['becameIndexable'] = self.totals[BECAME_INDEXABLE]
+            summary['becameNonIndexable'] = self.totals[BECAME_NON_INDEXABLE]
+        return {
+            'summary': summary,
+            'folderChanges': serialize_deltas(self.root.children, with_indexability),
+            'addedUrls': self.samples['added'],
+            'removedUrls': self.samples['removed'],
+            'indexabilityChanges': {
+                'becameIndexable': self.samples['becameIndexable'],
+                'becameNonIndexable': self.samples['becameNonIndexable'],
+            } if with_indexability else None,
+            'newParams': self.param_changes(CURRENT, PREVIOUS),
+            'disappearedParams': self.param_changes(PREVIOUS, CURRENT),
+            'indexabilityDataProvided': with_indexability,
+        }
+
+    def param_changes(self, side, other):
+        """Params counted on ``side`` only, with their folders and a sample URL."""
+        return {
+            key: {
+                'count': param[side],
+                'folders': {folder: counts[side] for folder, counts in param[2].items() if counts[side]},
+                'sampleUrl': param[3],
+            }
+            for key, param in self.params.items() if param[side] and not param[other]
+        }
+
+
+def serialize_deltas(children, with_indexability):
+    folders = {}
+    for segment, node in children.items():
+        counts = node.counts
+        folder = {
+            'previous': counts[PREVIOUS],
+            'current': counts[CURRENT],
+            'delta': counts[CURRENT] - counts[PREVIOUS],
+            'added': counts[ADDED_URLS],
+            'removed': counts[REMOVED_URLS],
+        }
+        if with_indexability:
+            folder.update({
+                'previousNonIndexable': counts[PREVIOUS_NON_INDEXABLE],
+                'currentNonIndexable': counts[CURRENT_NON_INDEXABLE],
+                'becameIndexable': counts[BECAME_INDEXABLE],
+                'becameNonIndexable': counts[BECAME_NON_INDEXABLE],
+            })
+        folder['samples'] = node.samples or {}
+        if node.children is not None:
+            folder['subfolders'] = serialize_deltas(node.children, with_indexability)
+        folders[segment] = folder
+    return folders
+
+
+def compare_crawls(previous_file, current_file, depth=3, sample_size=100):
+    """Compare two crawl exports (uploaded files or job inputs; ``previous_file`` must support ``seek(0)``)."""
+    return CrawlComparison(depth, sample_size).run(
+        lambda: iter_url_rows(previous_file),
+        lambda: iter_url_rows(current_file),
+    ).result()
@@ -0,0 +1,270 @@
+"""Stored history of URL check results.
+
+Each URL is stored once as a ``CrawledURL`` (keyed by a hash of its
+normalized form), each distinct redirect chain once as a ``RedirectChain``,
+and each check as a narrow ``URLCheck`` row pointing at both. Writes are
+batched: ``CrawlHistoryWriter`` buffers results and stores a batch with a
+handful of queries, whatever its size. While writing, each check is compared
+with the URL's previous check (kept on the ``CrawledURL``), so the
+``status_changed``, ``seo_changed`` and ``redirect_changed`` flags are set
+once at write time and "what changed since last week" is a partial index
+scan rather than a comparison of every check with its predecessor.
+
+Cache hits are not recorded: they repeat an earlier check instead of
+observing the URL again.
+"""
+from hashlib import blake2b
+import json
+import logging
+from urllib.parse import urlsplit, urlunsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .fetch_cache import CACHE_HIT
+from .models import CrawledURL, RedirectChain, URLCheck
+
+logger = logging.getLogger(__name__)
+
+CHANGE_FLAGS = {
+    'status': 'status_changed',
+    'seo': 'seo_changed',
+    'redirect': 'redirect_changed',
+}
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """Lowercase the scheme and host, drop the default port and the fragment.
+
+    Raises ValueError for a URL that cannot be parsed, such as one with a port out of range.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
+def digest(value):
+    return blake2b(value.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def seo_fingerprint(result):
+    fields = [result.get(key) for key in ('meta_title', 'meta_description', 'h1_tags', 'canonical', 'meta_robots')]
+    return digest(json.dumps(fields, ensure_ascii=False))
+
+
+def chain_hops(result):
+    """The redirect hops of ``result`` as ``[[url, status_code], ...]``, or None without a redirect."""
+    steps = result.get('redirect_steps') or []
+    if len(steps) < 2:
+        return None
+    return [[step['url'], step['status_code']] for step in steps]
+
+
+def should_record(result):
+    return bool(result.get('url')) and result.get('cache_status') != CACHE_HIT
+
+
+class CrawlHistoryWriter:
+    """Buffer check results and store them ``batch_size`` at a time.
+
+    Use as a context manager, or call ``flush()`` after the last ``add()``.
+    """
+
+    def __init__(self, source, batch_size=None):
+        self.source = source
+        self.batch_size = batch_size or settings.CRAWL_HISTORY_BATCH_SIZE
+        self.pending = []
+        self.written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def add(self, result, checked_at=None):
+        if not should_record(result):
+            return
+        try:
+            url = normalize_url(result['url'])
+        except ValueError as e:
+            # Skip only this result; raising would lose the whole batch
+            logger.warning('Not recording the check of %r: %s', result['url'], e)
+            return
+        self.pending.append((result, url, checked_at or timezone.now()))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        with transaction.atomic():
+            urls = self.crawled_urls({url for _, url, _ in batch})
+            chains = self.redirect_chains([hops for hops in (chain_hops(result) for result, _, _ in batch) if hops])
+            checks = []
+            touched = {}
+            for result, url, checked_at in batch:
+                crawled = urls[url]
+                hops = chain_hops(result)
+                chain = chains[digest(json.dumps(hops))] if hops else None
+                checks.append(self.build_check(crawled, result, checked_at, chain))
+                touched[crawled.pk] = crawled
+            URLCheck.objects.bulk_create(checks, batch_size=self.batch_size)
+            # An upsert on url_hash: one statement per batch, where bulk_update builds a CASE per row and field
+            CrawledURL.objects.bulk_create(
+                [CrawledURL(url=crawled.url, url_hash=crawled.url_hash, host=crawled.host,
+                            last_checked_at=crawled.last_checked_at, last_status_code=crawled.last_status_code,
+                            last_fingerprint=crawled.last_fingerprint, last_chain=crawled.last_chain)
+                 for crawled in touched.values()],
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=['url_hash'],
+                update_fields=['last_checked_at', 'last_status_code', 'last_fingerprint', 'last_chain'],
+            )
+        self.written += len(checks)
+
+    def crawled_urls(self, normalized_urls):
+        """Map each normalized URL to its ``CrawledURL``, creating the missing ones."""
+        by_hash = {digest(url): url for url in normalized_urls}
+        found = {crawled.url_hash: crawled for crawled in CrawledURL.objects.filter(url_hash__in=list(by_hash))}
+        missing = [url_hash for url_hash in by_hash if url_hash not in found]
+        if missing:
+            # Another writer may insert the same URLs meanwhile; theirs win and are read back below.
+            CrawledURL.objects.bulk_create(
+                [CrawledURL(url=by_hash[url_hash], url_hash=url_hash, host=urlsplit(by_hash[url_hash]).netloc[:255])
+                 for url_hash in missing],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            found.update((crawled.url_hash, crawled) for crawled in CrawledURL.objects.filter(url_hash__in=missing))
+        return {url: found[url_hash] for url_hash, url in by_hash.items()}
+
+    def redirect_chains(self, chains):
+        """Map the hash of each chain of hops to its ``RedirectChain``, creating the missing ones."""
+        by_hash = {digest(json.dumps(hops)): hops for hops in chains}
+        if not by_hash:
+            return {}
+        found = {chain.chain_hash: chain for chain in RedirectChain.objects.filter(chain_hash__in=list(by_hash))}
+        missing = [chain_hash for chain_hash in by_hash if chain_hash not in found]
+        if missing:
+            RedirectChain.objects.bulk_create(
+                [RedirectChain(chain_hash=chain_hash, hops=by_hash[chain_hash], hop_count=len(by_hash[chain_hash]) - 1)
+                 for chain_hash in missing],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            found.update((chain.chain_hash, chain) for chain in RedirectChain.objects.filter(chain_hash__in=missing))
+        return found
+
+    def build_check(self, crawled, result, checked_at, chain):
+        """The ``URLCheck`` of ``result``, compared with and then recorded as ``crawled``'s latest check."""
+        status_code = result.get('final_status_code')
+        fingerprint = seo_fingerprint(result) if 'error' not in result else ''
+        is_first = crawled.last_checked_at is None
+        h1_tags = result.get('h1_tags') or []
+        meta_robots = result.get('meta_robots')
+        check = URLCheck(
+            url=crawled,
+            checked_at=checked_at,
+            source=self.source,
+            initial_status_code=result.get('initial_status_code'),
+            final_status_code=status_code,
+            previous_status_code=crawled.last_status_code,
+            chain=chain,
+            response_time=result.get('response_time'),
+            content_type=(result.get('content_type') or '')[:100],
+            meta_title=result.get('meta_title'),
+            meta_description=result.get('meta_description'),
+            h1=h1_tags[0] if h1_tags else None,
+            h1_count=len(h1_tags),
+            canonical=result.get('canonical'),
+            meta_robots=meta_robots[:255] if meta_robots else None,
+            error=result.get('error') or '',
+            fingerprint=fingerprint,
+            is_first=is_first,
+            status_changed=not is_first and status_code != crawled.last_status_code,
+            seo_changed=not is_first and fingerprint != crawled.last_fingerprint,
+            redirect_changed=not is_first and (chain.pk if chain else None) != crawled.last_chain_id,
+        )
+        crawled.last_checked_at = checked_at
+        crawled.last_status_code = status_code
+        crawled.last_fingerprint = fingerprint
+        crawled.last_chain = chain
+        return check
+
+
+def record_results(results, source):
+    """Store ``results`` when the crawl history is enabled; returns the number stored.
+
+    A failure is logged, not raised: the history must not break the checks it records.
+    """
+    if not settings.CRAWL_HISTORY_ENABLED:
+        return 0
+    writer = CrawlHistoryWriter(source)
+    try:
+        with writer:
+            for result in results:
+                writer.add(result)
+    except Exception:
+        logger.exception('Could not store %s check results in the crawl history', source)
+    return writer.written
+
+
+# Queries
+
+def url_history(url, limit=100):
+    """The latest ``limit`` checks of ``url``, newest first (uses ``urlcheck_url_history``)."""
+    return (URLCheck.objects.filter(url__url_hash=digest(normalize_url(url)))
+            .select_related('url', 'chain').order_by('-checked_at')[:limit])
+
+
+def changes_since(since, change='status', host=None, limit=1000):
+    """Checks since ``since`` whose ``change`` (status, seo or redirect) differs from the check before."""
+    checks = URLCheck.objects.filter(**{CHANGE_FLAGS[change]: True, 'checked_at__gte': since})
+    if host:
+        checks = checks.filter(url__host=host.lower())
+    return checks.select_related('url', 'chain').order_by('-checked_at')[:limit]
+
+
+# Retention
+
+def delete_in_batches(queryset, batch_size):
+    """Delete the rows of ``queryset`` a batch of primary keys at a time, keeping transactions short."""
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        count, _ = queryset.model.objects.filter(pk__in=pks).delete()
+        deleted += count
+
+
+def prune(compact_before, delete_before, batch_size=None):
+    """Compact and expire the crawl history; returns the deleted row counts.
+
+    Checks before ``compact_before`` are kept only where something changed
+    (or the URL was first seen): every dropped check matched the check
+    before it, so the state of a URL at any time is still that of its
+    latest remaining check at or before then. Checks before
+    ``delete_before`` are dropped altogether, then the URLs no longer
+    checked and the redirect chains no longer used.
+    """
+    batch_size = batch_size or settings.CRAWL_HISTORY_BATCH_SIZE
+    unchanged = URLCheck.objects.filter(
+        checked_at__lt=compact_before, is_first=False,
+        status_changed=False, seo_changed=False, redirect_changed=False,
+    )
+    return {
+        'compacted_checks': delete_in_batches(unchanged, batch_size),
+        'expired_checks': delete_in_batches(URLCheck.objects.filter(checked_at__lt=delete_before), batch_size),
+        'urls': delete_in_batches(CrawledURL.objects.filter(last_checked_at__lt=delete_before), batch_size),
+        'redirect_chains': delete_in_batches(
+            RedirectChain.objects.filter(checks__isnull=True, latest_for__isnull=True), batch_size,
+        ),
+    }
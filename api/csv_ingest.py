@@ -0,0 +1,81 @@
+"""Streaming reader for uploaded crawl-export CSVs.
+
+Uploads larger than ``FILE_UPLOAD_MAX_MEMORY_SIZE`` are spooled to a temporary
+file by Django. Rather than reading and decoding the whole upload at once,
+rows are decoded and parsed as they are read, so memory use does not grow
+with the number of rows.
+"""
+import codecs
+import csv
+import io
+
+SNIFF_BYTES = 64 * 1024
+FALLBACK_ENCODING = 'cp1252'
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def detect_encoding(sample):
+    """Guess the encoding of a CSV from its first bytes."""
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        # Incremental decoding tolerates a multi-byte character cut off at the end of the sample.
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    try:
+        from charset_normalizer import from_bytes
+
+        matches = from_bytes(sample)
+        best = matches.best()
+        if best is not None:
+            # Mostly-ASCII URLs fit several code pages equally well; among those, prefer the one
+            # spreadsheet exports on Windows use (cp1250 would turn 'señor' into 'seńor').
+            for match in matches:
+                if match.chaos <= best.chaos and FALLBACK_ENCODING in match.could_be_from_charset:
+                    return FALLBACK_ENCODING
+            return best.encoding
+    except ImportError:
+        pass
+    return FALLBACK_ENCODING
+
+
+def open_text(uploaded_file):
+    """Return a text stream over an uploaded file, decoded as it is read."""
+    uploaded_file.seek(0)
+    sample = uploaded_file.read(SNIFF_BYTES)
+    uploaded_file.seek(0)
+    encoding = detect_encoding(sample)
+    raw = getattr(uploaded_file, 'file', uploaded_file)
+    if isinstance(raw, io.TextIOBase):
+        return raw
+    return io.TextIOWrapper(raw, encoding=encoding, errors='replace', newline='')
+
+
+def iter_url_rows(uploaded_file):
+    """Yield ``(url, is_indexable)`` for each non-empty row of a crawl export.
+
+    The URL is the first column; the optional second column holds the
+    indexability flag, and ``is_indexable`` is None when it is missing.
+    """
+    text = open_text(uploaded_file)
+    try:
+        for row in csv.reader(text):
+            if row:
+                url = row[0]
+                if len(row) > 1 and row[1] != '':
+                    yield url, row[1].lower() == 'true'
+                else:
+                    yield url, None  # No indexability data
+    finally:
+        if text is not getattr(uploaded_file, 'file', uploaded_file):
+            # Closing our wrapper would close the upload too; keep it readable for another pass
+            text.detach()
@@ -0,0 +1,93 @@
+"""Cache of ``check_url`` results keyed by (URL, user agent).
+
+Entries are fresh for ``FETCH_CACHE_TTL`` seconds. After that they are kept
+for another ``FETCH_CACHE_STALE_TTL`` seconds so the next check can revalidate
+the final page with If-None-Match / If-Modified-Since; a 304 refreshes the
+entry without downloading or parsing the page again.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+
+from .cache_backends import build_backend
+
+CACHE_HIT = 'hit'
+CACHE_MISS = 'miss'
+CACHE_REVALIDATED = 'revalidated'
+CACHE_BYPASS = 'bypass'
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class FetchCache:
+    def __init__(self, backend, ttl, stale_ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.revalidations = 0
+
+    @staticmethod
+    def make_key(url, user_agent):
+        digest = hashlib.sha256(f'{url}\0{user_agent}'.encode('utf-8')).hexdigest()
+        return f'fetch:{digest}'
+
+    def get(self, url, user_agent):
+        """Return ``(entry, is_fresh)``, or ``(None, False)`` when nothing is cached."""
+        entry = self.backend.get(self.make_key(url, user_agent))
+        if entry is None:
+            return None, False
+        return entry, entry['fresh_until'] > time.time()
+
+    def store(self, url, user_agent, result, etag=None, last_modified=None):
+        now = time.time()
+        entry = {
+            'result': result,
+            'stored_at': now,
+            'fresh_until': now + self.ttl,
+            'etag': etag,
+            'last_modified': last_modified,
+        }
+        self.backend.set(self.make_key(url, user_agent), entry, self.ttl + self.stale_ttl)
+
+    def refresh(self, url, user_agent, entry, result):
+        """Store ``result`` as fresh again after the origin answered 304 to ``entry``'s validators."""
+        self.revalidations += 1
+        self.store(url, user_agent, result, entry['etag'], entry['last_modified'])
+
+    def stats(self):
+        return {**self.backend.stats(), 'revalidations': self.revalidations}
+
+
+def conditional_headers(entry):
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def is_cacheable(result):
+    # Transient failures should be retried on the next check, not replayed.
+    status_code = result['final_status_code']
+    return status_code != 429 and status_code < 500
+
+
+def get_fetch_cache():
+    """Return the process-wide cache, or None when caching is disabled."""
+    global _cache
+    if settings.FETCH_CACHE_BACKEND == 'none':
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                backend = build_backend(
+                    settings.FETCH_CACHE_BACKEND,
+                    max_entries=settings.FETCH_CACHE_MAX_ENTRIES,
+                    alias=settings.FETCH_CACHE_ALIAS,
+                )
+                _cache = FetchCache(backend, settings.FETCH_CACHE_TTL, settings.FETCH_CACHE_STALE_TTL)
+    return _cache
@@ -0,0 +1,130 @@
+"""Per-request timing phases for the blocking HTTP client.
+
+urllib3 resolves, connects and handshakes inside one call, so the
+connection classes here redo that call in timed steps. Every response they
+produce gets a ``timings`` dict (seconds):
+
+- ``dns``: name resolution, ``connect``: TCP connect, ``tls``: TLS
+  handshake (and proxy tunnel). All three are 0 on a reused connection.
+- ``ttfb``: from sending the request (or from the end of the handshake) to
+  the response headers.
+
+Readers of the body add ``download`` themselves. ``TimedHTTPAdapter``
+mounts these classes on a ``requests`` session.
+"""
+import socket
+from time import perf_counter
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+from urllib3.util.timeout import _DEFAULT_TIMEOUT
+
+NO_SETUP = {'dns': 0.0, 'connect': 0.0, 'tls': 0.0}
+
+
+def timed_create_connection(address, timeout, source_address, socket_options, timings):
+    """``urllib3.util.connection.create_connection`` recording ``dns`` and ``connect`` in ``timings``."""
+    host, port = address
+    if host.startswith('['):
+        host = host.strip('[]')
+    start = perf_counter()
+    addresses = socket.getaddrinfo(host, port, allowed_gai_family(), socket.SOCK_STREAM)
+    resolved = perf_counter()
+    timings['dns'] = resolved - start
+
+    error = None
+    for family, socket_type, proto, _, socket_address in addresses:
+        sock = None
+        try:
+            sock = socket.socket(family, socket_type, proto)
+            for option in socket_options or ():
+                sock.setsockopt(*option)
+            if timeout is not _DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(socket_address)
+            timings['connect'] = perf_counter() - resolved
+            return sock
+        except OSError as e:
+            error = e
+            if sock is not None:
+                sock.close()
+    if error is not None:
+        raise error
+    raise OSError('getaddrinfo returns an empty list')
+
+
+class TimedConnectionMixin:
+    _setup = None  # Timings of a connection set up for a request that has not been answered yet
+    _connected_at = 0.0
+    _request_started = 0.0
+
+    def _new_conn(self):
+        try:
+            return timed_create_connection((self._dns_host, self.port), self.timeout,
+                                           self.source_address, self.socket_options, self._setup)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        except socket.timeout as e:
+            raise ConnectTimeoutError(
+                self, f'Connection to {self.host} timed out. (connect timeout={self.timeout})',
+            ) from e
+        except OSError as e:
+            raise NewConnectionError(self, f'Failed to establish a new connection: {e}') from e
+
+    def connect(self):
+        self._setup = dict(NO_SETUP)
+        start = perf_counter()
+        super().connect()
+        self._connected_at = perf_counter()
+        # Whatever connect() spent past DNS and TCP went on the handshake
+        self._setup['tls'] = max(0.0, self._connected_at - start - self._setup['dns'] - self._setup['connect'])
+
+    def request(self, *args, **kwargs):
+        self._request_started = perf_counter()
+        return super().request(*args, **kwargs)
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        setup, self._setup = self._setup or NO_SETUP, None
+        response.timings = {
+            **setup,
+            'ttfb': perf_counter() - max(self._request_started, self._connected_at),
+            'reused': setup is NO_SETUP,
+        }
+        return response
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+
+def response_timings(response):
+    """The ``timings`` of a ``requests`` response, or None when it was not made through a timed pool."""
+    timings = getattr(response.raw, 'timings', None)
+    return dict(timings) if timings is not None else None
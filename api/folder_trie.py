@@ -0,0 +1,134 @@
+"""Compact path trie behind the ``/process-csv/`` folder analysis.
+
+Each folder is a ``FolderNode`` with ``__slots__`` instead of a dict of
+dicts, children are keyed by interned segment strings, and the per-level
+dicts the response needs are only built on demand by the ``serialize_*``
+functions. Nodes remember the sequence number of the first URL that reached
+them, which is what lets views that regroup nodes (``secondLevelFolders``)
+be derived from the trie with the same ordering and samples as a direct
+aggregation.
+"""
+import sys
+
+
+class FolderNode:
+    __slots__ = ('count', 'non_indexable', 'first_seen', 'sample_url', 'sample_seq',
+                 'children', 'params', 'param_samples')
+
+    def __init__(self, url, seq, leaf=False):
+        self.count = 0
+        self.non_indexable = 0
+        self.first_seen = seq
+        self.sample_url = url
+        self.sample_seq = seq
+        self.children = None if leaf else {}
+        self.params = None
+        self.param_samples = None
+
+    def child(self, segment, url, seq, leaf=False):
+        node = self.children.get(segment)
+        if node is None:
+            node = self.children[sys.intern(segment)] = FolderNode(url, seq, leaf)
+        return node
+
+    def visit(self, url, seq, non_indexable):
+        self.count += 1
+        self.non_indexable += non_indexable
+        if not self.sample_url and url:
+            self.sample_url = url
+            self.sample_seq = seq
+
+    def add_params(self, query_params, url):
+        if self.params is None:
+            self.params = {}
+            self.param_samples = {}
+        for key, values in query_params.items():
+            self.params[key] = self.params.get(key, 0) + len(values)
+            self.param_samples.setdefault(key, url)
+
+    def merge(self, other):
+        """Fold in a node built from later rows (see ``URLStructureAggregator.merge``)."""
+        self.count += other.count
+        self.non_indexable += other.non_indexable
+        if not self.sample_url and other.sample_url:
+            self.sample_url = other.sample_url
+            self.sample_seq = other.sample_seq
+        if other.params is not None:
+            if self.params is None:
+                self.params, self.param_samples = other.params, other.param_samples
+            else:
+                for key, count in other.params.items():
+                    self.params[key] = self.params.get(key, 0) + count
+                for key, sample in other.param_samples.items():
+                    self.param_samples.setdefault(key, sample)
+        if other.children:
+            for segment, other_child in other.children.items():
+                child = self.children.get(segment)
+                if child is None:
+                    self.children[segment] = other_child
+                else:
+                    child.merge(other_child)
+
+
+def serialize_folders(children, depth, with_indexability, level=1):
+    """Render trie levels in the ``folderStructure`` response format."""
+    folders = {}
+    for segment, node in children.items():
+        folder = {'count': node.count}
+        if level < depth:
+            folder['subfolders'] = serialize_folders(node.children, depth, with_indexability, level + 1)
+        folder['params'] = dict(node.params) if node.params else {}
+        folder['paramSamples'] = dict(node.param_samples) if node.param_samples else {}
+        folder['sampleUrl'] = node.sample_url
+        if with_indexability:
+            folder['nonIndexableCount'] = node.non_indexable
+        folders[segment] = folder
+    return folders
+
+
+def group_by_segment(nodes):
+    """Group ``(segment, node)`` pairs from different parents by segment.
+
+    Returns ``{segment: [nodes]}`` ordered by when each segment was first seen.
+    """
+    groups = {}
+    first_seen = {}
+    for segment, node in nodes:
+        groups.setdefault(segment, []).append(node)
+        if segment not in first_seen or node.first_seen < first_seen[segment]:
+            first_seen[segment] = node.first_seen
+    return {segment: groups[segment] for segment in sorted(groups, key=first_seen.__getitem__)}
+
+
+def earliest_sample(nodes):
+    candidates = [node for node in nodes if node.sample_url]
+    if not candidates:
+        return min(nodes, key=lambda node: node.first_seen).sample_url
+    return min(candidates, key=lambda node: node.sample_seq).sample_url
+
+
+def serialize_second_level(root, with_indexability):
+    """Derive ``secondLevelFolders``: second-level folders merged across all first-level folders."""
+    second_level = {}
+    level2_nodes = ((segment, node)
+                    for level1 in root.children.values() if level1.children
+                    for segment, node in level1.children.items())
+    for segment, nodes in group_by_segment(level2_nodes).items():
+        level3_nodes = ((child_segment, child)
+                        for node in nodes if node.children
+                        for child_segment, child in node.children.items())
+        folder = {
+            'count': sum(node.count for node in nodes),
+            'subfolders': {
+                child_segment: {
+                    'count': sum(child.count for child in children),
+                    'sampleUrl': earliest_sample(children),
+                }
+                for child_segment, children in group_by_segment(level3_nodes).items()
+            },
+            'sampleUrl': earliest_sample(nodes),
+        }
+        if with_indexability:
+            folder['nonIndexableCount'] = sum(node.non_indexable for node in nodes)
+        second_level[segment] = folder
+    return second_level
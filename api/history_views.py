@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from .crawl_history import changes_since, normalize_url, url_history
+from .serializers import CrawlChangesQuerySerializer, CrawlHistoryQuerySerializer, URLCheckSerializer
+
+
+class CrawlHistoryView(APIView):
+    """Stored checks of one URL, newest first."""
+
+    def get(self, request):
+        query = CrawlHistoryQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        url = query.validated_data['url']
+        try:
+            normalized_url = normalize_url(url)
+        except ValueError as e:
+            return Response({'url': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        checks = url_history(url, query.validated_data['limit'])
+        return Response({
+            'url': normalized_url,
+            'checks': URLCheckSerializer(checks, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+
+class CrawlChangesView(APIView):
+    """Checks whose status code, SEO fields or redirect chain changed since a date."""
+
+    def get(self, request):
+        query = CrawlChangesQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = query.validated_data
+        since = data.get('since') or timezone.now() - timedelta(days=data['days'])
+        checks = changes_since(since, data['change'], data.get('host'), data['limit'])
+        return Response({
+            'change': data['change'],
+            'since': since,
+            'checks': URLCheckSerializer(checks, many=True).data,
+        }, status=status.HTTP_200_OK)
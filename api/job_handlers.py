@@ -0,0 +1,90 @@
+"""Handlers for the background job kinds (see ``api.jobs``)."""
+from itertools import chain
+
+from django.conf import settings
+
+from .bulk_checker import BulkURLChecker
+from .crawl_history import record_results
+from .csv_ingest import iter_url_rows
+from .jobs import job_handler
+from .models import Job
+from .politeness import HostScheduler
+from .redirect_graph import RedirectGraph
+from .robots_cache import compile_robots
+from .robots_coverage import RobotsCoverage
+from .sitemap_checker import check_sitemaps
+from .url_structure import URLStructureAggregator
+
+PROGRESS_EVERY_ROWS = 10000
+
+
+@job_handler(Job.KIND_PROCESS_CSV)
+def process_csv(context):
+    aggregator = URLStructureAggregator(context.params.get('depth') or settings.CSV_FOLDER_DEPTH)
+    for count, (url, indexable) in enumerate(iter_url_rows(context.open_input()), start=1):
+        aggregator.add(url, indexable)
+        if count % PROGRESS_EVERY_ROWS == 0:
+            context.report_progress(count)
+    context.report_progress(aggregator.seq, force=True)
+    return aggregator.result()
+
+
+@job_handler(Job.KIND_BULK_CHECK)
+def bulk_check(context):
+    params = context.params
+    urls = list(params.get('urls') or [])
+    if context.job.input_chunks.exists():
+        urls += [url.strip() for url, _ in iter_url_rows(context.open_input()) if url.strip()]
+    context.set_total(len(urls))
+
+    checker = BulkURLChecker(
+        concurrency=settings.BULK_CHECK_CONCURRENCY,
+        per_host_limit=settings.BULK_CHECK_PER_HOST_LIMIT,
+        user_agent=params.get('user_agent'),
+        use_cache=not params.get('no_cache'),
+        redirect_graph=RedirectGraph(
+            max_chain_length=params.get('max_chain_length') or settings.REDIRECT_LONG_CHAIN_HOPS,
+        ),
+        scheduler=HostScheduler(honor_crawl_delay=bool(params.get('honor_crawl_delay'))),
+    )
+    results = checker.run(urls, on_result=context.report_progress)
+    record_results(results, 'job')
+    context.report_progress(len(results), force=True)
+    failed = sum(1 for result in results if 'error' in result)
+    return {
+        'results': results,
+        'redirect_analysis': checker.redirect_graph.stats(),
+        'summary': {
+            'total': len(results),
+            'succeeded': len(results) - failed,
+            'failed': failed,
+        },
+        'politeness': checker.scheduler.stats(),
+    }
+
+
+@job_handler(Job.KIND_SITEMAP_CHECK)
+def sitemap_check(context):
+    urls = context.params.get('urls') or []
+    context.set_total(len(set(urls)))
+    # No overall deadline here; each check is still bounded by its own timeout.
+    sitemaps = check_sitemaps(urls, on_result=context.report_progress)
+    context.report_progress(len(sitemaps), force=True)
+    return {'sitemaps': sitemaps}
+
+
+@job_handler(Job.KIND_ROBOTS_COVERAGE)
+def robots_coverage(context):
+    params = context.params
+    urls = iter(params.get('urls') or [])
+    if context.job.input_chunks.exists():
+        rows = (url.strip() for url, _ in iter_url_rows(context.open_input()))
+        urls = chain(urls, (url for url in rows if url))
+
+    coverage = RobotsCoverage(compile_robots(params['robots_content']), params.get('user_agents'))
+    for count, url in enumerate(urls, start=1):
+        coverage.add(url)
+        if count % PROGRESS_EVERY_ROWS == 0:
+            context.report_progress(count)
+    context.report_progress(coverage.urls_tested + coverage.urls_invalid, force=True)
+    return coverage.result()
@@ -0,0 +1,56 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from .serializers import JobSubmitSerializer, JobSerializer
+from .jobs import submit_job, cancel_job
+from .models import Job
+
+
+def job_payload(request, job):
+    data = JobSerializer(job).data
+    data['status_url'] = request.build_absolute_uri(reverse('job_detail', args=[job.pk]))
+    if job.status == Job.STATUS_SUCCEEDED:
+        data['result_url'] = request.build_absolute_uri(reverse('job_result', args=[job.pk]))
+    return data
+
+
+class JobSubmitView(APIView):
+    def post(self, request):
+        serializer = JobSubmitSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        params = {key: value for key, value in data.items() if key not in ('kind', 'file')}
+        job = submit_job(data['kind'], params=params, input_file=data.get('file'))
+        return Response(job_payload(request, job), status=status.HTTP_202_ACCEPTED)
+
+
+class JobDetailView(APIView):
+    def get(self, request, job_id):
+        job = get_object_or_404(Job.objects.defer('result'), pk=job_id)
+        return Response(job_payload(request, job), status=status.HTTP_200_OK)
+
+
+class JobCancelView(APIView):
+    def post(self, request, job_id):
+        job = get_object_or_404(Job.objects.defer('result'), pk=job_id)
+        if job.is_finished:
+            return Response({'error': f"Job already {job.status}."}, status=status.HTTP_409_CONFLICT)
+        job = cancel_job(job)
+        return Response(job_payload(request, job), status=status.HTTP_200_OK)
+
+
+class JobResultView(APIView):
+    def get(self, request, job_id):
+        job = get_object_or_404(Job, pk=job_id)
+        if job.status != Job.STATUS_SUCCEEDED:
+            return Response({'error': f"Job is {job.status}; no result available.", 'status': job.status},
+                            status=status.HTTP_409_CONFLICT)
+        response = JsonResponse(job.result, safe=False)
+        if request.GET.get('download'):
+            response['Content-Disposition'] = f'attachment; filename="{job.kind}-{job.pk}.json"'
+        return response
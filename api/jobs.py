@@ -0,0 +1,245 @@
+"""Database-backed background jobs.
+
+The ``Job`` table is the queue: web requests insert a row (plus the uploaded
+input as ``JobInputChunk`` rows) and return straight away, and ``manage.py
+run_jobs`` workers claim queued rows with a conditional UPDATE, which works
+the same on PostgreSQL and SQLite without an external broker. Handlers
+report progress through a ``JobContext``, which also notices cancellation
+requests and keeps the job's heartbeat fresh so jobs of crashed workers can
+be requeued.
+"""
+from datetime import timedelta
+import io
+import logging
+import os
+import socket
+import time
+import traceback
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobInputChunk
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def owned_job(job):
+    """``job``'s row as long as this run still owns it.
+
+    A run that stopped heartbeating may have been requeued and claimed by
+    another worker meanwhile; its writes must then match no row.
+    """
+    return Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING, worker=job.worker, started_at=job.started_at)
+
+
+def job_handler(kind):
+    """Register ``func(context)`` as the handler for jobs of ``kind``."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+# Submission
+
+def submit_job(kind, params=None, input_file=None):
+    """Queue a job, storing ``input_file`` (if any) in the database."""
+    chunk_size = settings.JOB_INPUT_CHUNK_SIZE
+    with transaction.atomic():
+        job = Job.objects.create(kind=kind, params=params or {})
+        if input_file is not None:
+            input_file.seek(0)
+            seq = 0
+            while True:
+                data = input_file.read(chunk_size)
+                if not data:
+                    break
+                JobInputChunk.objects.create(job=job, seq=seq, data=data)
+                seq += 1
+    return job
+
+
+def cancel_job(job):
+    """Cancel a queued job right away, or ask the worker running it to stop."""
+    updated = Job.objects.filter(pk=job.pk, status=Job.STATUS_QUEUED).update(
+        status=Job.STATUS_CANCELLED,
+        finished_at=timezone.now(),
+        expires_at=timezone.now() + timedelta(seconds=settings.JOB_RESULT_TTL),
+    )
+    if not updated:
+        Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING).update(cancel_requested=True)
+    job.refresh_from_db()
+    return job
+
+
+# Reading stored input
+
+class JobInputStream(io.RawIOBase):
+    """Read-only stream over a job's ``JobInputChunk`` rows, fetched one chunk at a time."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._seq = 0
+        self._buffer = b''
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # Only rewinding is needed (encoding detection reads a sample, then starts over).
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation('JobInputStream can only seek to the start.')
+        self._seq = 0
+        self._buffer = b''
+        self._position = 0
+        return 0
+
+    def readinto(self, buffer):
+        if not self._buffer:
+            chunk = (JobInputChunk.objects.filter(job_id=self.job_id, seq=self._seq)
+                     .values_list('data', flat=True).first())
+            if chunk is None:
+                return 0
+            self._buffer = bytes(chunk)
+            self._seq += 1
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        self._position += size
+        return size
+
+
+def open_job_input(job):
+    return io.BufferedReader(JobInputStream(job.pk), buffer_size=settings.JOB_INPUT_CHUNK_SIZE)
+
+
+# Running
+
+class JobContext:
+    def __init__(self, job):
+        self.job = job
+        self.params = job.params
+        self._last_report = 0.0
+
+    def open_input(self):
+        return open_job_input(self.job)
+
+    def set_total(self, total):
+        self.job.total = total
+        owned_job(self.job).update(total=total)
+
+    def report_progress(self, progress, force=False):
+        """Record progress and heartbeat at most once per JOB_PROGRESS_INTERVAL seconds.
+
+        Raises ``JobCancelled`` when the job was cancelled in the meantime,
+        or requeued because this run was taken for dead.
+        """
+        self.job.progress = progress
+        now = time.monotonic()
+        if not force and now - self._last_report < settings.JOB_PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        if not owned_job(self.job).update(progress=progress, heartbeat_at=timezone.now()):
+            logger.warning('Job %s was requeued while %s was running it; stopping', self.job.pk, self.job.worker)
+            raise JobCancelled()
+        if Job.objects.filter(pk=self.job.pk, cancel_requested=True).exists():
+            raise JobCancelled()
+
+
+def claim_next_job(worker=None):
+    """Claim the oldest queued job for this worker, or return None when the queue is empty."""
+    worker = worker or worker_name()
+    candidates = (Job.objects.filter(status=Job.STATUS_QUEUED)
+                  .order_by('created_at').values_list('pk', flat=True)[:10])
+    for pk in candidates:
+        now = timezone.now()
+        # Only one worker's UPDATE can match a still-queued row.
+        claimed = Job.objects.filter(pk=pk, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING,
+            worker=worker,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def finish_job(job, status, result=None, error=''):
+    """Record the outcome of this run of ``job``; returns False when the run no longer owns the job."""
+    now = timezone.now()
+    finished = owned_job(job).update(
+        status=status,
+        result=result,
+        error=error,
+        progress=job.progress,
+        finished_at=now,
+        heartbeat_at=now,
+        expires_at=now + timedelta(seconds=settings.JOB_RESULT_TTL),
+    )
+    if not finished:
+        logger.warning('Job %s was requeued while %s was running it; its outcome is dropped', job.pk, job.worker)
+    return bool(finished)
+
+
+def run_job(job):
+    handler = HANDLERS.get(job.kind)
+    if handler is None:
+        finish_job(job, Job.STATUS_FAILED, error=f"Unknown job kind '{job.kind}'.")
+        return
+    context = JobContext(job)
+    try:
+        result = handler(context)
+    except JobCancelled:
+        logger.info('Job %s cancelled', job.pk)
+        finish_job(job, Job.STATUS_CANCELLED)
+    except Exception as e:
+        logger.error('Job %s failed: %s\n%s', job.pk, e, traceback.format_exc())
+        finish_job(job, Job.STATUS_FAILED, error=str(e))
+    else:
+        finish_job(job, Job.STATUS_SUCCEEDED, result=result)
+
+
+# Housekeeping
+
+def requeue_stale_jobs():
+    """Requeue running jobs whose worker stopped sending heartbeats (or fail them after too many tries)."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_STALE_AFTER)
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, heartbeat_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=settings.JOB_MAX_ATTEMPTS).update(
+        status=Job.STATUS_FAILED,
+        error='Worker stopped responding.',
+        finished_at=timezone.now(),
+        expires_at=timezone.now() + timedelta(seconds=settings.JOB_RESULT_TTL),
+    )
+    requeued = stale.filter(attempts__lt=settings.JOB_MAX_ATTEMPTS).update(
+        status=Job.STATUS_QUEUED, worker='', progress=0,
+    )
+    return requeued, failed
+
+
+def purge_expired_jobs():
+    """Delete finished jobs (and their stored input) whose results have expired."""
+    deleted, _ = Job.objects.filter(expires_at__lt=timezone.now()).delete()
+    return deleted
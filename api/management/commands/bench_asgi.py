@@ -0,0 +1,23 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import servers
+
+
+class Command(BaseCommand):
+    help = 'Compare WSGI and ASGI throughput of URL checks against a local slow origin.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument('--delay', type=float, default=0.2, help='Seconds the origin waits before answering.')
+        parser.add_argument('--workers', type=int, default=1, help='Gunicorn workers per server.')
+        parser.add_argument('--threads', type=int, default=1, help='Threads per WSGI worker.')
+        parser.add_argument('--servers', default='wsgi,asgi', help='Comma-separated: wsgi, asgi.')
+
+    def handle(self, *args, **options):
+        kinds = [kind for kind in options['servers'].split(',') if kind in servers.PATHS]
+        result = servers.run(options['requests'], options['concurrency'], options['delay'],
+                             options['workers'], options['threads'], kinds)
+        self.stdout.write(json.dumps({'benchmark': 'asgi', **result}, indent=2))
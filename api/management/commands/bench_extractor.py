@@ -0,0 +1,21 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import extraction
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the single-pass SEO extractor against the BeautifulSoup path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages-dir', help='Directory of saved .html pages. Defaults to synthetic pages.')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        pages = extraction.load_pages(options['pages_dir'])
+        if not pages:
+            self.stderr.write('No pages found.')
+            return
+        results = extraction.run(pages, repeat=options['repeat'])
+        self.stdout.write(json.dumps({'benchmark': 'extractor', 'results': results}, indent=2))
@@ -0,0 +1,25 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import process_urls
+
+
+class Command(BaseCommand):
+    help = 'Benchmark serial against parallel /process-csv/ aggregation by worker count.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500_000)
+        parser.add_argument('--workers', default=None,
+                            help='Comma-separated worker counts. Defaults to 2, 4, ... up to the CPU count.')
+        parser.add_argument('--chunk-size', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        if options['workers']:
+            worker_counts = [int(value) for value in options['workers'].split(',')]
+        else:
+            cpus = os.cpu_count() or 1
+            worker_counts = [count for count in (2, 4, 8, 16, 32) if count <= cpus] or [2]
+        result = process_urls.run(options['rows'], worker_counts, options['chunk_size'])
+        self.stdout.write(json.dumps({'benchmark': 'process_urls', **result}, indent=2))
@@ -0,0 +1,19 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import robots
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the compiled robots.txt matcher against RobotExclusionRulesParser.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rules', type=int, default=300, help='Rules per user-agent group.')
+        parser.add_argument('--urls', type=int, default=20000)
+        parser.add_argument('--agents', default=None, help='Comma-separated user agents to test.')
+
+    def handle(self, *args, **options):
+        agents = options['agents'].split(',') if options['agents'] else None
+        result = robots.run(options['rules'], options['urls'], agents)
+        self.stdout.write(json.dumps({'benchmark': 'robots_matcher', **result}, indent=2))
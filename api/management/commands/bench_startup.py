@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import startup, suite
+
+
+class Command(BaseCommand):
+    help = 'Time cold starts (fresh interpreters) stage by stage, with import time by package, as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stages', default=','.join(startup.STAGES),
+                            help=f"Comma-separated, from: {', '.join(startup.STAGES)}.")
+        parser.add_argument('--repeat', type=int, default=10, help='Fresh interpreters per stage.')
+        parser.add_argument('--top', type=int, default=15, help='Packages listed per stage, by import time.')
+        parser.add_argument('--output', help='Write the report to this file instead of stdout.')
+        parser.add_argument('--baseline', help='A previous report to compare each stage with.')
+
+    def handle(self, *args, **options):
+        stages = [stage for stage in options['stages'].split(',') if stage]
+        unknown = [stage for stage in stages if stage not in startup.STAGES]
+        if unknown:
+            raise CommandError(f"Unknown stages: {', '.join(unknown)}")
+
+        report = {
+            'environment': suite.environment(),
+            'options': {key: options[key] for key in ('repeat', 'top')},
+            'results': startup.run(stages, options['repeat'], options['top'],
+                                   progress=lambda stage: self.stderr.write(f'Running {stage}')),
+        }
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as handle:
+                report = suite.compare(report, json.load(handle))
+
+        output = json.dumps({'benchmark': 'startup', **report}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(output)
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import suite
+
+
+def int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+class Command(BaseCommand):
+    help = 'Run the benchmark suite and write p50/p95/p99 latencies and peak memory as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(suite.SCENARIOS),
+                            help=f"Comma-separated, from: {', '.join(suite.SCENARIOS)}.")
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case.')
+        parser.add_argument('--requests', type=int, default=200, help='Timed URL checks per check_url case.')
+        parser.add_argument('--origin-delay', type=float, default=0.0,
+                            help='Seconds the stand-in origin waits before answering.')
+        parser.add_argument('--smtp-delay', type=float, default=0.2,
+                            help='Seconds the slow stand-in SMTP server waits to greet and to accept each email.')
+        parser.add_argument('--outbox-batch', type=int, default=20, help='Emails per outbox drain.')
+        parser.add_argument('--sizes', type=int_list, default=[10_000, 1_000_000],
+                            help='CSV rows for process_urls and compare_csv.')
+        parser.add_argument('--rule-counts', type=int_list, default=[100, 1000],
+                            help='Rules per user-agent group for parse_robots; the first is used by the robots views.')
+        parser.add_argument('--url-counts', type=int_list, default=[1000, 10000],
+                            help='Test URLs per request for the robots views.')
+        parser.add_argument('--output', help='Write the report to this file instead of stdout.')
+        parser.add_argument('--baseline', help='A previous report to compare each case with.')
+
+    def handle(self, *args, **options):
+        names = [name for name in options['scenarios'].split(',') if name]
+        unknown = [name for name in names if name not in suite.SCENARIOS]
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(unknown)}")
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as handle:
+                baseline = json.load(handle)
+
+        suite_options = {key: options[key] for key in
+                         ('repeat', 'requests', 'origin_delay', 'smtp_delay', 'outbox_batch', 'sizes',
+                          'rule_counts', 'url_counts')}
+        report = suite.run(names, suite_options, progress=lambda case: self.stderr.write(f'Running {case}'))
+        if baseline is not None:
+            report = suite.compare(report, baseline)
+
+        output = json.dumps({'benchmark': 'suite', **report}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(output)
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(output)
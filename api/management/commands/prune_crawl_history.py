@@ -0,0 +1,28 @@
+from datetime import timedelta
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.crawl_history import prune
+
+
+class Command(BaseCommand):
+    help = 'Compact old crawl history to its changes and delete history past the retention period.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--compact-after-days', type=int, default=settings.CRAWL_HISTORY_COMPACT_AFTER_DAYS,
+                            help='Keep only changed checks once they are this old.')
+        parser.add_argument('--retention-days', type=int, default=settings.CRAWL_HISTORY_RETENTION_DAYS,
+                            help='Delete checks (and URLs last checked) longer ago than this.')
+
+    def handle(self, *args, **options):
+        if options['compact_after_days'] > options['retention_days']:
+            raise CommandError('--compact-after-days cannot be longer than --retention-days.')
+        now = timezone.now()
+        deleted = prune(
+            compact_before=now - timedelta(days=options['compact_after_days']),
+            delete_before=now - timedelta(days=options['retention_days']),
+        )
+        self.stdout.write(json.dumps({'deleted': deleted}))
@@ -0,0 +1,51 @@
+import logging
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api import job_handlers  # noqa: F401  (registers the job handlers)
+from api.jobs import claim_next_job, run_job, requeue_stale_jobs, purge_expired_jobs, worker_name
+
+logger = logging.getLogger(__name__)
+
+HOUSEKEEPING_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queue is empty instead of polling for new jobs.')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+        worker = worker_name()
+        logger.info('Job worker %s started', worker)
+        last_housekeeping = 0.0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - last_housekeeping > HOUSEKEEPING_INTERVAL:
+                requeue_stale_jobs()
+                purge_expired_jobs()
+                last_housekeeping = time.monotonic()
+
+            job = claim_next_job(worker)
+            if job is None:
+                if options['burst']:
+                    break
+                time.sleep(settings.JOB_POLL_INTERVAL)
+                continue
+            logger.info('Running job %s (%s)', job.pk, job.kind)
+            run_job(job)
+        logger.info('Job worker %s stopped', worker)
+
+    def request_stop(self, signum, frame):
+        # Finish the current job, then exit; a job cut off by a hard kill is requeued as stale.
+        self.stopping = True
@@ -0,0 +1,43 @@
+import logging
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.outbox import purge_sent_emails, send_pending
+
+logger = logging.getLogger(__name__)
+
+HOUSEKEEPING_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Send the email outbox (the mailer process of the Procfile).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no email is due instead of polling for new ones.')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+        last_housekeeping = 0.0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - last_housekeeping > HOUSEKEEPING_INTERVAL:
+                purge_sent_emails()
+                last_housekeeping = time.monotonic()
+            counts = send_pending()
+            if any(counts.values()):
+                logger.info('Outbox: %s', counts)
+            if options['burst']:
+                break
+            time.sleep(settings.OUTBOX_POLL_INTERVAL)
+
+    def request_stop(self, signum, frame):
+        # Finish the current batch, then exit; emails it claimed are retried after OUTBOX_CLAIM_TIMEOUT.
+        self.stopping = True
@@ -0,0 +1,115 @@
+"""Prometheus metrics, served at ``/metrics``.
+
+- ``http_request_duration_seconds``: latency of every request, by method,
+  route and status (recorded by ``backend_project.middleware.MetricsMiddleware``).
+- ``http_requests_in_progress`` and ``url_checks_in_progress``: in-flight
+  requests and outbound URL checks.
+- ``fetch_phase_duration_seconds``: outbound fetch phases per hop (dns,
+  connect, tls, ttfb, download) and the SEO extraction of final pages (parse).
+- ``cache_lookups_total``, ``cache_hit_ratio`` and ``cache_revalidations_total``:
+  read from the caches' own counters at scrape time.
+
+With several worker processes, set ``PROMETHEUS_MULTIPROC_DIR`` to a
+directory shared by them (and emptied on deploy), so that a scrape of any
+worker reports all of them. Cache counters are per process in that mode.
+"""
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Gauge, Histogram, generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from .fetch_cache import get_fetch_cache
+from .robots_cache import get_compiled_cache, get_robots_fetch_cache
+
+SETUP_PHASES = ('dns', 'connect', 'tls')
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time to answer a request',
+    ['method', 'route', 'status'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress', 'Requests being answered',
+    ['method'], multiprocess_mode='livesum',
+)
+FETCH_PHASE = Histogram(
+    'fetch_phase_duration_seconds', 'Time spent in each phase of an outbound fetch',
+    ['phase'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+CHECKS_IN_PROGRESS = Gauge(
+    'url_checks_in_progress', 'Outbound URL checks in flight',
+    multiprocess_mode='livesum',
+)
+
+
+def observe_check(result):
+    """Record the fetch phases of a finished ``check_url`` result."""
+    for step in result['redirect_steps']:
+        timings = step.get('timings')
+        if not timings:
+            continue
+        # A reused connection had no setup; its zeros would only drag the setup phases down
+        phases = ('ttfb', 'download') if timings.get('reused') else SETUP_PHASES + ('ttfb', 'download')
+        for phase in phases:
+            if timings.get(phase) is not None:
+                FETCH_PHASE.labels(phase).observe(timings[phase])
+    if result.get('parse_time') is not None:
+        FETCH_PHASE.labels('parse').observe(result['parse_time'])
+
+
+class CacheCollector:
+    """Hit and miss counters of the process's caches, read at scrape time."""
+
+    def caches(self):
+        return {
+            'fetch': get_fetch_cache(),
+            'robots_fetch': get_robots_fetch_cache(),
+            'robots_compiled': get_compiled_cache(),
+        }
+
+    def collect(self):
+        lookups = CounterMetricFamily('cache_lookups', 'Cache lookups', labels=['cache', 'result'])
+        hit_ratio = GaugeMetricFamily('cache_hit_ratio', 'Share of cache lookups that were hits', labels=['cache'])
+        revalidations = CounterMetricFamily(
+            'cache_revalidations', 'Stale entries confirmed by a 304', labels=['cache'],
+        )
+        for name, cache in self.caches().items():
+            if cache is None:
+                continue
+            stats = cache.stats()
+            lookups.add_metric([name, 'hit'], stats['hits'])
+            lookups.add_metric([name, 'miss'], stats['misses'])
+            if stats['hit_rate'] is not None:
+                hit_ratio.add_metric([name], stats['hit_rate'])
+            if 'revalidations' in stats:
+                revalidations.add_metric([name], stats['revalidations'])
+        yield lookups
+        yield hit_ratio
+        yield revalidations
+
+
+REGISTRY.register(CacheCollector())
+
+
+def scrape():
+    """The exposition text of all metrics, merged across processes in multiprocess mode."""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        registry.register(CacheCollector())
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(scrape(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_job_jobinputchunk'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('process_csv', 'Process CSV'), ('bulk_check', 'Bulk URL check'), ('sitemap_check', 'Sitemap check')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RedirectChain',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chain_hash', models.CharField(max_length=32, unique=True)),
+                ('hops', models.JSONField()),
+                ('hop_count', models.PositiveSmallIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CrawledURL',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.TextField()),
+                ('url_hash', models.CharField(max_length=32, unique=True)),
+                ('host', models.CharField(db_index=True, max_length=255)),
+                ('first_seen_at', models.DateTimeField(auto_now_add=True)),
+                ('last_checked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('last_fingerprint', models.CharField(blank=True, max_length=32)),
+                ('last_chain', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='latest_for', to='api.redirectchain')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='URLCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checked_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source', models.CharField(max_length=20)),
+                ('initial_status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('final_status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('previous_status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('response_time', models.FloatField(blank=True, null=True)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('meta_title', models.TextField(blank=True, null=True)),
+                ('meta_description', models.TextField(blank=True, null=True)),
+                ('h1', models.TextField(blank=True, null=True)),
+                ('h1_count', models.PositiveSmallIntegerField(default=0)),
+                ('canonical', models.TextField(blank=True, null=True)),
+                ('meta_robots', models.CharField(blank=True, max_length=255, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('fingerprint', models.CharField(blank=True, max_length=32)),
+                ('is_first', models.BooleanField(default=False)),
+                ('status_changed', models.BooleanField(default=False)),
+                ('seo_changed', models.BooleanField(default=False)),
+                ('redirect_changed', models.BooleanField(default=False)),
+                ('chain', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='checks', to='api.redirectchain')),
+                ('url', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='checks', to='api.crawledurl')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['url', '-checked_at'], name='urlcheck_url_history'), models.Index(fields=['checked_at'], name='urlcheck_checked_at'), models.Index(condition=models.Q(('status_changed', True)), fields=['checked_at'], name='urlcheck_status_changes'), models.Index(condition=models.Q(('seo_changed', True)), fields=['checked_at'], name='urlcheck_seo_changes'), models.Index(condition=models.Q(('redirect_changed', True)), fields=['checked_at'], name='urlcheck_redirect_changes')],
+            },
+        ),
+    ]
@@ -1,4 +1,7 @@
+import uuid
+
 from django.db import models
+from django.utils import timezone
 
 # Create your models here
 
@@ -10,4 +13,179 @@ class ContactMessage(models.Model):
     submitted_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.name} - {self.subject}"
\ No newline at end of file
+        return f"{self.name} - {self.subject}"
+
+
+class OutboundEmail(models.Model):
+    """An email in the outbox; ``outbox.send_pending`` delivers it in the background."""
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    contact_message = models.ForeignKey(ContactMessage, null=True, blank=True, on_delete=models.SET_NULL,
+                                        related_name='emails')
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # When a pending email is due, or when the claim of a sending one expires
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} ({self.status})"
+
+class Job(models.Model):
+    """A background job run by the ``run_jobs`` worker; the table doubles as the queue."""
+    KIND_PROCESS_CSV = 'process_csv'
+    KIND_BULK_CHECK = 'bulk_check'
+    KIND_SITEMAP_CHECK = 'sitemap_check'
+    KIND_ROBOTS_COVERAGE = 'robots_coverage'
+    KIND_CHOICES = [
+        (KIND_PROCESS_CSV, 'Process CSV'),
+        (KIND_BULK_CHECK, 'Bulk URL check'),
+        (KIND_SITEMAP_CHECK, 'Sitemap check'),
+        (KIND_ROBOTS_COVERAGE, 'Robots rule coverage'),
+    ]
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_CANCELLED, 'Cancelled'),
+    ]
+    FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    params = models.JSONField(default=dict, blank=True)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    cancel_requested = models.BooleanField(default=False)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    def __str__(self):
+        return f"{self.kind} {self.id} ({self.status})"
+
+
+class JobInputChunk(models.Model):
+    """A slice of a job's uploaded input, stored in the database so any worker can read it."""
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='input_chunks')
+    seq = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        ordering = ['seq']
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'seq'], name='unique_job_input_chunk'),
+        ]
+
+
+class CrawledURL(models.Model):
+    """A URL seen by the URL checks, stored once; its latest check is copied here to flag changes."""
+    url = models.TextField()
+    url_hash = models.CharField(max_length=32, unique=True)  # Of the normalized URL
+    host = models.CharField(max_length=255, db_index=True)
+    first_seen_at = models.DateTimeField(auto_now_add=True)
+    last_checked_at = models.DateTimeField(null=True, blank=True)
+    last_status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    last_fingerprint = models.CharField(max_length=32, blank=True)
+    last_chain = models.ForeignKey('RedirectChain', null=True, blank=True, on_delete=models.SET_NULL,
+                                   related_name='latest_for')
+
+    def __str__(self):
+        return self.url
+
+
+class RedirectChain(models.Model):
+    """A redirect chain, shared by every check that followed the same hops."""
+    chain_hash = models.CharField(max_length=32, unique=True)
+    hops = models.JSONField()  # [[url, status_code], ...] from the checked URL to the final one
+    hop_count = models.PositiveSmallIntegerField()
+
+    def __str__(self):
+        return f"{self.hop_count} hops to {self.hops[-1][0]}"
+
+
+class URLCheck(models.Model):
+    """One check of a URL. The *_changed flags compare it with the previous check of the same URL."""
+    # Indexed through urlcheck_url_history, which starts with it
+    url = models.ForeignKey(CrawledURL, on_delete=models.CASCADE, related_name='checks', db_index=False)
+    checked_at = models.DateTimeField(default=timezone.now)
+    source = models.CharField(max_length=20)  # check, bulk_check or job
+    initial_status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    final_status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    previous_status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    chain = models.ForeignKey(RedirectChain, null=True, blank=True, on_delete=models.PROTECT,
+                              related_name='checks')  # None when the URL did not redirect
+    response_time = models.FloatField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    meta_title = models.TextField(null=True, blank=True)
+    meta_description = models.TextField(null=True, blank=True)
+    h1 = models.TextField(null=True, blank=True)  # The first H1
+    h1_count = models.PositiveSmallIntegerField(default=0)
+    canonical = models.TextField(null=True, blank=True)
+    meta_robots = models.CharField(max_length=255, null=True, blank=True)
+    error = models.TextField(blank=True)
+    fingerprint = models.CharField(max_length=32, blank=True)  # Of the SEO fields, to compare checks cheaply
+    is_first = models.BooleanField(default=False)
+    status_changed = models.BooleanField(default=False)
+    seo_changed = models.BooleanField(default=False)
+    redirect_changed = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['url', '-checked_at'], name='urlcheck_url_history'),
+            models.Index(fields=['checked_at'], name='urlcheck_checked_at'),
+            # Partial indexes: only the few rows that changed are indexed
+            models.Index(fields=['checked_at'], condition=models.Q(status_changed=True),
+                         name='urlcheck_status_changes'),
+            models.Index(fields=['checked_at'], condition=models.Q(seo_changed=True),
+                         name='urlcheck_seo_changes'),
+            models.Index(fields=['checked_at'], condition=models.Q(redirect_changed=True),
+                         name='urlcheck_redirect_changes'),
+        ]
+
+    def __str__(self):
+        return f"{self.url_id} {self.final_status_code} at {self.checked_at}"
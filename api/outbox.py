@@ -0,0 +1,165 @@
+"""Database-backed outbox for the emails the app sends.
+
+Requests only add an ``OutboundEmail`` row (``enqueue_email``), in the same
+transaction as whatever the email is about, and return without talking to
+the mail server. ``send_pending`` drains due emails in batches over one
+reused SMTP connection. Batches are claimed with a conditional UPDATE, as
+jobs are, so several senders never send the same email. A failed email is
+retried with exponential backoff until OUTBOX_MAX_ATTEMPTS, and an email
+claimed by a sender that died is picked up again after OUTBOX_CLAIM_TIMEOUT.
+When the mail server cannot be reached at all, the emails are not at fault:
+they are released after OUTBOX_BACKOFF_BASE without spending an attempt, so
+an outage, however long, never gives up on them.
+"""
+from datetime import timedelta
+import logging
+import smtplib
+import uuid
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(subject, body, recipients, from_email=None, contact_message=None):
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        recipients=list(recipients),
+        from_email=from_email or '',  # Blank: DEFAULT_FROM_EMAIL at sending time
+        contact_message=contact_message,
+    )
+
+
+def due_emails(now):
+    # A sending email is due again once its claim has expired
+    return OutboundEmail.objects.filter(
+        status__in=(OutboundEmail.STATUS_PENDING, OutboundEmail.STATUS_SENDING),
+        next_attempt_at__lte=now,
+    )
+
+
+def claim_batch(size):
+    """Claim up to ``size`` due emails for this sender, oldest due first."""
+    now = timezone.now()
+    candidates = list(due_emails(now).order_by('next_attempt_at').values_list('pk', flat=True)[:size])
+    if not candidates:
+        return []
+    token = uuid.uuid4().hex
+    # Rows another sender claimed in the meantime are no longer due, so they don't match.
+    due_emails(now).filter(pk__in=candidates).update(
+        status=OutboundEmail.STATUS_SENDING,
+        claim_token=token,
+        next_attempt_at=now + timedelta(seconds=settings.OUTBOX_CLAIM_TIMEOUT),
+        attempts=F('attempts') + 1,
+    )
+    return list(OutboundEmail.objects.filter(claim_token=token, status=OutboundEmail.STATUS_SENDING).order_by('pk'))
+
+
+def is_permanent(error):
+    """Whether the server rejected the email itself, so sending it again would fail again."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return (isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+            and not isinstance(error, smtplib.SMTPAuthenticationError))
+
+
+def backoff(attempts):
+    return min(settings.OUTBOX_MAX_BACKOFF, settings.OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1))
+
+
+def mark_sent(email):
+    OutboundEmail.objects.filter(pk=email.pk, claim_token=email.claim_token).update(
+        status=OutboundEmail.STATUS_SENT, sent_at=timezone.now(), claim_token='', last_error='',
+    )
+
+
+def mark_failed(email, error):
+    """Schedule a retry of ``email``, or give up on it; returns True when it will be retried."""
+    retry = not is_permanent(error) and email.attempts < settings.OUTBOX_MAX_ATTEMPTS
+    if retry:
+        updates = {
+            'status': OutboundEmail.STATUS_PENDING,
+            'next_attempt_at': timezone.now() + timedelta(seconds=backoff(email.attempts)),
+        }
+    else:
+        updates = {'status': OutboundEmail.STATUS_FAILED}
+    OutboundEmail.objects.filter(pk=email.pk, claim_token=email.claim_token).update(
+        claim_token='', last_error=str(error) or error.__class__.__name__, **updates,
+    )
+    return retry
+
+
+def release_claim(emails, error):
+    """Give claimed ``emails`` back for a retry, without spending the attempt of this claim."""
+    OutboundEmail.objects.filter(pk__in=[email.pk for email in emails], claim_token=emails[0].claim_token).update(
+        status=OutboundEmail.STATUS_PENDING,
+        next_attempt_at=timezone.now() + timedelta(seconds=settings.OUTBOX_BACKOFF_BASE),
+        attempts=F('attempts') - 1,
+        claim_token='',
+        last_error=str(error) or error.__class__.__name__,
+    )
+
+
+def send_batch(emails, connection, counts):
+    """Send claimed ``emails`` over ``connection``, adding up the outcomes in ``counts``.
+
+    Raises the error when the mail server cannot be reached, after
+    releasing the unsent emails for a retry.
+    """
+    def record_failure(email, error):
+        counts['retrying' if mark_failed(email, error) else 'failed'] += 1
+
+    for index, email in enumerate(emails):
+        try:
+            connection.open()  # Reconnects only if a previous error closed the connection
+        except Exception as e:
+            release_claim(emails[index:], e)
+            counts['retrying'] += len(emails) - index
+            raise
+        message = EmailMessage(email.subject, email.body, email.from_email or None, email.recipients,
+                               connection=connection)
+        try:
+            connection.send_messages([message])
+        except Exception as e:
+            logger.warning('Sending email %s failed (attempt %s): %s', email.pk, email.attempts, e)
+            record_failure(email, e)
+            # The session may be unusable after an error; start a new one for the next email
+            connection.close()
+        else:
+            mark_sent(email)
+            counts['sent'] += 1
+
+
+def send_pending(batch_size=None):
+    """Send every due email, batch by batch, over one SMTP connection; returns the counts by outcome."""
+    counts = {'sent': 0, 'retrying': 0, 'failed': 0}
+    connection = None
+    try:
+        while True:
+            emails = claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+            if not emails:
+                break
+            if connection is None:
+                connection = get_connection()
+            try:
+                send_batch(emails, connection, counts)
+            except (smtplib.SMTPException, OSError) as e:
+                logger.error('Cannot reach the mail server, will retry: %s', e)
+                break
+    finally:
+        if connection is not None:
+            connection.close()
+    return counts
+
+
+def purge_sent_emails():
+    """Delete sent emails older than OUTBOX_SENT_TTL."""
+    cutoff = timezone.now() - timedelta(seconds=settings.OUTBOX_SENT_TTL)
+    deleted, _ = OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENT, sent_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,103 @@
+"""Incremental reading of the final page body within a byte budget.
+
+``PageBodyReader`` is fed the response body chunk by chunk as it downloads.
+It decodes and tokenizes each chunk straight away and tells the caller when
+to stop reading: once the head plus ``FETCH_BYTES_AFTER_HEAD`` bytes (enough
+to reach the H1 on most pages) have been seen, or once ``FETCH_MAX_BYTES``
+is reached. Bodies that are not HTML are not read at all.
+"""
+import codecs
+import re
+from time import perf_counter
+
+from django.conf import settings
+
+from .seo_extractor import SEOExtractor
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.I)
+DEFAULT_ENCODING = 'utf-8'
+
+
+def parse_content_type(content_type):
+    """Split a Content-Type header into its lowercased mime type and charset."""
+    parts = (content_type or '').split(';')
+    mime_type = parts[0].strip().lower()
+    charset = None
+    for param in parts[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset' and value.strip():
+            charset = value.strip().strip('"\'')
+    return mime_type, charset
+
+
+def is_html_content_type(content_type):
+    mime_type, _ = parse_content_type(content_type)
+    # Servers that send no Content-Type at all are usually serving HTML.
+    return not mime_type or mime_type in HTML_CONTENT_TYPES
+
+
+def lookup_encoding(name):
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+
+
+class PageBodyReader:
+    def __init__(self, base_url, content_type, max_bytes=None, bytes_after_head=None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.FETCH_MAX_BYTES
+        self.bytes_after_head = (bytes_after_head if bytes_after_head is not None
+                                 else settings.FETCH_BYTES_AFTER_HEAD)
+        self.is_html = is_html_content_type(content_type)
+        _, charset = parse_content_type(content_type)
+        self.encoding = lookup_encoding(charset)
+
+        self.extractor = SEOExtractor(base_url)
+        self.bytes_read = 0
+        self.parse_time = 0.0  # Seconds spent decoding and extracting
+        self.truncated = False
+        self.done = not self.is_html
+        self._decoder = None
+        self._head_end = None
+
+    def feed(self, chunk):
+        """Consume one body chunk; returns False once no more bytes are wanted."""
+        if self.done:
+            return False
+        start = perf_counter()
+        remaining = self.max_bytes - self.bytes_read
+        if len(chunk) >= remaining:
+            # A body that ends exactly at the budget was read whole
+            self.truncated = len(chunk) > remaining
+            chunk = chunk[:remaining]
+            self.done = True
+        self.bytes_read += len(chunk)
+
+        if self._decoder is None:
+            # Without a charset in the header, sniff <meta charset> from the first chunk.
+            if self.encoding is None:
+                match = META_CHARSET_RE.search(chunk[:4096])
+                self.encoding = (lookup_encoding(match.group(1).decode('ascii')) if match else None) or DEFAULT_ENCODING
+            self._decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+        self.extractor.feed(self._decoder.decode(chunk))
+
+        if self._head_end is None and self.extractor.head_complete:
+            self._head_end = self.bytes_read
+        if (self._head_end is not None and not self.done
+                and self.bytes_read - self._head_end >= self.bytes_after_head):
+            self.truncated = True
+            self.done = True
+        self.parse_time += perf_counter() - start
+        return not self.done
+
+    def finish(self):
+        """Flush the tokenizer and return the extracted SEO fields."""
+        start = perf_counter()
+        if self._decoder is not None and not self.truncated:
+            self.extractor.feed(self._decoder.decode(b'', final=True))
+        self.extractor.close()
+        self.done = True
+        result = self.extractor.result()
+        self.parse_time += perf_counter() - start
+        return result
@@ -0,0 +1,150 @@
+"""Per-host politeness for batches of outbound fetches.
+
+``HostScheduler`` keeps a ``HostThrottle`` per host: a token bucket that
+refills at the host's current rate, plus a backoff deadline. A 429 or 503
+answer halves the host's rate and blocks it until its Retry-After (or an
+exponential backoff when there is none); every successful fetch after that
+adds back a tenth of the configured rate, so a host that recovers is sped
+up again gradually. A robots.txt ``Crawl-delay`` caps the rate of its host
+for the rest of the batch.
+
+The scheduler only answers "when may this host be fetched next"; the bulk
+checker decides what to run, visiting hosts round-robin so that a slow or
+throttled host delays its own URLs and nobody else's.
+"""
+from email.utils import parsedate_to_datetime
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from .fetch_cache import CACHE_HIT
+
+THROTTLED_STATUSES = (429, 503)
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - (now if now is not None else time.time()))
+
+
+def robots_url_for(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}/robots.txt'
+
+
+class HostThrottle:
+    def __init__(self, rate, burst, now):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        self.blocked_until = now
+        self.failures = 0
+        self.crawl_delay = None
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def ready_at(self, now):
+        """Monotonic time at which the next request to this host may start."""
+        self._refill(now)
+        ready = now if self.tokens >= 1 else now + (1 - self.tokens) / self.rate
+        return max(ready, self.blocked_until)
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def refund(self):
+        """Give back the token of a request that never reached the host (a cache hit)."""
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def set_crawl_delay(self, delay):
+        self.crawl_delay = delay
+        self.max_rate = min(self.max_rate, 1 / delay)
+        self.rate = min(self.rate, self.max_rate)
+        self.burst = 1
+        self.tokens = min(self.tokens, 1.0)
+
+    def on_success(self):
+        self.failures = 0
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    def on_throttled(self, now, retry_after, min_rate, backoff_base, max_backoff):
+        """Back off after a 429/503: halve the rate and wait out Retry-After or an exponential delay."""
+        self.failures += 1
+        self.rate = max(min_rate, self.rate / 2)
+        if retry_after is None:
+            retry_after = backoff_base * 2 ** (self.failures - 1)
+        self.blocked_until = max(self.blocked_until, now + min(retry_after, max_backoff))
+        self.tokens = min(self.tokens, 0.0)
+
+
+class HostScheduler:
+    def __init__(self, rate=None, burst=None, max_retries=None, honor_crawl_delay=False):
+        self.rate = rate or settings.POLITENESS_HOST_RATE
+        self.burst = burst or settings.POLITENESS_HOST_BURST
+        self.max_retries = settings.POLITENESS_MAX_RETRIES if max_retries is None else max_retries
+        self.honor_crawl_delay = honor_crawl_delay
+        self.hosts = {}
+        self.throttled = 0
+        self.retried = 0
+
+    def throttle(self, host):
+        throttle = self.hosts.get(host)
+        if throttle is None:
+            throttle = self.hosts[host] = HostThrottle(self.rate, self.burst, time.monotonic())
+        return throttle
+
+    def set_crawl_delay(self, host, delay):
+        if delay:
+            self.throttle(host).set_crawl_delay(min(delay, settings.POLITENESS_MAX_CRAWL_DELAY))
+
+    def record(self, host, result, attempt):
+        """Update ``host``'s throttle from the result of a URL's ``attempt``-th check (from 1).
+
+        Returns True when the URL was throttled and should be checked again.
+        """
+        if result.get('cache_status') == CACHE_HIT:
+            self.throttle(host).refund()
+            return False
+        status_code = result.get('final_status_code')
+        if status_code not in THROTTLED_STATUSES:
+            if 'error' not in result:
+                self.throttle(host).on_success()
+            return False
+        self.throttled += 1
+        self.throttle(host).on_throttled(
+            time.monotonic(), parse_retry_after(result.get('retry_after')),
+            min_rate=settings.POLITENESS_MIN_HOST_RATE,
+            backoff_base=settings.POLITENESS_BACKOFF_BASE,
+            max_backoff=settings.POLITENESS_MAX_BACKOFF,
+        )
+        if attempt <= self.max_retries:
+            self.retried += 1
+            return True
+        return False
+
+    def stats(self):
+        return {
+            'throttled_responses': self.throttled,
+            'retries': self.retried,
+            'hosts_backed_off': sum(1 for throttle in self.hosts.values() if throttle.rate < throttle.max_rate),
+            'crawl_delays': {
+                host: throttle.crawl_delay for host, throttle in self.hosts.items() if throttle.crawl_delay
+            },
+        }
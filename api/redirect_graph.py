@@ -0,0 +1,77 @@
+"""Redirect graph built while checking a batch of URLs.
+
+Checks in one batch share a ``RedirectGraph``. Every redirect hop seen is
+memoized, so a second chain that passes through the same hop (a site-wide
+http -> https or non-www -> www rule, a retired section that redirects to one
+landing page) follows it without another request. The completed chains are
+kept as edge counts for aggregate analysis of the batch.
+"""
+from collections import Counter
+import threading
+
+
+class RedirectGraph:
+    def __init__(self, max_chain_length=3, sample_limit=50):
+        self.max_chain_length = max_chain_length
+        self.sample_limit = sample_limit
+        self._hops = {}
+        self._edges = Counter()
+        self._targets = Counter()
+        self._chain_lengths = Counter()
+        self._loops = []
+        self._long_chains = []
+        self._memo_hits = 0
+        self._lock = threading.Lock()
+
+    def get_hop(self, url):
+        """Return the memoized ``{'status_code', 'location'}`` redirect for ``url``, if any."""
+        hop = self._hops.get(url)
+        if hop is not None:
+            with self._lock:
+                self._memo_hits += 1
+        return hop
+
+    def record_hop(self, url, status_code, location):
+        self._hops.setdefault(url, {'status_code': status_code, 'location': location})
+
+    def record_chain(self, redirect_steps, redirect_error=None):
+        """Add one URL's completed chain (``check_url``'s ``redirect_steps``) to the graph."""
+        with self._lock:
+            for step, next_step in zip(redirect_steps, redirect_steps[1:]):
+                self._hops.setdefault(step['url'], {
+                    'status_code': step['status_code'],
+                    'location': next_step['url'],
+                })
+                self._edges[(step['url'], next_step['url'])] += 1
+                self._targets[next_step['url']] += 1
+
+            hop_count = len(redirect_steps) - 1
+            self._chain_lengths[hop_count] += 1
+            start_url = redirect_steps[0]['url']
+            if redirect_error == 'loop' and len(self._loops) < self.sample_limit:
+                self._loops.append(start_url)
+            if hop_count > self.max_chain_length and len(self._long_chains) < self.sample_limit:
+                self._long_chains.append({'url': start_url, 'hops': hop_count})
+
+    def edges(self):
+        return [
+            {'source': source, 'target': target, 'count': count}
+            for (source, target), count in self._edges.most_common()
+        ]
+
+    def stats(self, top=10):
+        return {
+            'chains': sum(self._chain_lengths.values()),
+            'redirected': sum(count for hops, count in self._chain_lengths.items() if hops),
+            'unique_hops': len(self._edges),
+            'memoized_hops_reused': self._memo_hits,
+            'chain_length_histogram': {
+                str(hops): count for hops, count in sorted(self._chain_lengths.items())
+            },
+            'top_hop_targets': [
+                {'url': url, 'count': count} for url, count in self._targets.most_common(top)
+            ],
+            'max_chain_length': self.max_chain_length,
+            'long_chains': self._long_chains,
+            'loops': self._loops,
+        }
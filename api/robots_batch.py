@@ -0,0 +1,120 @@
+"""Batch evaluation of URLs against several robots.txt files and user agents.
+
+``DecisionMatrix`` computes every URL x robots x agent verdict in one pass:
+each URL's path is normalized once and shared by all robots files, duplicate
+paths are only evaluated once, and agents that resolve to the same group
+share a column. Verdicts are stored per (robots, agent) as a column of 0/1
+bytes, which is what the compact output formats are rendered from:
+
+- ``columnar``: one array of 0/1 per robots file and agent, in URL order;
+- ``bitset``: the same column packed into bits, most significant bit of the
+  first byte first, and base64-encoded.
+"""
+import base64
+
+from .robots_matcher import url_path
+
+FORMAT_VERBOSE = 'verbose'
+FORMAT_COLUMNAR = 'columnar'
+FORMAT_BITSET = 'bitset'
+
+_BIT_CHARS = bytes.maketrans(b'\x00\x01', b'01')
+
+
+def pack_bits(column):
+    """Pack a column of 0/1 bytes into a base64 string, URL 0 in the top bit of the first byte."""
+    if not column:
+        return ''
+    padding = -len(column) % 8
+    bits = column.translate(_BIT_CHARS) + b'0' * padding
+    packed = int(bits, 2).to_bytes((len(column) + padding) // 8, 'big')
+    return base64.b64encode(packed).decode('ascii')
+
+
+def column_as_int(column):
+    return int(column.translate(_BIT_CHARS), 2) if column else 0
+
+
+class DecisionMatrix:
+    def __init__(self, robots_list, agents, urls):
+        self.agents = agents
+        self.urls = urls
+        self.robots_count = len(robots_list)
+
+        # Normalize each URL once; evaluate each distinct path once
+        slots = {}
+        url_slots = [slots.setdefault(url_path(url), len(slots)) for url in urls]
+        paths = list(slots)
+        has_duplicates = len(paths) < len(urls)
+
+        self.columns = []
+        for robots in robots_list:
+            by_matcher = {}
+            agent_columns = []
+            for agent in agents:
+                matcher = robots.matcher(agent)
+                column = by_matcher.get(id(matcher))
+                if column is None:
+                    column = bytes(map(matcher.is_allowed_path, paths))
+                    if has_duplicates:
+                        column = bytes(map(column.__getitem__, url_slots))
+                    by_matcher[id(matcher)] = column
+                agent_columns.append(column)
+            self.columns.append(agent_columns)
+
+    def differing_indexes(self):
+        """Indexes of the URLs whose verdict differs between robots files for any agent."""
+        if self.robots_count < 2 or not self.urls:
+            return []
+        mask = 0
+        for agent_index in range(len(self.agents)):
+            first = column_as_int(self.columns[0][agent_index])
+            for agent_columns in self.columns[1:]:
+                mask |= first ^ column_as_int(agent_columns[agent_index])
+        # Bit (n - 1 - i) of the mask belongs to URL i
+        bits = format(mask, f'0{len(self.urls)}b')
+        indexes = []
+        index = bits.find('1')
+        while index != -1:
+            indexes.append(index)
+            index = bits.find('1', index + 1)
+        return indexes
+
+    def select(self, indexes):
+        """Columns restricted to the URLs at ``indexes``, in that order."""
+        return [
+            [bytes(map(column.__getitem__, indexes)) for column in agent_columns]
+            for agent_columns in self.columns
+        ]
+
+    def verbose(self, indexes=None):
+        """The ``MultiRobotsTestView`` response format: one entry per URL."""
+        indexes = range(len(self.urls)) if indexes is None else indexes
+        results = []
+        for url_index in indexes:
+            results.append({
+                'url': self.urls[url_index],
+                'robots_results': [
+                    {
+                        'robots_index': robots_index,
+                        'results': {
+                            agent: bool(column[url_index])
+                            for agent, column in zip(self.agents, agent_columns)
+                        },
+                    }
+                    for robots_index, agent_columns in enumerate(self.columns)
+                ],
+            })
+        return results
+
+    def compact(self, output_format, indexes=None):
+        columns = self.columns if indexes is None else self.select(indexes)
+        encode = pack_bits if output_format == FORMAT_BITSET else list
+        return [
+            {
+                'robots_index': robots_index,
+                'results': {agent: encode(column) for agent, column in zip(self.agents, agent_columns)},
+                'allowed_counts': {agent: sum(column) for agent, column in zip(self.agents, agent_columns)},
+            }
+            for robots_index, agent_columns in enumerate(columns)
+        ]
@@ -0,0 +1,177 @@
+"""Caches for fetched robots.txt files and their compiled rule sets.
+
+``RobotsFetchCache`` keeps fetched robots.txt bodies by URL for as long as
+the response's Cache-Control (or Expires) allows, ``ROBOTS_CACHE_TTL`` when
+it says nothing, and revalidates expired entries with If-None-Match /
+If-Modified-Since so an unchanged file costs a 304 rather than a download.
+
+``CompiledRobotsCache`` keeps ``CompiledRobots`` by content hash in an LRU,
+so the same file is parsed and compiled once per process however it
+arrived (fetched, pasted, or one of several ``robots_contents``).
+"""
+from email.utils import parsedate_to_datetime
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+
+from . import http_client
+from .cache_backends import MemoryCacheBackend, build_backend
+from .fetch_cache import CACHE_HIT, CACHE_MISS, CACHE_REVALIDATED, CACHE_BYPASS, conditional_headers
+from .robots_matcher import CompiledRobots
+
+_fetch_cache = None
+_compiled_cache = None
+_cache_lock = threading.Lock()
+
+
+def parse_cache_control(value):
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip().strip('"')
+    return directives
+
+
+def freshness_lifetime(headers, default_ttl, max_ttl):
+    """Seconds a response may be reused without revalidation, or None if it must not be stored."""
+    directives = parse_cache_control(headers.get('Cache-Control'))
+    if 'no-store' in directives:
+        return None
+    if 'no-cache' in directives:
+        return 0
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            try:
+                return min(max(0, int(directives[name])), max_ttl)
+            except ValueError:
+                return 0
+    if headers.get('Expires'):
+        try:
+            expires = parsedate_to_datetime(headers['Expires']).timestamp()
+        except (TypeError, ValueError):
+            return 0  # An invalid Expires means already expired
+        return min(max(0, int(expires - time.time())), max_ttl)
+    return default_ttl
+
+
+def is_cacheable_status(status_code):
+    # Like a crawler, remember missing files (4xx) but retry server errors.
+    return status_code != 429 and status_code < 500
+
+
+class RobotsFetchCache:
+    def __init__(self, backend, default_ttl, max_ttl, stale_ttl):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.max_ttl = max_ttl
+        self.stale_ttl = stale_ttl
+        self.revalidations = 0
+
+    @staticmethod
+    def make_key(url):
+        return f"robots:{hashlib.sha256(url.encode('utf-8')).hexdigest()}"
+
+    def store(self, url, entry, lifetime):
+        entry['fresh_until'] = time.time() + lifetime
+        self.backend.set(self.make_key(url), entry, lifetime + self.stale_ttl)
+
+    def lookup(self, url):
+        """Return ``(entry, result)``: the stored entry, and the result to serve if it is still fresh."""
+        entry = self.backend.get(self.make_key(url))
+        if entry is not None and entry['fresh_until'] > time.time():
+            return entry, {'status_code': entry['status_code'], 'content': entry['content'], 'cache_status': CACHE_HIT}
+        return entry, None
+
+    def update(self, url, entry, response):
+        """Store the response to a (conditional) fetch of ``url`` and return the result to serve."""
+        lifetime = freshness_lifetime(response.headers, self.default_ttl, self.max_ttl)
+
+        if response.status_code == 304 and entry is not None:
+            self.revalidations += 1
+            if lifetime is not None:
+                self.store(url, entry, lifetime)
+            return {'status_code': entry['status_code'], 'content': entry['content'],
+                    'cache_status': CACHE_REVALIDATED}
+
+        content = response.text
+        if lifetime is not None and is_cacheable_status(response.status_code):
+            self.store(url, {
+                'status_code': response.status_code,
+                'content': content,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }, lifetime)
+        return {'status_code': response.status_code, 'content': content, 'cache_status': CACHE_MISS}
+
+    def fetch(self, url):
+        """Return ``{'status_code', 'content', 'cache_status'}`` for the robots.txt at ``url``."""
+        entry, result = self.lookup(url)
+        if result is not None:
+            return result
+        headers = conditional_headers(entry) if entry is not None else {}
+        return self.update(url, entry, http_client.get(url, headers=headers))
+
+    def stats(self):
+        return {**self.backend.stats(), 'revalidations': self.revalidations}
+
+
+class CompiledRobotsCache:
+    def __init__(self, max_entries):
+        self.backend = MemoryCacheBackend(max_entries=max_entries)
+
+    def get(self, content):
+        key = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        robots = self.backend.get(key)
+        if robots is None:
+            robots = CompiledRobots(content)
+            self.backend.set(key, robots)
+        return robots
+
+    def stats(self):
+        return {**self.backend.stats(), 'entries': len(self.backend)}
+
+
+def get_robots_fetch_cache():
+    """Return the process-wide robots.txt fetch cache, or None when it is disabled."""
+    global _fetch_cache
+    if settings.ROBOTS_CACHE_BACKEND == 'none':
+        return None
+    if _fetch_cache is None:
+        with _cache_lock:
+            if _fetch_cache is None:
+                backend = build_backend(
+                    settings.ROBOTS_CACHE_BACKEND,
+                    max_entries=settings.ROBOTS_CACHE_MAX_ENTRIES,
+                    alias=settings.ROBOTS_CACHE_ALIAS,
+                )
+                _fetch_cache = RobotsFetchCache(
+                    backend, settings.ROBOTS_CACHE_TTL, settings.ROBOTS_CACHE_MAX_TTL,
+                    settings.ROBOTS_CACHE_STALE_TTL,
+                )
+    return _fetch_cache
+
+
+def get_compiled_cache():
+    global _compiled_cache
+    if _compiled_cache is None:
+        with _cache_lock:
+            if _compiled_cache is None:
+                _compiled_cache = CompiledRobotsCache(settings.ROBOTS_PARSE_CACHE_MAX_ENTRIES)
+    return _compiled_cache
+
+
+def fetch_robots(url, use_cache=True):
+    """Fetch a robots.txt through the cache (see ``RobotsFetchCache.fetch``)."""
+    cache = get_robots_fetch_cache() if use_cache else None
+    if cache is None:
+        response = http_client.get(url)
+        return {'status_code': response.status_code, 'content': response.text, 'cache_status': CACHE_BYPASS}
+    return cache.fetch(url)
+
+
+def compile_robots(content):
+    """Return the (cached) ``CompiledRobots`` for a robots.txt body."""
+    return get_compiled_cache().get(content)
@@ -0,0 +1,154 @@
+"""Rule coverage of a robots.txt over a list of crawled URLs.
+
+For every user-agent group, ``RobotsCoverage`` counts how many URLs each
+rule decides, and finds the rules that never decide anything: *dead* rules
+match none of the URLs, *shadowed* rules match some but always lose to a
+longer (or Allow) rule. Blocked URLs are also counted per first-level
+folder, using the same folder split as ``/process-csv/``.
+
+URLs are consumed one at a time, so the list can be streamed from an
+upload; those that cannot be parsed are skipped and counted. Matching goes through the compiled ``RuleMatcher``; finding out
+whether a rule matches at all is only done for rules that have not matched
+yet, with the trie for literal patterns and a combined regex of the
+not-yet-matched wildcard patterns, so it gets cheaper as the run goes on.
+"""
+from collections import Counter
+import re
+from urllib.parse import urlsplit
+
+from .robots_matcher import is_wildcard, pattern_regex, split_path
+from .url_structure import folder_levels
+
+STATUS_USED = 'used'
+STATUS_SHADOWED = 'shadowed'
+STATUS_DEAD = 'dead'
+
+
+class UnmatchedWildcards:
+    """Wildcard rules that have not matched any path yet, as one regex."""
+
+    def __init__(self, rules):
+        self.rules = [rule for rule in rules if is_wildcard(rule.pattern)]
+        self._compile()
+
+    def _compile(self):
+        self._regex = None
+        if self.rules:
+            self._regex = re.compile('|'.join(f'({pattern_regex(rule.pattern)})' for rule in self.rules),
+                                     re.DOTALL)
+
+    def observe(self, path):
+        """Return the rules that match ``path`` for the first time, and stop looking for them."""
+        found = []
+        while self._regex is not None:
+            match = self._regex.match(path)
+            if match is None:
+                break
+            found.append(self.rules.pop(match.lastindex - 1))
+            self._compile()
+        return found
+
+
+class GroupCoverage:
+    def __init__(self, agent, matcher):
+        self.agent = agent
+        self.matcher = matcher
+        self.decisions = Counter()
+        self.matched = set()
+        self.unmatched_literals = {rule.pattern for rule in matcher.rules if not is_wildcard(rule.pattern)}
+        self.unmatched_wildcards = UnmatchedWildcards(matcher.rules)
+        self.blocked = 0
+        self.undecided = 0
+        self.folders = {}
+
+    def add(self, path, folder):
+        if self.unmatched_literals:
+            # One trie walk gives both the deciding literal and every literal that matches
+            literals = self.matcher.literal_matches(path)
+            for literal in literals:
+                self.unmatched_literals.discard(literal.pattern)
+            rule = self.matcher.decide(literals[-1] if literals else None, path)
+        else:
+            rule = self.matcher.match(path)
+        counts = self.folders.get(folder)
+        if counts is None:
+            counts = self.folders[folder] = {'urls': 0, 'blocked': 0}
+        counts['urls'] += 1
+        if rule is None:
+            self.undecided += 1
+        else:
+            self.decisions[rule] += 1
+            if not rule.allow and path != '/robots.txt':
+                self.blocked += 1
+                counts['blocked'] += 1
+
+        for wildcard in self.unmatched_wildcards.observe(path):
+            self.matched.add(wildcard)
+
+    def rule_status(self, rule):
+        if self.decisions[rule]:
+            return STATUS_USED
+        if is_wildcard(rule.pattern):
+            matched = rule in self.matched
+        else:
+            matched = rule.pattern not in self.unmatched_literals
+        return STATUS_SHADOWED if matched else STATUS_DEAD
+
+    def result(self, urls_tested):
+        rules = []
+        for rule in self.matcher.rules:
+            rules.append({
+                'directive': 'allow' if rule.allow else 'disallow',
+                'pattern': rule.pattern,
+                'line': rule.line,
+                'decisions': self.decisions[rule],
+                'status': self.rule_status(rule),
+            })
+        statuses = Counter(rule['status'] for rule in rules)
+        folders = sorted(self.folders.items(), key=lambda item: (-item[1]['blocked'], -item[1]['urls']))
+        return {
+            'user_agent': self.agent,
+            'blocked': self.blocked,
+            'allowed': urls_tested - self.blocked,
+            'undecided': self.undecided,
+            'dead_rules': statuses[STATUS_DEAD],
+            'shadowed_rules': statuses[STATUS_SHADOWED],
+            'rules': rules,
+            'blocked_by_folder': dict(folders),
+        }
+
+
+class RobotsCoverage:
+    def __init__(self, robots, user_agents=None):
+        if user_agents:
+            agents = [robots.resolve_agent(agent) for agent in user_agents]
+            agents = [agent for agent in dict.fromkeys(agents) if agent is not None]
+        else:
+            agents = list(robots.rules_by_agent)
+        self.groups = [GroupCoverage(agent, robots.matcher(agent)) for agent in agents]
+        self.urls_tested = 0
+        self.urls_invalid = 0
+
+    def add(self, url):
+        try:
+            parts = urlsplit(url)
+            path = split_path(parts)
+        except ValueError:
+            self.urls_invalid += 1
+            return
+        self.urls_tested += 1
+        folder = folder_levels(parts.path, 1)[0]
+        for group in self.groups:
+            group.add(path, folder)
+
+    def add_many(self, urls):
+        for url in urls:
+            self.add(url)
+        return self
+
+    def result(self):
+        return {
+            'urls_tested': self.urls_tested,
+            'urls_invalid': self.urls_invalid,
+            'groups': [group.result(self.urls_tested) for group in self.groups],
+        }
@@ -0,0 +1,198 @@
+"""Semantic comparison of two robots.txt versions.
+
+``diff_rules`` compares the rule groups of both versions per user agent.
+A rule is its directive and normalized pattern, so whitespace, comments,
+case of the directive and the splitting of an agent's rules over several
+groups make no difference. Each rule is reported as added, removed or moved;
+a rule has moved when it is outside the longest run of rules that kept
+their relative order. Order never changes a decision under longest-match
+precedence, so moves are informational.
+
+``diff_decisions`` evaluates a sample of URLs against both compiled
+versions, chunk by chunk, and reports the URLs whose verdict flips. URLs
+that cannot be parsed (e.g. ``http://[::1``) are skipped and counted.
+"""
+from bisect import bisect_left
+from itertools import islice
+
+from .robots_batch import DecisionMatrix, column_as_int
+from .robots_matcher import url_path
+
+SAMPLE_LIMIT = 100
+CHUNK_SIZE = 50000
+
+
+def rule_payload(rule):
+    return {'directive': 'allow' if rule.allow else 'disallow', 'pattern': rule.pattern, 'line': rule.line}
+
+
+def stable_positions(sequence):
+    """Indexes of a longest increasing subsequence of ``sequence``."""
+    # tails[k] is the index of the smallest last value of an increasing run of length k + 1
+    tails = []
+    tail_values = []
+    previous = [None] * len(sequence)
+    for index, value in enumerate(sequence):
+        position = bisect_left(tail_values, value)
+        if position > 0:
+            previous[index] = tails[position - 1]
+        if position == len(tails):
+            tails.append(index)
+            tail_values.append(value)
+        else:
+            tails[position] = index
+            tail_values[position] = value
+    stable = set()
+    index = tails[-1] if tails else None
+    while index is not None:
+        stable.add(index)
+        index = previous[index]
+    return stable
+
+
+def diff_agent_rules(old_rules, new_rules):
+    def keyed(rules):
+        # Repeated identical rules are told apart by occurrence number
+        seen = {}
+        keys = []
+        for rule in rules:
+            key = (rule.allow, rule.pattern)
+            seen[key] = seen.get(key, 0) + 1
+            keys.append((key, seen[key]))
+        return keys
+
+    old_keys = keyed(old_rules)
+    new_index = {key: index for index, key in enumerate(keyed(new_rules))}
+    old_index = {key: index for index, key in enumerate(old_keys)}
+
+    added = [rule_payload(rule) for key, rule in zip(new_index, new_rules) if key not in old_index]
+    removed = [rule_payload(rule) for key, rule in zip(old_keys, old_rules) if key not in new_index]
+
+    common = [(old_position, new_index[key]) for old_position, key in enumerate(old_keys) if key in new_index]
+    stable = stable_positions([new_position for _, new_position in common])
+    moved = [
+        {
+            'directive': 'allow' if old_rules[old_position].allow else 'disallow',
+            'pattern': old_rules[old_position].pattern,
+            'old_line': old_rules[old_position].line,
+            'new_line': new_rules[new_position].line,
+        }
+        for position, (old_position, new_position) in enumerate(common) if position not in stable
+    ]
+    return added, removed, moved
+
+
+def diff_rules(old_robots, new_robots):
+    """Per-agent rule changes between two ``CompiledRobots``."""
+    old_agents = old_robots.rules_by_agent
+    new_agents = new_robots.rules_by_agent
+    agents = list(old_agents) + [agent for agent in new_agents if agent not in old_agents]
+
+    changed = []
+    unchanged = []
+    for agent in agents:
+        added, removed, moved = diff_agent_rules(old_agents.get(agent, []), new_agents.get(agent, []))
+        if agent not in new_agents:
+            agent_status = 'removed'
+        elif agent not in old_agents:
+            agent_status = 'added'
+        elif added or removed or moved:
+            agent_status = 'changed'
+        else:
+            unchanged.append(agent)
+            continue
+        changed.append({
+            'user_agent': agent,
+            'status': agent_status,
+            'added': added,
+            'removed': removed,
+            'moved': moved,
+        })
+    return {
+        'agents': changed,
+        'unchanged_agents': unchanged,
+        'stats': {
+            'rules_added': sum(len(agent['added']) for agent in changed),
+            'rules_removed': sum(len(agent['removed']) for agent in changed),
+            'rules_moved': sum(len(agent['moved']) for agent in changed),
+        },
+    }
+
+
+def rule_text(rule):
+    if rule is None:
+        return None
+    return f"{'Allow' if rule.allow else 'Disallow'}: {rule.pattern}"
+
+
+def parsable_urls(urls):
+    """``(urls that can be parsed, number that cannot)``."""
+    parsable = []
+    for url in urls:
+        try:
+            url_path(url)
+        except ValueError:
+            continue
+        parsable.append(url)
+    return parsable, len(urls) - len(parsable)
+
+
+def diff_decisions(old_robots, new_robots, urls, user_agents, sample_limit=SAMPLE_LIMIT, chunk_size=CHUNK_SIZE):
+    """Count and sample the URLs whose verdict differs between the two versions.
+
+    ``urls`` may be any iterable (e.g. rows streamed from an upload); it is
+    evaluated ``chunk_size`` URLs at a time.
+    """
+    flips = {agent: {'allowed_to_disallowed': 0, 'disallowed_to_allowed': 0} for agent in user_agents}
+    samples = []
+    tested = 0
+    invalid = 0
+    flipped = 0
+    urls = iter(urls)
+    while True:
+        chunk = list(islice(urls, chunk_size))
+        if not chunk:
+            break
+        try:
+            matrix = DecisionMatrix([old_robots, new_robots], user_agents, chunk)
+        except ValueError:
+            # Rare enough to only be looked for once a chunk fails
+            chunk, skipped = parsable_urls(chunk)
+            invalid += skipped
+            matrix = DecisionMatrix([old_robots, new_robots], user_agents, chunk)
+        tested += len(chunk)
+        flipped_mask = 0
+        for agent_index, agent in enumerate(user_agents):
+            before = column_as_int(matrix.columns[0][agent_index])
+            after = column_as_int(matrix.columns[1][agent_index])
+            changed = before ^ after
+            if not changed:
+                continue
+            flipped_mask |= changed
+            flips[agent]['allowed_to_disallowed'] += (before & changed).bit_count()
+            flips[agent]['disallowed_to_allowed'] += (after & changed).bit_count()
+            if len(samples) >= sample_limit:
+                continue
+            # Bit (n - 1 - i) belongs to URL i of the chunk
+            bits = format(changed, f'0{len(chunk)}b')
+            index = bits.find('1')
+            while index != -1 and len(samples) < sample_limit:
+                path = url_path(chunk[index])
+                samples.append({
+                    'url': chunk[index],
+                    'user_agent': agent,
+                    'before': bool(matrix.columns[0][agent_index][index]),
+                    'after': bool(matrix.columns[1][agent_index][index]),
+                    'rule_before': rule_text(old_robots.matcher(agent).match(path)),
+                    'rule_after': rule_text(new_robots.matcher(agent).match(path)),
+                })
+                index = bits.find('1', index + 1)
+        flipped += flipped_mask.bit_count()
+    return {
+        'urls_tested': tested,
+        'urls_invalid': invalid,
+        'user_agents': user_agents,
+        'flips': flips,
+        'flipped_urls': flipped,
+        'samples': samples,
+    }
@@ -0,0 +1,229 @@
+"""Compiled robots.txt matcher.
+
+A robots.txt is parsed once into groups, and for each requested user agent
+the rules of the group(s) that apply to it are compiled into a
+``RuleMatcher``: literal path prefixes go into a character trie, and the
+patterns using ``*`` or ``$`` into one combined regular expression whose
+alternatives are ordered by precedence. Testing a URL is then a single walk
+of the trie plus a single regex match, however many rules the file has.
+
+Decisions follow Google's rules: the most specific matching rule (the
+longest pattern) wins, Allow wins a tie, and a URL no rule matches is
+allowed. Group selection is by product token: the longest group name
+that matches the crawler name (``googlebot-image`` before ``googlebot``),
+else the ``*`` group.
+"""
+from collections import namedtuple
+import re
+from urllib.parse import quote, urlsplit
+
+from .robots_parser import ALLOW, CRAWL_DELAY, DISALLOW, USER_AGENT, iter_tokens, limit_size
+
+Rule = namedtuple('Rule', 'allow pattern line')
+
+# Only non-ASCII characters are escaped; everything printable is kept as written.
+_SAFE_CHARS = ''.join(chr(code) for code in range(32, 127))
+_ESCAPE_RE = re.compile(r'%[0-9a-fA-F]{2}')
+_TOKEN_RE = re.compile(r'[a-z_-]+')
+
+
+def normalize_path(value):
+    """Percent-encode non-ASCII characters and upper-case existing escapes."""
+    if value.isascii() and '%' not in value:
+        return value
+    if not value.isascii():
+        value = quote(value, safe=_SAFE_CHARS)
+    return _ESCAPE_RE.sub(lambda match: match.group().upper(), value)
+
+
+def url_path(url):
+    """The part of ``url`` robots rules are matched against: path plus query."""
+    return split_path(urlsplit(url))
+
+
+def split_path(parts):
+    """``url_path`` for an already split URL."""
+    path = parts.path or '/'
+    if parts.query:
+        path = f'{path}?{parts.query}'
+    return normalize_path(path)
+
+
+def agent_token(value):
+    """The product token of a ``User-agent`` value (``Googlebot/2.1`` -> ``googlebot``)."""
+    value = value.strip().lower()
+    if value.startswith('*'):
+        return '*'
+    match = _TOKEN_RE.match(value)
+    return match.group() if match else ''
+
+
+def parse_groups(content):
+    """Parse robots.txt ``content`` into ``[(agents, rules, crawl_delays)]`` groups, in file order."""
+    groups = []
+    agents = rules = crawl_delays = None
+    group_has_rules = False
+    content, _ = limit_size(content)
+    for line, directive, _, value in iter_tokens(content):
+        if directive == USER_AGENT:
+            if agents is None or group_has_rules:
+                agents, rules, crawl_delays = [], [], []
+                groups.append((agents, rules, crawl_delays))
+                group_has_rules = False
+            agent = agent_token(value)
+            if agent:
+                agents.append(agent)
+        elif directive in (ALLOW, DISALLOW) and agents is not None:
+            group_has_rules = True
+            # An empty Disallow allows everything, which is also what no rule does.
+            if value:
+                rules.append(Rule(directive == ALLOW, normalize_path(value), line))
+        elif directive == CRAWL_DELAY and agents is not None:
+            try:
+                crawl_delays.append(float(value))
+            except ValueError:
+                pass
+    return groups
+
+
+def is_wildcard(pattern):
+    return '*' in pattern or pattern.endswith('$')
+
+
+def pattern_regex(pattern):
+    anchored = pattern.endswith('$')
+    if anchored:
+        pattern = pattern[:-1]
+    regex = '.*'.join(re.escape(part) for part in pattern.split('*'))
+    return regex + r'\Z' if anchored else regex
+
+
+def precedence(rule):
+    """Sort key of a matching rule: longer patterns first, Allow before Disallow."""
+    return len(rule.pattern), rule.allow
+
+
+class RuleMatcher:
+    """The rules that apply to one user agent, compiled for matching."""
+
+    def __init__(self, rules):
+        self.rules = rules
+        # Trie nodes are [children, rule]; rule is the literal pattern ending at that node.
+        self._trie = [{}, None]
+        wildcards = []
+        for rule in rules:
+            if is_wildcard(rule.pattern):
+                wildcards.append(rule)
+            else:
+                self._insert(rule)
+        wildcards.sort(key=precedence, reverse=True)
+        self._wildcards = wildcards
+        self._wildcard_regex = None
+        if wildcards:
+            # One group per rule; alternatives are tried in order, so the first one to
+            # match (``lastindex``) is the highest-precedence wildcard rule.
+            self._wildcard_regex = re.compile(
+                '|'.join(f'({pattern_regex(rule.pattern)})' for rule in wildcards), re.DOTALL,
+            )
+
+    def _insert(self, rule):
+        node = self._trie
+        for char in rule.pattern:
+            children = node[0]
+            child = children.get(char)
+            if child is None:
+                child = children[char] = [{}, None]
+            node = child
+        if node[1] is None or (rule.allow and not node[1].allow):
+            node[1] = rule
+
+    def match(self, path):
+        """Return the deciding ``Rule`` for a normalized ``path``, or None if no rule matches."""
+        best = None
+        node = self._trie
+        for char in path:
+            node = node[0].get(char)
+            if node is None:
+                break
+            if node[1] is not None:
+                best = node[1]
+        return self.decide(best, path)
+
+    def decide(self, best, path):
+        """Weigh ``best``, the longest literal rule matching ``path``, against the wildcard rules."""
+        if self._wildcard_regex is not None:
+            found = self._wildcard_regex.match(path)
+            if found is not None:
+                rule = self._wildcards[found.lastindex - 1]
+                if best is None or precedence(rule) > precedence(best):
+                    best = rule
+        return best
+
+    def literal_matches(self, path):
+        """The literal-pattern rules that match ``path``, shortest pattern first."""
+        matches = []
+        node = self._trie
+        for char in path:
+            node = node[0].get(char)
+            if node is None:
+                break
+            if node[1] is not None:
+                matches.append(node[1])
+        return matches
+
+    def is_allowed_path(self, path):
+        if path == '/robots.txt':
+            return True
+        rule = self.match(path)
+        return rule is None or rule.allow
+
+
+class CompiledRobots:
+    """A parsed robots.txt with a compiled ``RuleMatcher`` per resolved user agent."""
+
+    def __init__(self, content):
+        self.groups = parse_groups(content)
+        # Groups naming the same agent are merged, as crawlers do
+        self.rules_by_agent = {}
+        self.crawl_delays = {}
+        for agents, rules, crawl_delays in self.groups:
+            for agent in agents:
+                self.rules_by_agent.setdefault(agent, []).extend(rules)
+                if crawl_delays:
+                    self.crawl_delays[agent] = max(self.crawl_delays.get(agent, 0), *crawl_delays)
+        self._matchers = {}
+
+    def resolve_agent(self, user_agent):
+        """The group name that applies to ``user_agent``, or None when no group does."""
+        name = user_agent.strip().lower()
+        best = None
+        if name and not name.startswith('*'):
+            for token in _TOKEN_RE.findall(name):
+                parts = token.split('-')
+                # googlebot-image falls back to a googlebot group, but not the reverse.
+                for end in range(len(parts), 0, -1):
+                    candidate = '-'.join(parts[:end])
+                    if candidate in self.rules_by_agent:
+                        if best is None or len(candidate) > len(best):
+                            best = candidate
+                        break
+        if best is None and '*' in self.rules_by_agent:
+            best = '*'
+        return best
+
+    def matcher(self, user_agent):
+        agent = self.resolve_agent(user_agent)
+        matcher = self._matchers.get(agent)
+        if matcher is None:
+            matcher = self._matchers[agent] = RuleMatcher(self.rules_by_agent.get(agent, []))
+        return matcher
+
+    def crawl_delay(self, user_agent):
+        """Seconds between requests asked of ``user_agent``'s group, or None."""
+        return self.crawl_delays.get(self.resolve_agent(user_agent))
+
+    def match(self, user_agent, url):
+        return self.matcher(user_agent).match(url_path(url))
+
+    def is_allowed(self, user_agent, url):
+        return self.matcher(user_agent).is_allowed_path(url_path(url))
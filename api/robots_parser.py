@@ -0,0 +1,194 @@
+"""Single-pass robots.txt tokenizer and parser.
+
+``iter_tokens`` reads a robots.txt line by line, the way Google does: a
+leading BOM is dropped, CR, LF and CRLF all end a line, ``#`` starts a
+comment anywhere on a line, directive names are case-insensitive (with
+common misspellings accepted) and only the first ``MAX_SIZE`` bytes count.
+``parse_robots`` turns the tokens into the analyzer's groups, sitemaps,
+stats, errors and warnings in the same pass; the compiled matcher
+(``robots_matcher``) reads the same tokens.
+"""
+from urllib.parse import urlsplit
+
+MAX_SIZE = 500 * 1024  # Google ignores anything after the first 500 KiB
+
+USER_AGENT = 'user-agent'
+ALLOW = 'allow'
+DISALLOW = 'disallow'
+SITEMAP = 'sitemap'
+CRAWL_DELAY = 'crawl-delay'
+HOST = 'host'
+CLEAN_PARAM = 'clean-param'
+NOINDEX = 'noindex'
+
+# Spellings found in the wild, mapped to the directive crawlers read them as
+DIRECTIVES = {
+    'user-agent': USER_AGENT,
+    'useragent': USER_AGENT,
+    'user agent': USER_AGENT,
+    'allow': ALLOW,
+    'disallow': DISALLOW,
+    'dissallow': DISALLOW,
+    'dissalow': DISALLOW,
+    'disalow': DISALLOW,
+    'diasllow': DISALLOW,
+    'disallaw': DISALLOW,
+    'sitemap': SITEMAP,
+    'site-map': SITEMAP,
+    'crawl-delay': CRAWL_DELAY,
+    'crawldelay': CRAWL_DELAY,
+    'host': HOST,
+    'clean-param': CLEAN_PARAM,
+    'noindex': NOINDEX,
+}
+
+
+
+def limit_size(content):
+    """Return ``(content, truncated)`` with ``content`` cut to ``MAX_SIZE`` UTF-8 bytes."""
+    if len(content) * 4 <= MAX_SIZE:
+        return content, False  # Can't be over the limit, whatever the characters
+    encoded = content.encode('utf-8')
+    if len(encoded) <= MAX_SIZE:
+        return content, False
+    return encoded[:MAX_SIZE].decode('utf-8', errors='ignore'), True
+
+
+def iter_tokens(content):
+    """Yield ``(line, directive, key, value)`` for every line that is not blank or only a comment.
+
+    ``key`` is the directive name as written (lower-cased). For lines that are
+    not a recognized directive, ``directive`` is None and ``value`` is the line.
+    """
+    if content.startswith('\ufeff'):
+        content = content[1:]
+    directives = DIRECTIVES
+    number = 0
+    for line in content.splitlines():
+        number += 1
+        if '#' in line:
+            line = line[:line.index('#')]
+        key, separator, value = line.partition(':')
+        if not separator:
+            line = line.strip()
+            if line:
+                yield number, None, line.lower(), line
+            continue
+        key = key.strip().lower()
+        directive = directives.get(key)
+        if directive is None:
+            yield number, None, key, line.strip()
+        else:
+            yield number, directive, key, value.strip()
+
+
+def is_absolute_url(value):
+    parts = urlsplit(value)
+    return parts.scheme in ('http', 'https') and bool(parts.netloc)
+
+
+def parse_robots(content):
+    """Validate and parse robots.txt ``content`` in one pass.
+
+    Returns ``{'valid', 'errors', 'warnings', 'parsed_data'}``. ``valid`` is
+    False when the first directive line is not a robots.txt directive (an
+    HTML page, say). ``parsed_data`` has the groups (``agents``), the distinct
+    sitemaps, Host / Clean-param values and the rule stats.
+    """
+    content, truncated = limit_size(content)
+    errors = []
+    warnings = []
+    if truncated:
+        warnings.append(f'Content is larger than {MAX_SIZE // 1024} KiB; crawlers ignore the rest.')
+
+    valid = None
+    agents = []
+    group = None
+    group_has_rules = False
+    sitemaps = []
+    hosts = []
+    clean_params = []
+    disallow_rules = []
+    allow_rules = []
+
+    for line, directive, key, value in iter_tokens(content):
+        if valid is None:
+            valid = directive is not None
+        if directive is None:
+            errors.append(f"Line {line}: Unrecognized directive '{value}'")
+            continue
+        if key != directive:
+            warnings.append(f"Line {line}: '{key}' is read as '{directive}'.")
+
+        if directive == USER_AGENT:
+            # A user-agent line after rules starts a new group; consecutive ones share a group.
+            if group is None or group_has_rules:
+                group = {'user_agent': [], 'rules': [], 'start_line': line}
+                agents.append(group)
+                group_has_rules = False
+            if not value:
+                warnings.append(f'Line {line}: Empty user-agent.')
+            group['user_agent'].append(value)
+        elif directive in (ALLOW, DISALLOW):
+            if group is None:
+                errors.append(f'Line {line}: Rule before any user-agent line is ignored.')
+                continue
+            group_has_rules = True
+            path = value
+            if path and path[0] not in '/*':
+                warnings.append(f"Line {line}: Path '{path}' should start with '/' or '*'.")
+            allowance = directive == ALLOW
+            group['rules'].append({'path': path, 'allowance': allowance})
+            (allow_rules if allowance else disallow_rules).append(path)
+        elif directive == CRAWL_DELAY:
+            if group is None:
+                errors.append(f'Line {line}: Crawl-delay before any user-agent line is ignored.')
+                continue
+            try:
+                group['crawl_delay'] = float(value)
+            except ValueError:
+                errors.append(f"Line {line}: Crawl-delay '{value}' is not a number.")
+                continue
+            warnings.append(f'Line {line}: Crawl-delay is ignored by Google.')
+        elif directive == SITEMAP:
+            if not is_absolute_url(value):
+                errors.append(f"Line {line}: Sitemap '{value}' is not an absolute URL.")
+            elif value not in sitemaps:
+                sitemaps.append(value)
+        elif directive == HOST:
+            hosts.append(value)
+            if len(hosts) > 1:
+                warnings.append(f'Line {line}: Only the first Host directive is used.')
+        elif directive == CLEAN_PARAM:
+            clean_params.append(value)
+        elif directive == NOINDEX:
+            warnings.append(f'Line {line}: Noindex in robots.txt is not supported by Google.')
+
+    for group in agents:
+        group['rule_count'] = len(group['rules'])
+        if not group['rules']:
+            warnings.append(f"Line {group['start_line']}: Group for {', '.join(group['user_agent'])} has no rules.")
+        del group['start_line']
+
+    stats = {
+        'total_user_agents': len(agents),
+        'total_rules': len(disallow_rules) + len(allow_rules),
+        'total_disallow_rules': len(disallow_rules),
+        'unique_disallow_rules': len(set(disallow_rules)),
+        'total_allow_rules': len(allow_rules),
+        'unique_allow_rules': len(set(allow_rules)),
+        'size_limit_exceeded': truncated,
+    }
+    return {
+        'valid': bool(valid),
+        'errors': errors,
+        'warnings': warnings,
+        'parsed_data': {
+            'agents': agents,
+            # Statuses are filled in by the sitemap checks, if they run
+            'sitemaps': [{'url': sitemap_url, 'status': None} for sitemap_url in sitemaps],
+            'host': hosts[0] if hosts else None,
+            'clean_params': clean_params,
+            'stats': stats,
+        },
+    }
@@ -1,5 +1,6 @@
 # api/robots_views.py
 
+from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -7,13 +8,70 @@ from .serializers import (
     RobotsTxtInputSerializer,
     RobotsTxtComparisonSerializer,
     TestURLSerializer,
-    MultiRobotsTestSerializer
+    MultiRobotsTestSerializer,
+    RobotsCoverageSerializer,
 )
-import requests
-import re
 from difflib import unified_diff
+from itertools import chain
 from urllib.parse import urlparse
-from robotexclusionrulesparser import RobotExclusionRulesParser
+from .csv_ingest import iter_url_rows
+from .job_views import job_payload
+from .jobs import submit_job
+from .models import Job
+from .robots_batch import DecisionMatrix, FORMAT_VERBOSE
+from .robots_cache import compile_robots, fetch_robots
+from .robots_coverage import RobotsCoverage
+from .robots_diff import diff_decisions, diff_rules
+from .robots_matcher import url_path
+from .robots_parser import parse_robots
+from .sitemap_checker import check_sitemaps
+
+def fetch_failure_payload(fetched):
+    return {
+        'fetch_status': fetched['status_code'],
+        'error': f"Failed to fetch robots.txt. HTTP Status Code: {fetched['status_code']}",
+        'robots_content': fetched['content'],
+        'cache_status': fetched['cache_status'],
+    }
+
+
+def analysis_payload(robots_content, fetch_status, cache_status):
+    """Return ``(data, sitemap_urls)`` for the analyzer response, or ``(error_payload, None)``.
+
+    The sitemaps in ``data['parsed_data']`` are still unchecked.
+    """
+    # Validate and parse robots.txt in one pass
+    analysis = parse_robots(robots_content)
+    if not analysis['valid']:
+        return {
+            'error': 'Invalid robots.txt content. It might be an HTML page or malformed content.',
+            'robots_content': robots_content
+        }, None
+    parsed_data = analysis['parsed_data']
+    data = {
+        'fetch_status': fetch_status,
+        'errors': analysis['errors'],
+        'warnings': analysis['warnings'],
+        'parsed_data': parsed_data,
+        'robots_content': robots_content,
+        'cache_status': cache_status,
+    }
+    return data, [sitemap['url'] for sitemap in parsed_data['sitemaps']]
+
+
+def test_url_results(robots_content, test_urls, user_agents):
+    robots = compile_robots(robots_content)
+    matchers = [(agent, robots.matcher(agent)) for agent in user_agents]
+
+    results = []
+    for url in test_urls:
+        path = url_path(url)
+        url_result = {'url': url, 'results': {}}
+        for agent, matcher in matchers:
+            url_result['results'][agent] = matcher.is_allowed_path(path)
+        results.append(url_result)
+    return results
+
 
 class RobotsTxtAnalyzerView(APIView):
     def post(self, request):
@@ -24,146 +82,35 @@ class RobotsTxtAnalyzerView(APIView):
 
             if url:
                 try:
-                    response = requests.get(url)
-                    fetch_status = response.status_code
-                    robots_content = response.text
-
-                    if response.status_code != 200:
-                        return Response({
-                            'fetch_status': fetch_status,
-                            'error': f"Failed to fetch robots.txt. HTTP Status Code: {fetch_status}",
-                            'robots_content': robots_content
-                        }, status=status.HTTP_200_OK)
+                    fetched = fetch_robots(url, use_cache=not serializer.validated_data['no_cache'])
+                    if fetched['status_code'] != 200:
+                        return Response(fetch_failure_payload(fetched), status=status.HTTP_200_OK)
+                    robots_content = fetched['content']
+                    fetch_status = fetched['status_code']
+                    cache_status = fetched['cache_status']
                 except Exception as e:
                     return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
             else:
                 robots_content = content
                 fetch_status = None
+                cache_status = None
 
-            # Check if robots_content is valid robots.txt
-            if not self.is_valid_robots_txt(robots_content):
-                return Response({
-                    'error': 'Invalid robots.txt content. It might be an HTML page or malformed content.',
-                    'robots_content': robots_content
-                }, status=status.HTTP_200_OK)
-
-            # Syntax validation
-            errors = self.validate_syntax(robots_content)
-
-            # Parse robots.txt
-            parsed_data = self.parse_robots_txt(robots_content)
+            data, sitemap_urls = analysis_payload(robots_content, fetch_status, cache_status)
+            if sitemap_urls is None:
+                return Response(data, status=status.HTTP_200_OK)
 
-            data = {
-                'fetch_status': fetch_status,
-                'errors': errors,
-                'parsed_data': parsed_data,
-                'robots_content': robots_content,
-            }
+            # Sitemap checks are network I/O; the parsed rules above don't depend on them
+            mode = serializer.validated_data['sitemap_checks']
+            if mode == 'sync':
+                data['parsed_data']['sitemaps'] = check_sitemaps(sitemap_urls, deadline=settings.SITEMAP_CHECK_DEADLINE)
+            elif mode == 'async' and sitemap_urls:
+                job = submit_job(Job.KIND_SITEMAP_CHECK, params={'urls': sitemap_urls})
+                data['sitemap_job'] = job_payload(request, job)
 
             return Response(data, status=status.HTTP_200_OK)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def is_valid_robots_txt(self, content):
-        # Simple check to see if content starts with a valid directive or comment
-        lines = content.strip().split('\n')
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            if re.match(r'^(User-agent|Disallow|Allow|Sitemap|Crawl-delay):', line, re.I):
-                return True
-            else:
-                return False
-        return False
-
-    def validate_syntax(self, content):
-        errors = []
-        lines = content.split('\n')
-        directive_pattern = re.compile(
-            r'^(User-agent|Disallow|Allow|Sitemap|Crawl-delay):', re.I)
-        for idx, line in enumerate(lines):
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue  # Skip empty lines and comments
-            if not directive_pattern.match(line):
-                errors.append(f"Line {idx+1}: Unrecognized directive '{line}'")
-        return errors
-
-    def parse_robots_txt(self, content):
-        lines = content.split('\n')
-        agents = []
-        current_agents = []
-        current_rules = []
-        sitemaps = []
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            if line.lower().startswith('user-agent:'):
-                agent = line.split(':', 1)[1].strip()
-                if current_agents and current_rules:
-                    # We have agents and rules collected, store them
-                    agents.append({
-                        'user_agent': current_agents.copy(),
-                        'rules': current_rules.copy(),
-                        'rule_count': len(current_rules)
-                    })
-                    current_agents = [agent]
-                    current_rules.clear()
-                else:
-                    # Accumulate agents
-                    current_agents.append(agent)
-            elif line.lower().startswith('disallow:') or line.lower().startswith('allow:'):
-                allowance = line.lower().startswith('allow:')
-                path = line.split(':', 1)[1].strip()
-                current_rules.append({
-                    'path': path,
-                    'allowance': allowance
-                })
-            elif line.lower().startswith('sitemap:'):
-                sitemap_url = line.split(':', 1)[1].strip()
-                try:
-                    sitemap_response = requests.head(sitemap_url)
-                    sitemap_status = sitemap_response.status_code
-                except Exception as e:
-                    sitemap_status = 'Error'
-                sitemaps.append({'url': sitemap_url, 'status': sitemap_status})
-            else:
-                # Unknown directive
-                pass
-        # After loop, store any remaining agents
-        if current_agents:
-            agents.append({
-                'user_agent': current_agents.copy(),
-                'rules': current_rules.copy(),
-                'rule_count': len(current_rules)
-            })
-        # Compute stats
-        total_user_agents = len(agents)
-        total_rules = sum(agent['rule_count'] for agent in agents)
-        disallow_rules = []
-        allow_rules = []
-        for agent in agents:
-            for rule in agent['rules']:
-                if rule['allowance']:
-                    allow_rules.append(rule['path'])
-                else:
-                    disallow_rules.append(rule['path'])
-        total_disallow_rules = len(disallow_rules)
-        total_allow_rules = len(allow_rules)
-        unique_disallow_rules = len(set(disallow_rules))
-        unique_allow_rules = len(set(allow_rules))
-        stats = {
-            'total_user_agents': total_user_agents,
-            'total_rules': total_rules,
-            'total_disallow_rules': total_disallow_rules,
-            'unique_disallow_rules': unique_disallow_rules,
-            'total_allow_rules': total_allow_rules,
-            'unique_allow_rules': unique_allow_rules,
-        }
-        return {'agents': agents, 'sitemaps': sitemaps, 'stats': stats}
-
 class RobotsTxtComparisonView(APIView):
     def post(self, request):
         serializer = RobotsTxtComparisonSerializer(data=request.data)
@@ -171,6 +118,10 @@ class RobotsTxtComparisonView(APIView):
             content1 = serializer.validated_data.get('content1')
             content2 = serializer.validated_data.get('content2')
 
+            if serializer.validated_data['mode'] == 'semantic':
+                return Response(self.semantic_diff(content1, content2, serializer.validated_data),
+                                status=status.HTTP_200_OK)
+
             diff = list(unified_diff(
                 content1.splitlines(),
                 content2.splitlines(),
@@ -183,6 +134,26 @@ class RobotsTxtComparisonView(APIView):
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def semantic_diff(self, content1, content2, options):
+        old_robots = compile_robots(content1)
+        new_robots = compile_robots(content2)
+        data = {'rules': diff_rules(old_robots, new_robots)}
+
+        test_urls = options.get('test_urls') or []
+        uploaded_file = options.get('file')
+        if test_urls or uploaded_file:
+            user_agents = options.get('user_agents')
+            if not user_agents:
+                # Every agent either version names, plus everyone else
+                named = dict.fromkeys(list(old_robots.rules_by_agent) + list(new_robots.rules_by_agent))
+                user_agents = ['*'] + [agent for agent in named if agent != '*']
+            urls = iter(test_urls)
+            if uploaded_file:
+                rows = (url.strip() for url, _ in iter_url_rows(uploaded_file))
+                urls = chain(urls, (url for url in rows if url))
+            data['url_changes'] = diff_decisions(old_robots, new_robots, urls, user_agents)
+        return data
+
 class TestURLAgainstRobotsView(APIView):
     def post(self, request):
         serializer = TestURLSerializer(data=request.data)
@@ -192,28 +163,20 @@ class TestURLAgainstRobotsView(APIView):
             test_urls = serializer.validated_data.get('test_urls')
             user_agents = serializer.validated_data.get('user_agents') or ['*']
 
+            cache_status = None
             if robots_url:
                 try:
-                    response = requests.get(robots_url)
-                    robots_content = response.text
+                    fetched = fetch_robots(robots_url, use_cache=not serializer.validated_data['no_cache'])
+                    robots_content = fetched['content']
+                    cache_status = fetched['cache_status']
                 except Exception as e:
                     return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
             if not robots_content:
                 return Response({'error': 'No robots.txt content provided.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            parser = RobotExclusionRulesParser()
-            parser.parse(robots_content)
-
-            results = []
-            for url in test_urls:
-                url_result = {'url': url, 'results': {}}
-                for agent in user_agents:
-                    allowed = parser.is_allowed(agent, url)
-                    url_result['results'][agent] = allowed
-                results.append(url_result)
-
-            return Response({'results': results}, status=status.HTTP_200_OK)
+            results = test_url_results(robots_content, test_urls, user_agents)
+            return Response({'results': results, 'cache_status': cache_status}, status=status.HTTP_200_OK)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -225,26 +188,65 @@ class MultiRobotsTestView(APIView):
             test_urls = serializer.validated_data.get('test_urls')
             user_agents = serializer.validated_data.get('user_agents') or ['*']
 
-            parsers = []
-            for content in robots_contents:
-                parser = RobotExclusionRulesParser()
-                parser.parse(content)
-                parsers.append(parser)
-
-            results = []
-            for url in test_urls:
-                url_result = {'url': url, 'robots_results': []}
-                for idx, parser in enumerate(parsers):
-                    agents_result = {}
-                    for agent in user_agents:
-                        allowed = parser.is_allowed(agent, url)
-                        agents_result[agent] = allowed
-                    url_result['robots_results'].append({
-                        'robots_index': idx,
-                        'results': agents_result
-                    })
-                results.append(url_result)
-
-            return Response({'results': results}, status=status.HTTP_200_OK)
+            output_format = serializer.validated_data['output_format']
+            only_differences = serializer.validated_data['only_differences']
+
+            # Compile each robots.txt once and evaluate every URL x robots x agent in one pass
+            matrix = DecisionMatrix([compile_robots(content) for content in robots_contents],
+                                    user_agents, test_urls)
+            indexes = matrix.differing_indexes() if only_differences else None
+
+            if output_format == FORMAT_VERBOSE:
+                data = {'results': matrix.verbose(indexes)}
+            else:
+                data = {
+                    'format': output_format,
+                    'agents': user_agents,
+                    'url_count': len(test_urls) if indexes is None else len(indexes),
+                    'results': matrix.compact(output_format, indexes),
+                }
+            if indexes is not None:
+                data['url_indexes'] = indexes
+                data['summary'] = {'urls': len(test_urls), 'differing_urls': len(indexes)}
+            return Response(data, status=status.HTTP_200_OK)
         else:
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+class RobotsCoverageView(APIView):
+    def post(self, request):
+        serializer = RobotsCoverageSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        robots_content = data.get('robots_content')
+        cache_status = None
+        if data.get('robots_url'):
+            try:
+                fetched = fetch_robots(data['robots_url'], use_cache=not data['no_cache'])
+                if fetched['status_code'] != 200:
+                    return Response(fetch_failure_payload(fetched), status=status.HTTP_200_OK)
+                robots_content = fetched['content']
+                cache_status = fetched['cache_status']
+            except Exception as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        uploaded_file = data.get('file')
+        if data['mode'] == 'async':
+            # Millions of URLs take longer than a request should; let a worker stream them
+            job = submit_job(Job.KIND_ROBOTS_COVERAGE, params={
+                'robots_content': robots_content,
+                'urls': data.get('test_urls') or [],
+                'user_agents': data.get('user_agents') or [],
+            }, input_file=uploaded_file)
+            return Response(job_payload(request, job), status=status.HTTP_202_ACCEPTED)
+
+        # Stream the URLs: the list first, then the rows of the upload
+        urls = iter(data.get('test_urls') or [])
+        if uploaded_file:
+            rows = (url.strip() for url, _ in iter_url_rows(uploaded_file))
+            urls = chain(urls, (url for url in rows if url))
+
+        coverage = RobotsCoverage(compile_robots(robots_content), data.get('user_agents'))
+        coverage.add_many(urls)
+        return Response({**coverage.result(), 'cache_status': cache_status}, status=status.HTTP_200_OK)
@@ -0,0 +1,183 @@
+"""Single-pass SEO field extraction.
+
+``SEOExtractor`` is driven by the stdlib HTML tokenizer and collects every
+field ``check_url`` reports while the markup streams past, without building a
+DOM. It can be fed the whole document at once or chunk by chunk.
+"""
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+SKIPPED_LINK_SCHEMES = ('javascript:', 'mailto:', 'tel:', 'data:')
+
+
+class SEOExtractor(HTMLParser):
+    def __init__(self, base_url=None):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.base_host = (urlparse(base_url).hostname or '').lower() if base_url else ''
+
+        self.title = None
+        self.meta_description = None
+        self.meta_robots = None
+        self.canonical = None
+        self.open_graph = {}
+        self.hreflang = []
+        self.headings = {tag: [] for tag in HEADING_TAGS}
+        self.internal_links = 0
+        self.external_links = 0
+        # True once the parser has moved past the document head.
+        self.head_complete = False
+
+        self._text = []
+        self._in_title = False
+        self._title_parts = None
+        self._open_headings = []
+        self._skip_depth = 0
+
+    # Tokenizer callbacks
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag in ('script', 'style'):
+            self._skip_depth += 1
+            return
+        if tag == 'body':
+            self.head_complete = True
+        elif tag == 'title':
+            if self.title is None and self._title_parts is None:
+                self._in_title = True
+                self._title_parts = []
+        elif tag == 'meta':
+            self._handle_meta(dict(attrs))
+        elif tag == 'link':
+            self._handle_link(dict(attrs))
+        elif tag == 'a':
+            self._handle_anchor(dict(attrs))
+        elif tag in HEADING_TAGS:
+            self._open_headings.append((tag, []))
+
+    def handle_startendtag(self, tag, attrs):
+        # Void elements written as <meta ... />; there is no content to track.
+        if tag not in ('script', 'style'):
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if tag in ('script', 'style'):
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == 'head':
+            self.head_complete = True
+        elif tag == 'title' and self._in_title:
+            self._in_title = False
+            self.title = ''.join(self._title_parts)
+        elif tag in HEADING_TAGS:
+            for position in range(len(self._open_headings) - 1, -1, -1):
+                if self._open_headings[position][0] == tag:
+                    heading_tag, parts = self._open_headings.pop(position)
+                    self.headings[heading_tag].append(''.join(parts))
+                    break
+
+    def handle_data(self, data):
+        # Text can arrive in several pieces across feed() calls; buffer it
+        # until the next tag so each text node is stripped as a whole.
+        if not self._skip_depth:
+            self._text.append(data)
+
+    def close(self):
+        super().close()
+        self._flush_text()
+        # Unclosed title/headings still count, as they would in a DOM parse.
+        if self._in_title:
+            self._in_title = False
+            self.title = ''.join(self._title_parts)
+        while self._open_headings:
+            heading_tag, parts = self._open_headings.pop(0)
+            self.headings[heading_tag].append(''.join(parts))
+
+    # Helpers
+
+    def _flush_text(self):
+        if not self._text:
+            return
+        text = ''.join(self._text)
+        self._text = []
+        if self._in_title:
+            self._title_parts.append(text)
+        if self._open_headings:
+            stripped = text.strip()
+            if stripped:
+                for _, parts in self._open_headings:
+                    parts.append(stripped)
+
+    def _handle_meta(self, attrs):
+        content = attrs.get('content')
+        if content is None:
+            return
+        name = (attrs.get('name') or '').lower()
+        prop = (attrs.get('property') or '').lower()
+        if name == 'description' and self.meta_description is None:
+            self.meta_description = content
+        elif name == 'robots' and self.meta_robots is None:
+            self.meta_robots = content
+        if prop.startswith('og:'):
+            self.open_graph.setdefault(prop, content)
+
+    def _handle_link(self, attrs):
+        href = attrs.get('href')
+        if not href:
+            return
+        rel = (attrs.get('rel') or '').lower().split()
+        if 'canonical' in rel and self.canonical is None:
+            self.canonical = self._absolute(href)
+        elif 'alternate' in rel and attrs.get('hreflang'):
+            self.hreflang.append({'hreflang': attrs['hreflang'], 'href': self._absolute(href)})
+
+    def _handle_anchor(self, attrs):
+        href = (attrs.get('href') or '').strip()
+        if not href or href.startswith('#') or href.lower().startswith(SKIPPED_LINK_SCHEMES):
+            return
+        host = (urlparse(self._absolute(href)).hostname or '').lower()
+        if not host or host == self.base_host:
+            self.internal_links += 1
+        else:
+            self.external_links += 1
+
+    def _absolute(self, href):
+        return urljoin(self.base_url, href) if self.base_url else href
+
+    # Results
+
+    def result(self):
+        """Return the extracted fields in the ``check_url`` response format."""
+        meta_title = self.title.strip() if self.title else None
+        if not meta_title:
+            og_title = self.open_graph.get('og:title')
+            meta_title = og_title.strip() if og_title else None
+
+        meta_description = self.meta_description.strip() if self.meta_description else None
+        if not meta_description:
+            og_description = self.open_graph.get('og:description')
+            meta_description = og_description.strip() if og_description else None
+
+        return {
+            'meta_title': meta_title,
+            'meta_description': meta_description,
+            'h1_tags': self.headings['h1'],
+            'headings': self.headings,
+            'canonical': self.canonical,
+            'meta_robots': self.meta_robots,
+            'hreflang': self.hreflang,
+            'open_graph': self.open_graph,
+            'links': {
+                'internal': self.internal_links,
+                'external': self.external_links,
+            },
+        }
+
+
+def extract_seo_fields(html, base_url=None):
+    extractor = SEOExtractor(base_url)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.result()
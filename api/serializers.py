@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import ContactMessage
+from .models import ContactMessage, Job, URLCheck
 
 class ContactMessageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,12 +9,28 @@ class ContactMessageSerializer(serializers.ModelSerializer):
 
 class CSVFileSerializer(serializers.Serializer):
     file = serializers.FileField()
+    parallel = serializers.BooleanField(required=False, default=False)
+    depth = serializers.IntegerField(required=False, min_value=1, max_value=20)
+
+
+class CSVCompareSerializer(serializers.Serializer):
+    file = serializers.FileField()  # The current crawl
+    previous_file = serializers.FileField(required=False)
+    previous_job = serializers.UUIDField(required=False)  # A process_csv job whose upload is still stored
+    depth = serializers.IntegerField(required=False, min_value=1, max_value=20)
+
+    def validate(self, data):
+        if bool(data.get('previous_file')) == bool(data.get('previous_job')):
+            raise serializers.ValidationError("Exactly one of 'previous_file' or 'previous_job' must be provided.")
+        return data
 
 
 
 class RobotsTxtInputSerializer(serializers.Serializer):
     url = serializers.URLField(required=False, allow_null=True, allow_blank=True)
     content = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    no_cache = serializers.BooleanField(required=False, default=False)
+    sitemap_checks = serializers.ChoiceField(choices=['sync', 'skip', 'async'], required=False, default='sync')
 
     def validate(self, data):
         url = data.get('url')
@@ -26,6 +42,15 @@ class RobotsTxtInputSerializer(serializers.Serializer):
 class RobotsTxtComparisonSerializer(serializers.Serializer):
     content1 = serializers.CharField(required=True)
     content2 = serializers.CharField(required=True)
+    mode = serializers.ChoiceField(choices=['text', 'semantic'], required=False, default='text')
+    # Semantic mode: URLs to evaluate against both versions, as a list and/or a CSV upload
+    test_urls = serializers.ListField(
+        child=serializers.CharField(), required=False
+    )
+    file = serializers.FileField(required=False)
+    user_agents = serializers.ListField(
+        child=serializers.CharField(), required=False, allow_null=True
+    )
 
 class TestURLSerializer(serializers.Serializer):
     robots_url = serializers.URLField(required=False, allow_null=True, allow_blank=True)
@@ -36,6 +61,7 @@ class TestURLSerializer(serializers.Serializer):
     user_agents = serializers.ListField(
         child=serializers.CharField(), required=False, allow_null=True
     )
+    no_cache = serializers.BooleanField(required=False, default=False)
 
     def validate(self, data):
         robots_url = data.get('robots_url')
@@ -53,4 +79,109 @@ class MultiRobotsTestSerializer(serializers.Serializer):
     )
     user_agents = serializers.ListField(
         child=serializers.CharField(), required=False, allow_null=True
-    )
\ No newline at end of file
+    )
+    output_format = serializers.ChoiceField(choices=['verbose', 'columnar', 'bitset'], required=False,
+                                            default='verbose')
+    only_differences = serializers.BooleanField(required=False, default=False)
+
+class RobotsCoverageSerializer(serializers.Serializer):
+    robots_url = serializers.URLField(required=False, allow_null=True, allow_blank=True)
+    robots_content = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    test_urls = serializers.ListField(
+        child=serializers.CharField(), required=False
+    )
+    file = serializers.FileField(required=False)
+    user_agents = serializers.ListField(
+        child=serializers.CharField(), required=False, allow_null=True
+    )
+    no_cache = serializers.BooleanField(required=False, default=False)
+    mode = serializers.ChoiceField(choices=['sync', 'async'], required=False, default='sync')
+
+    def validate(self, data):
+        if not data.get('robots_url') and not data.get('robots_content'):
+            raise serializers.ValidationError("Either 'robots_url' or 'robots_content' must be provided.")
+        if not data.get('test_urls') and not data.get('file'):
+            raise serializers.ValidationError("Either 'test_urls' or 'file' must be provided.")
+        return data
+
+class BulkURLCheckSerializer(serializers.Serializer):
+    urls = serializers.ListField(
+        child=serializers.CharField(), required=False
+    )
+    file = serializers.FileField(required=False)
+    user_agent = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    no_cache = serializers.BooleanField(required=False, default=False)
+    max_chain_length = serializers.IntegerField(required=False, min_value=1)
+    include_redirect_graph = serializers.BooleanField(required=False, default=False)
+    honor_crawl_delay = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, data):
+        if not data.get('urls') and not data.get('file'):
+            raise serializers.ValidationError("Either 'urls' or 'file' must be provided.")
+        return data
+
+
+class JobSubmitSerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(choices=Job.KIND_CHOICES)
+    file = serializers.FileField(required=False)
+    urls = serializers.ListField(
+        child=serializers.CharField(), required=False
+    )
+    user_agent = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    no_cache = serializers.BooleanField(required=False, default=False)
+    max_chain_length = serializers.IntegerField(required=False, min_value=1)
+    honor_crawl_delay = serializers.BooleanField(required=False, default=False)
+    depth = serializers.IntegerField(required=False, min_value=1, max_value=20)
+    robots_content = serializers.CharField(required=False)
+    user_agents = serializers.ListField(
+        child=serializers.CharField(), required=False
+    )
+
+    def validate(self, data):
+        if data['kind'] == Job.KIND_PROCESS_CSV and not data.get('file'):
+            raise serializers.ValidationError("A 'file' is required for CSV processing jobs.")
+        if data['kind'] == Job.KIND_BULK_CHECK and not data.get('urls') and not data.get('file'):
+            raise serializers.ValidationError("Either 'urls' or 'file' must be provided.")
+        if data['kind'] == Job.KIND_SITEMAP_CHECK and not data.get('urls'):
+            raise serializers.ValidationError("'urls' is required for sitemap check jobs.")
+        if data['kind'] == Job.KIND_ROBOTS_COVERAGE:
+            if not data.get('robots_content'):
+                raise serializers.ValidationError("'robots_content' is required for robots coverage jobs.")
+            if not data.get('urls') and not data.get('file'):
+                raise serializers.ValidationError("Either 'urls' or 'file' must be provided.")
+        return data
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'progress', 'total', 'error', 'cancel_requested',
+                  'created_at', 'started_at', 'finished_at', 'expires_at']
+
+
+class CrawlHistoryQuerySerializer(serializers.Serializer):
+    url = serializers.URLField()
+    limit = serializers.IntegerField(required=False, default=100, min_value=1, max_value=1000)
+
+
+class CrawlChangesQuerySerializer(serializers.Serializer):
+    change = serializers.ChoiceField(choices=['status', 'seo', 'redirect'], required=False, default='status')
+    since = serializers.DateTimeField(required=False)
+    days = serializers.IntegerField(required=False, default=7, min_value=1)  # When no 'since' is given
+    host = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, default=1000, min_value=1, max_value=10000)
+
+
+class URLCheckSerializer(serializers.ModelSerializer):
+    url = serializers.CharField(source='url.url')
+    redirect_hops = serializers.SerializerMethodField()
+
+    class Meta:
+        model = URLCheck
+        fields = ['url', 'checked_at', 'source', 'initial_status_code', 'final_status_code', 'previous_status_code',
+                  'redirect_hops', 'response_time', 'content_type', 'meta_title', 'meta_description', 'h1',
+                  'h1_count', 'canonical', 'meta_robots', 'error', 'is_first', 'status_changed', 'seo_changed',
+                  'redirect_changed']
+
+    def get_redirect_hops(self, check):
+        return check.chain.hops if check.chain is not None else None
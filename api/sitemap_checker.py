@@ -0,0 +1,61 @@
+"""Status checks for the sitemaps listed in a robots.txt.
+
+Each distinct sitemap URL gets one HEAD request on a bounded thread pool.
+Every request has its own timeout, and the batch as a whole has a deadline
+after which unfinished checks are reported as timed out rather than holding
+up the response.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import time
+
+from django.conf import settings
+
+from . import http_client
+
+STATUS_ERROR = 'Error'
+STATUS_TIMEOUT = 'Timeout'
+
+
+def check_sitemap(url, timeout=None):
+    import requests
+
+    try:
+        return http_client.head(url, timeout=timeout).status_code
+    except requests.Timeout:
+        return STATUS_TIMEOUT
+    except Exception:
+        return STATUS_ERROR
+
+
+def check_sitemaps(urls, concurrency=None, timeout=None, deadline=None, on_result=None):
+    """HEAD each distinct URL in ``urls``; return ``[{'url', 'status'}]`` in first-seen order.
+
+    ``status`` is the HTTP status code, 'Error', or 'Timeout' for checks that
+    did not finish within ``timeout`` or the overall ``deadline`` (seconds,
+    None for no deadline). ``on_result(done_count)`` is called as checks finish.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return []
+    concurrency = concurrency or settings.SITEMAP_CHECK_CONCURRENCY
+    timeout = timeout or (settings.HTTP_CONNECT_TIMEOUT, settings.SITEMAP_CHECK_TIMEOUT)
+    ends_at = time.monotonic() + deadline if deadline is not None else None
+
+    statuses = {}
+    executor = ThreadPoolExecutor(max_workers=min(concurrency, len(urls)))
+    try:
+        futures = {executor.submit(check_sitemap, url, timeout): url for url in urls}
+        pending = set(futures)
+        while pending:
+            remaining = ends_at - time.monotonic() if ends_at is not None else None
+            if remaining is not None and remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                statuses[futures[future]] = future.result()
+            if on_result is not None and done:
+                on_result(len(statuses))
+    finally:
+        # Don't wait for checks still running past the deadline; their own timeout ends them.
+        executor.shutdown(wait=False, cancel_futures=True)
+    return [{'url': url, 'status': statuses.get(url, STATUS_TIMEOUT)} for url in urls]
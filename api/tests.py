@@ -1,3 +1,1437 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from email.utils import formatdate
+import io
+import json
+import os
+import tempfile
+import time
 
-# Create your tests here.
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import AsyncClient, Client, TestCase, override_settings
+from django.utils import timezone
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from . import fetch_cache, http_client, metrics
+from . import job_handlers  # noqa: F401  (registers the job handlers)
+from .benchmarks.datasets import synthetic_crawl_rows
+from .benchmarks.origin import StandInOrigin
+from .benchmarks.smtp import StandInSMTP
+from .benchmarks.startup import STAGES, import_times, run_stage
+from .benchmarks.stats import summarize
+from .benchmarks.suite import compare
+from .bulk_checker import BulkURLChecker
+from .cache_backends import DjangoCacheBackend, MemoryCacheBackend
+from .crawl_compare import ADDED, MATCHED, STATE_MASK, URLHashTable, compare_crawls, url_key
+from .crawl_history import CrawlHistoryWriter, record_results
+from .csv_ingest import detect_encoding, iter_url_rows
+from .csv_views import ProcessCSVView
+from .jobs import (
+    JobCancelled, JobContext, cancel_job, claim_next_job, finish_job, purge_expired_jobs, requeue_stale_jobs,
+    run_job, submit_job,
+)
+from .models import CrawledURL, Job, JobInputChunk, OutboundEmail, URLCheck
+from .outbox import enqueue_email, send_pending
+from .page_reader import PageBodyReader
+from .politeness import HostScheduler, HostThrottle, parse_retry_after
+from .redirect_graph import RedirectGraph
+from .robots_batch import DecisionMatrix, pack_bits
+from .robots_cache import CompiledRobotsCache, RobotsFetchCache, freshness_lifetime
+from .robots_matcher import CompiledRobots, normalize_path
+from .robots_parser import ALLOW, DISALLOW, MAX_SIZE, USER_AGENT, iter_tokens, parse_robots
+from .seo_extractor import SEOExtractor, extract_seo_fields
+from .sitemap_checker import check_sitemaps
+from .url_checker import check_url
+from .url_structure import URLStructureAggregator, aggregate_parallel
+
+
+class JobQueueTests(TestCase):
+    def submit(self):
+        return submit_job(Job.KIND_SITEMAP_CHECK, params={'urls': ['https://example.com/sitemap.xml']})
+
+    def make_stale(self, job):
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+
+    def test_claim_takes_the_oldest_queued_job(self):
+        first, second = self.submit(), self.submit()
+        claimed = claim_next_job('worker-a')
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual(claimed.status, Job.STATUS_RUNNING)
+        self.assertEqual(claimed.worker, 'worker-a')
+        self.assertEqual(claimed.attempts, 1)
+        self.assertEqual(claim_next_job('worker-b').pk, second.pk)
+
+    def test_a_claimed_job_is_not_claimed_again(self):
+        job = self.submit()
+        self.assertEqual(claim_next_job('worker-a').pk, job.pk)
+        self.assertIsNone(claim_next_job('worker-b'))
+        self.assertEqual(Job.objects.get(pk=job.pk).worker, 'worker-a')
+
+    def test_claim_race_has_one_winner(self):
+        job = self.submit()
+        # Both workers saw the job queued; only the first conditional UPDATE may match
+        queued = Job.objects.filter(pk=job.pk, status=Job.STATUS_QUEUED)
+        self.assertEqual(queued.update(status=Job.STATUS_RUNNING, worker='worker-a'), 1)
+        self.assertEqual(queued.update(status=Job.STATUS_RUNNING, worker='worker-b'), 0)
+        self.assertIsNone(claim_next_job('worker-c'))
+        self.assertEqual(Job.objects.get(pk=job.pk).worker, 'worker-a')
+
+    @override_settings(JOB_STALE_AFTER=60, JOB_MAX_ATTEMPTS=2)
+    def test_stale_jobs_are_requeued_then_failed(self):
+        job = self.submit()
+        claim_next_job('worker-a')
+        self.make_stale(job)
+        self.assertEqual(requeue_stale_jobs(), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (Job.STATUS_QUEUED, ''))
+
+        claim_next_job('worker-b')
+        self.make_stale(job)
+        self.assertEqual(requeue_stale_jobs(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+
+    def test_live_jobs_are_not_requeued(self):
+        self.submit()
+        claim_next_job('worker-a')
+        self.assertEqual(requeue_stale_jobs(), (0, 0))
+
+    @override_settings(JOB_STALE_AFTER=60)
+    def test_a_requeued_run_cannot_finish_the_job(self):
+        job = self.submit()
+        stale_run = claim_next_job('worker-a')
+        self.make_stale(job)
+        requeue_stale_jobs()
+        current_run = claim_next_job('worker-b')
+
+        self.assertFalse(finish_job(stale_run, Job.STATUS_SUCCEEDED, result={'from': 'worker-a'}))
+        with self.assertRaises(JobCancelled):
+            JobContext(stale_run).report_progress(10, force=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.progress), (Job.STATUS_RUNNING, None, 0))
+
+        self.assertTrue(finish_job(current_run, Job.STATUS_SUCCEEDED, result={'from': 'worker-b'}))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.STATUS_SUCCEEDED, {'from': 'worker-b'}))
+
+    def test_cancel_queued_job(self):
+        job = cancel_job(self.submit())
+        self.assertEqual(job.status, Job.STATUS_CANCELLED)
+        self.assertIsNotNone(job.expires_at)
+        self.assertIsNone(claim_next_job('worker-a'))
+
+    def test_cancel_running_job_is_noticed_by_its_worker(self):
+        self.submit()
+        running = claim_next_job('worker-a')
+        job = cancel_job(running)
+        self.assertEqual(job.status, Job.STATUS_RUNNING)
+        self.assertTrue(job.cancel_requested)
+        with self.assertRaises(JobCancelled):
+            JobContext(running).report_progress(1, force=True)
+
+    def test_purge_deletes_expired_jobs_and_their_input(self):
+        expired = submit_job(Job.KIND_PROCESS_CSV,
+                             input_file=SimpleUploadedFile('crawl.csv', b'https://example.com/,true\n'))
+        kept = self.submit()
+        Job.objects.filter(pk=expired.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        Job.objects.filter(pk=kept.pk).update(expires_at=timezone.now() + timedelta(days=1))
+        self.assertEqual(JobInputChunk.objects.filter(job=expired).count(), 1)
+
+        purge_expired_jobs()
+        self.assertFalse(Job.objects.filter(pk=expired.pk).exists())
+        self.assertFalse(JobInputChunk.objects.filter(job_id=expired.pk).exists())
+        self.assertTrue(Job.objects.filter(pk=kept.pk).exists())
+
+
+class RobotsMatcherTests(TestCase):
+    def assertDecisions(self, content, decisions, agent='Googlebot'):
+        robots = CompiledRobots(content)
+        for path, allowed in decisions.items():
+            with self.subTest(path=path):
+                self.assertEqual(robots.is_allowed(agent, f'https://example.com{path}'), allowed)
+
+    def test_google_precedence_examples(self):
+        # The examples of Google's robots.txt documentation
+        self.assertDecisions('User-agent: *\nAllow: /p\nDisallow: /\n', {'/page': True, '/other': False})
+        self.assertDecisions('User-agent: *\nAllow: /folder\nDisallow: /folder\n', {'/folder/page': True})
+        self.assertDecisions('User-agent: *\nAllow: /page\nDisallow: /*.html\n', {'/page.html': False, '/page': True})
+        self.assertDecisions('User-agent: *\nAllow: /$\nDisallow: /\n', {'/': True, '/page.html': False})
+
+    def test_longest_match_wins_whatever_the_order(self):
+        self.assertDecisions('User-agent: *\nDisallow: /shop/cart\nAllow: /shop\n',
+                             {'/shop/item': True, '/shop/cart/1': False})
+
+    def test_unmatched_urls_and_robots_txt_are_allowed(self):
+        self.assertDecisions('User-agent: *\nDisallow: /\n', {'/robots.txt': True, '/a': False})
+        self.assertDecisions('User-agent: *\nDisallow:\n', {'/a': True})
+
+    def test_wildcards(self):
+        self.assertDecisions('User-agent: *\nDisallow: /*/private/\nDisallow: /*?sort=\n', {
+            '/a/private/x': False,
+            '/a/b/private/': False,
+            '/private/': True,
+            '/list?sort=asc': False,
+            '/list?page=2&sort=asc': True,
+            '/list?page=2': True,
+        })
+
+    def test_end_anchor(self):
+        self.assertDecisions('User-agent: *\nDisallow: /*.php$\nAllow: /index.php$\n', {
+            '/a.php': False,
+            '/a.php?x=1': True,
+            '/a.php5': True,
+            '/index.php': True,
+        })
+
+    def test_wildcard_and_literal_rules_compare_by_length(self):
+        self.assertDecisions('User-agent: *\nDisallow: /*.pdf\nAllow: /files/\n', {
+            '/files/a.pdf': True,  # /files/ (7) is longer than /*.pdf (6)
+            '/docs/a.pdf': False,
+        })
+        self.assertDecisions('User-agent: *\nDisallow: /f*.pdf\nAllow: /f/\n', {'/f/a.pdf': False})
+
+    def test_percent_encoding(self):
+        self.assertEqual(normalize_path('/caf\u00e9'), '/caf%C3%A9')
+        self.assertEqual(normalize_path('/a%2fb'), '/a%2Fb')
+        self.assertDecisions('User-agent: *\nDisallow: /caf\u00e9\n', {'/caf%C3%A9/menu': False, '/cafe': True})
+        self.assertDecisions('User-agent: *\nDisallow: /caf%c3%a9\n', {'/caf\u00e9': False, '/caf%C3%A9': False})
+
+    def test_agent_groups(self):
+        content = (
+            'User-agent: *\nDisallow: /all\n\n'
+            'User-agent: Googlebot\nDisallow: /google\n\n'
+            'User-agent: Bingbot\nUser-agent: Slurp\nDisallow: /shared\n\n'
+            'User-agent: googlebot\nDisallow: /google-again\n'
+        )
+        robots = CompiledRobots(content)
+        url = 'https://example.com{}'.format
+        # Groups naming the same agent are merged; the * group no longer applies to it
+        self.assertFalse(robots.is_allowed('Googlebot/2.1', url('/google')))
+        self.assertFalse(robots.is_allowed('Googlebot/2.1', url('/google-again')))
+        self.assertTrue(robots.is_allowed('Googlebot/2.1', url('/all')))
+        # Several user-agent lines share the rules that follow them
+        self.assertFalse(robots.is_allowed('bingbot', url('/shared')))
+        self.assertFalse(robots.is_allowed('Slurp', url('/shared')))
+        # A more specific crawler falls back to its product's group, unknown ones to *
+        self.assertEqual(robots.resolve_agent('Googlebot-Image/1.0'), 'googlebot')
+        self.assertEqual(robots.resolve_agent('SomeBot'), '*')
+        self.assertFalse(robots.is_allowed('SomeBot', url('/all')))
+
+    def test_most_specific_agent_group(self):
+        robots = CompiledRobots('User-agent: googlebot\nDisallow: /a\n\nUser-agent: googlebot-news\nDisallow: /b\n')
+        self.assertEqual(robots.resolve_agent('Googlebot-News'), 'googlebot-news')
+        self.assertTrue(robots.is_allowed('Googlebot-News', 'https://example.com/a'))
+        self.assertFalse(robots.is_allowed('Googlebot-News', 'https://example.com/b'))
+        self.assertIsNone(CompiledRobots('User-agent: googlebot\nDisallow: /\n').resolve_agent('bingbot'))
+
+    def test_misspelled_directives(self):
+        content = 'useragent: *\ndissallow: /a\nDisalow: /b\nDISALLOW: /c\nAllow: /a/ok\n'
+        directives = [directive for _, directive, _, _ in iter_tokens(content)]
+        self.assertEqual(directives, [USER_AGENT, DISALLOW, DISALLOW, DISALLOW, ALLOW])
+        self.assertDecisions(content, {'/a/x': False, '/b': False, '/c': False, '/a/ok': True, '/d': True})
+
+
+class RobotsComparisonTests(TestCase):
+    def test_semantic_diff_skips_unparsable_urls(self):
+        response = APIClient().post('/api/robots-compare/', {
+            'content1': 'User-agent: *\nDisallow: /a\n',
+            'content2': 'User-agent: *\nDisallow: /b\n',
+            'mode': 'semantic',
+            'test_urls': ['http://[::1', 'https://example.com/a', 'https://example.com/b', 'https://example.com/c'],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        changes = response.json()['url_changes']
+        self.assertEqual((changes['urls_tested'], changes['urls_invalid'], changes['flipped_urls']), (3, 1, 2))
+        self.assertEqual(changes['flips']['*'], {'allowed_to_disallowed': 1, 'disallowed_to_allowed': 1})
+
+
+class RobotsCoverageTests(TestCase):
+    robots_content = 'User-agent: *\nDisallow: /private\nDisallow: /never\n'
+    urls = ['https://example.com/private/a', 'http://[::1', 'https://example.com/public']
+
+    def assertCoverage(self, result):
+        self.assertEqual((result['urls_tested'], result['urls_invalid']), (2, 1))
+        group, = result['groups']
+        self.assertEqual((group['blocked'], group['allowed'], group['dead_rules']), (1, 1, 1))
+
+    def test_unparsable_urls_are_skipped(self):
+        response = APIClient().post('/api/robots-coverage/', {
+            'robots_content': self.robots_content, 'test_urls': self.urls,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertCoverage(response.json())
+
+    def test_robots_url_that_is_not_a_robots_txt(self):
+        with StandInOrigin(robots=None) as origin:
+            for mode in ('sync', 'async'):
+                with self.subTest(mode=mode):
+                    response = APIClient().post('/api/robots-coverage/', {
+                        'robots_url': f'{origin.url}/robots.txt', 'test_urls': self.urls, 'mode': mode,
+                        'no_cache': True,
+                    }, format='json')
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.json()['fetch_status'], 404)
+                    self.assertNotIn('groups', response.json())
+        self.assertFalse(Job.objects.exists())
+
+    def test_robots_url(self):
+        with StandInOrigin(robots=self.robots_content) as origin:
+            response = APIClient().post('/api/robots-coverage/', {
+                'robots_url': f'{origin.url}/robots.txt', 'test_urls': self.urls, 'no_cache': True,
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertCoverage(response.json())
+
+    def test_unparsable_urls_are_skipped_by_the_job(self):
+        submit_job(Job.KIND_ROBOTS_COVERAGE, params={'robots_content': self.robots_content, 'urls': self.urls})
+        job = claim_next_job('worker-a')
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED, job.error)
+        self.assertCoverage(job.result)
+
+
+class AsyncViewTests(TestCase):
+    async def test_url_matching_does_not_block_the_event_loop(self):
+        body = {
+            'robots_content': 'User-agent: *\n' + ''.join(f'Disallow: /*/{n}/*.php$\n' for n in range(200)),
+            'test_urls': [f'https://example.com/a/{n}/b/c.php?x={n}' for n in range(4000)],
+            'user_agents': ['Googlebot', 'bingbot'],
+        }
+        gaps = []
+
+        async def tick():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.001)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticker = asyncio.create_task(tick())
+        start = time.perf_counter()
+        response = await AsyncClient().post('/api/async/robots-test-url/', body, content_type='application/json')
+        elapsed = time.perf_counter() - start
+        ticker.cancel()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 4000)
+        # The loop kept turning while the URLs were matched
+        self.assertLess(max(gaps), elapsed / 3)
+
+    def test_json_body_must_be_an_object(self):
+        client = Client()
+        for path in ('/api/async/check-url/', '/api/async/robots-analyze/', '/api/async/robots-test-url/'):
+            for body in ('["https://example.com/"]', '{"url": ', '"https://example.com/"'):
+                with self.subTest(path=path, body=body):
+                    response = client.post(path, body, content_type='application/json')
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json(), {'error': 'Invalid JSON body.'})
+
+
+@override_settings(DEFAULT_FROM_EMAIL='noreply@example.com')
+class OutboxTests(TestCase):
+    def make_due(self):
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+
+    def test_contact_request_does_not_wait_for_the_mail_server(self):
+        with StandInSMTP(delay=0.5) as smtp, self.settings(**smtp.email_settings()):
+            start = time.perf_counter()
+            response = APIClient().post('/api/contact/', {
+                'name': 'Ada', 'email': 'ada@example.com', 'subject': 'Hello', 'message': 'Hi there',
+            }, format='json')
+            elapsed = time.perf_counter() - start
+            self.assertEqual(response.status_code, 201)
+            self.assertLess(elapsed, smtp.server.delay)
+            self.assertEqual(smtp.server.connections, 0)
+
+            self.assertEqual(send_pending(), {'sent': 1, 'retrying': 0, 'failed': 0})
+            self.assertEqual(smtp.server.messages, 1)
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.STATUS_SENT)
+
+    def test_the_mailer_sends_the_outbox_not_the_job_worker(self):
+        enqueue_email('Subject', 'Body', ['to@example.com'])
+        call_command('run_jobs', burst=True)
+        self.assertEqual(len(mail.outbox), 0)
+        call_command('send_outbox', burst=True)
+        self.assertEqual([message.subject for message in mail.outbox], ['Subject'])
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.STATUS_SENT)
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_an_unreachable_mail_server_spends_no_attempts(self):
+        for index in range(3):
+            enqueue_email(f'Subject {index}', 'Body', ['to@example.com'])
+        unreachable = StandInSMTP()
+        unreachable.server.server_close()
+        with self.settings(**unreachable.email_settings()):
+            for _ in range(4):
+                self.assertEqual(send_pending(), {'sent': 0, 'retrying': 3, 'failed': 0})
+                self.make_due()
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', 'attempts', 'claim_token')),
+                         {(OutboundEmail.STATUS_PENDING, 0, '')})
+
+        with StandInSMTP() as smtp, self.settings(**smtp.email_settings()):
+            self.assertEqual(send_pending(), {'sent': 3, 'retrying': 0, 'failed': 0})
+            self.assertEqual((smtp.server.connections, smtp.server.messages), (1, 3))
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', 'attempts')), {(OutboundEmail.STATUS_SENT, 1)})
+
+
+class CrawlHistoryTests(TestCase):
+    def result(self, url, status_code=200):
+        return {'url': url, 'initial_status_code': status_code, 'final_status_code': status_code}
+
+    def test_a_malformed_url_drops_only_its_own_result(self):
+        results = [self.result('https://example.com/a'), self.result('http://example.com:99999/'),
+                   self.result('HTTPS://Example.com:443/b#top', 404)]
+        self.assertEqual(record_results(results, 'check'), 2)
+        self.assertEqual(sorted(CrawledURL.objects.values_list('url', flat=True)),
+                         ['https://example.com/a', 'https://example.com/b'])
+        self.assertEqual(URLCheck.objects.count(), 2)
+
+    def test_a_malformed_url_does_not_lose_the_pending_batch(self):
+        with CrawlHistoryWriter('check', batch_size=2) as writer:
+            writer.add(self.result('https://example.com/a'))
+            writer.add(self.result('http://[::1'))
+            writer.add(self.result('https://example.com/b'))
+        self.assertEqual(writer.written, 2)
+        self.assertEqual(URLCheck.objects.count(), 2)
+
+    def test_history_of_a_malformed_url_is_a_bad_request(self):
+        response = APIClient().get('/api/crawl-history/', {'url': 'http://example.com:99999/'})
+        self.assertEqual(response.status_code, 400)
+
+
+class URLHashTableTests(TestCase):
+    def key(self, home_slot, n=0):
+        """A key whose first probe is ``home_slot`` in a table of up to ``1 << 16`` slots."""
+        return (n << 16 | home_slot) << 4
+
+    def test_url_keys_leave_the_state_bits_free(self):
+        for url in ('https://example.com/', 'https://example.com/a', ''):
+            key = url_key(url)
+            self.assertTrue(key)
+            self.assertEqual(key & STATE_MASK, 0)
+        self.assertEqual(url_key('https://example.com/'), url_key('https://example.com/'))
+
+    def test_state_bits(self):
+        table = URLHashTable(capacity=8)
+        key = self.key(1)
+        self.assertIsNone(table.get(key))
+        self.assertTrue(table.add(key, 2))
+        self.assertFalse(table.add(key, 1))  # Already stored: its state is kept
+        self.assertEqual(table.get(key), 2)
+        table.set_flag(key, MATCHED)
+        self.assertEqual(table.get(key), 2 | MATCHED)
+        self.assertEqual(table.size, 1)
+
+    def test_colliding_keys_probe_the_next_slots(self):
+        table = URLHashTable(capacity=8)
+        first, second, third = self.key(7), self.key(7, 1), self.key(7, 2)
+        table.add(first, 1)
+        table.add(second, 2)
+        table.add(third, ADDED)
+        # Linear probing wraps around the end of the table
+        self.assertEqual([slot & STATE_MASK for slot in table.slots], [2, ADDED, 0, 0, 0, 0, 0, 1])
+        self.assertEqual((table.get(first), table.get(second), table.get(third)), (1, 2, ADDED))
+        self.assertIsNone(table.get(self.key(7, 3)))
+
+    def test_grow_rehashes_every_key(self):
+        table = URLHashTable(capacity=4)
+        keys = [self.key(1, n) for n in range(3)] + [self.key(slot) for slot in range(2, 7)]
+        for state, key in enumerate(keys):
+            table.add(key, state)
+            self.assertLessEqual(table.size * 3, len(table.slots) * 2)
+        self.assertEqual((len(table.slots), table.mask, table.size), (16, 15, len(keys)))
+        self.assertEqual([table.get(key) for key in keys], list(range(len(keys))))
+
+
+class CrawlComparisonTests(TestCase):
+    previous = (b'https://example.com/a,true\nhttps://example.com/a,true\nhttps://example.com/b/x,true\n'
+                b'https://example.com/c,false\nhttps://example.com/d?page=2\n')
+    current = (b'https://example.com/a,false\nhttps://example.com/a,false\nhttps://example.com/c,true\n'
+               b'https://example.com/e?sort=asc,true\nhttps://example.com/e?sort=asc,true\n')
+
+    def upload(self, content, name='crawl.csv'):
+        return SimpleUploadedFile(name, content, content_type='text/csv')
+
+    def assertComparison(self, result):
+        self.assertEqual(result['summary'], {
+            'previousRows': 5, 'currentRows': 5, 'previousUrls': 4, 'currentUrls': 3,
+            'added': 1, 'removed': 2, 'becameIndexable': 1, 'becameNonIndexable': 1,
+        })
+        self.assertEqual(result['addedUrls'], ['https://example.com/e?sort=asc'])
+        self.assertEqual(result['removedUrls'], ['https://example.com/b/x', 'https://example.com/d?page=2'])
+        self.assertEqual(result['indexabilityChanges'], {
+            'becameIndexable': ['https://example.com/c'], 'becameNonIndexable': ['https://example.com/a'],
+        })
+
+    def test_added_removed_and_repeated_rows(self):
+        result = compare_crawls(self.upload(self.previous), self.upload(self.current), depth=1)
+        self.assertComparison(result)
+        folders = result['folderChanges']
+        # Folders count rows; added and removed URLs are counted once however often they repeat
+        counts = {segment: (folder['previous'], folder['current'], folder['added'], folder['removed'])
+                  for segment, folder in folders.items()}
+        self.assertEqual(counts, {'a': (2, 2, 0, 0), 'b': (1, 0, 0, 1), 'c': (1, 1, 0, 0), 'd': (1, 0, 0, 1),
+                                  'e': (0, 2, 1, 0)})
+        self.assertEqual(folders['a']['becameNonIndexable'], 1)
+        self.assertEqual(folders['c']['becameIndexable'], 1)
+        self.assertEqual(list(result['newParams']), ['sort'])
+        self.assertEqual(list(result['disappearedParams']), ['page'])
+
+    def test_without_indexability_data(self):
+        result = compare_crawls(self.upload(b'https://example.com/a\nhttps://example.com/b\n'),
+                                self.upload(b'https://example.com/b\nhttps://example.com/c\n'))
+        self.assertFalse(result['indexabilityDataProvided'])
+        self.assertIsNone(result['indexabilityChanges'])
+        self.assertNotIn('becameIndexable', result['summary'])
+        self.assertEqual((result['summary']['added'], result['summary']['removed']), (1, 1))
+
+    @override_settings(JOB_INPUT_CHUNK_SIZE=16)
+    def test_previous_crawl_stored_by_a_job(self):
+        # Small chunks, so reading the previous crawl twice seeks back across several of them
+        job = submit_job(Job.KIND_PROCESS_CSV, input_file=self.upload(self.previous))
+        self.assertGreater(JobInputChunk.objects.filter(job=job).count(), 2)
+        response = APIClient().post('/api/compare-csv/', {
+            'file': self.upload(self.current), 'previous_job': str(job.pk), 'depth': 1,
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertComparison(response.json())
+
+    def test_unknown_previous_job(self):
+        response = APIClient().post('/api/compare-csv/', {
+            'file': self.upload(self.current), 'previous_job': '00000000-0000-0000-0000-000000000000',
+        }, format='multipart')
+        self.assertEqual(response.status_code, 404)
+
+
+class ParallelAggregationTests(TestCase):
+    def test_parallel_output_matches_the_serial_output(self):
+        # A blank URL first: its folders get their sampleUrl from a later row, possibly of another chunk
+        rows = [('', None)] + list(synthetic_crawl_rows(200, seed=3)) + [('https://www.example.com/blog?q=1', None)]
+        urls, indexability = zip(*rows)
+        expected = json.dumps(ProcessCSVView().process_urls(urls, indexability))
+        for chunk_size in (1, 7, 64, 1000):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(json.dumps(aggregate_parallel(iter(rows), 2, chunk_size).result()), expected)
+
+
+ROOT = 'https://example.com/'
+RED = 'https://example.com/shop/shoes/red?color=red&color=blue&size=9'
+PAGE = 'https://example.com/shop?page=2'
+POST = 'https://example.com/blog/2024/post'
+BLUE = 'https://example.com/shop/shoes/blue?color=blue'
+XY = 'https://example.com/blog/shoes/x/y'
+
+
+def folder(count, sample_url, non_indexable, subfolders=None, params=None, param_samples=None):
+    """A ``folderStructure`` entry, keys in response order."""
+    node = {'count': count}
+    if subfolders is not None:
+        node['subfolders'] = subfolders
+    node.update(params=params or {}, paramSamples=param_samples or {}, sampleUrl=sample_url,
+                nonIndexableCount=non_indexable)
+    return node
+
+
+class URLStructureTests(TestCase):
+    rows = [(ROOT, True), (RED, False), (PAGE, True), (POST, True), (BLUE, True), (XY, False)]
+    # The response of the dict-of-dicts implementation the trie replaced, for ``rows``
+    expected = {
+        'folderStructure': {
+            '': folder(1, ROOT, 0, {'root': folder(1, ROOT, 0, {'root': folder(1, ROOT, 0)})}),
+            'shop': folder(3, RED, 1, {
+                'shoes': folder(2, RED, 1, {'red': folder(1, RED, 1), 'blue': folder(1, BLUE, 0)}),
+                'root': folder(1, PAGE, 0, {'root': folder(1, PAGE, 0)}),
+            }, {'color': 3, 'size': 1, 'page': 1}, {'color': RED, 'size': RED, 'page': PAGE}),
+            'blog': folder(2, POST, 1, {
+                '2024': folder(1, POST, 0, {'post': folder(1, POST, 0)}),
+                'shoes': folder(1, XY, 1, {'x': folder(1, XY, 1)}),
+            }),
+        },
+        'secondLevelFolders': {
+            'root': {'count': 2, 'subfolders': {'root': {'count': 2, 'sampleUrl': ROOT}}, 'sampleUrl': ROOT,
+                     'nonIndexableCount': 0},
+            'shoes': {'count': 3, 'subfolders': {
+                'red': {'count': 1, 'sampleUrl': RED},
+                'blue': {'count': 1, 'sampleUrl': BLUE},
+                'x': {'count': 1, 'sampleUrl': XY},
+            }, 'sampleUrl': RED, 'nonIndexableCount': 2},
+            '2024': {'count': 1, 'subfolders': {'post': {'count': 1, 'sampleUrl': POST}}, 'sampleUrl': POST,
+                     'nonIndexableCount': 0},
+        },
+        'globalParams': {
+            'color': {'count': 3, 'folders': {'shop': {'count': 3, 'sampleUrl': RED}}},
+            'size': {'count': 1, 'folders': {'shop': {'count': 1, 'sampleUrl': RED}}},
+            'page': {'count': 1, 'folders': {'shop': {'count': 1, 'sampleUrl': PAGE}}},
+        },
+        'indexabilityDataProvided': True,
+    }
+
+    def test_output_of_the_previous_implementation(self):
+        # Compared as JSON, so the order of keys counts too
+        result = URLStructureAggregator().add_many(self.rows).result()
+        self.assertEqual(json.dumps(result), json.dumps(self.expected))
+
+    def test_without_indexability_data(self):
+        result = URLStructureAggregator().add_many((url, None) for url, _ in self.rows).result()
+        self.assertFalse(result['indexabilityDataProvided'])
+        self.assertNotIn('nonIndexableCount', result['folderStructure']['shop'])
+        self.assertNotIn('nonIndexableCount', result['secondLevelFolders']['shoes'])
+
+    def test_depth(self):
+        self.assertEqual(URLStructureAggregator(depth=1).add_many(self.rows).result()['folderStructure']['shop'],
+                         folder(3, RED, 1, None, {'color': 3, 'size': 1, 'page': 1},
+                                {'color': RED, 'size': RED, 'page': PAGE}))
+        shop = URLStructureAggregator(depth=2).add_many(self.rows).result()['folderStructure']['shop']
+        self.assertEqual(shop['subfolders']['shoes'], folder(2, RED, 1))
+        deep = URLStructureAggregator(depth=5).add_many([('https://example.com/a/b', None)]).result()
+        self.assertEqual(list(deep['folderStructure']['a']['subfolders']['b']['subfolders']['root']['subfolders']),
+                         ['root'])
+
+    def test_merge_in_input_order(self):
+        for split in range(len(self.rows) + 1):
+            with self.subTest(split=split):
+                first = URLStructureAggregator().add_many(self.rows[:split])
+                second = URLStructureAggregator(first_seq=split).add_many(self.rows[split:])
+                self.assertEqual(json.dumps(first.merge(second).result()), json.dumps(self.expected))
+
+    def test_merge_keeps_the_first_sample(self):
+        # Folders first reached by a blank URL take their sample from the next chunk
+        first = URLStructureAggregator().add_many([('', None), ('/shop?page=1', None)])
+        second = URLStructureAggregator(first_seq=2).add_many([('/?page=2', None), ('/shop?page=3', None)])
+        result = first.merge(second).result()
+        self.assertEqual(result['folderStructure']['']['sampleUrl'], '/?page=2')
+        self.assertEqual(result['folderStructure']['shop']['paramSamples'], {'page': '/shop?page=1'})
+        self.assertEqual(result['folderStructure']['shop']['params'], {'page': 2})
+        self.assertEqual(result['globalParams']['page'], {
+            'count': 3, 'folders': {'shop': {'count': 2, 'sampleUrl': '/shop?page=1'},
+                                    '': {'count': 1, 'sampleUrl': '/?page=2'}},
+        })
+
+
+class SEOExtractorTests(TestCase):
+    page = """<!DOCTYPE html>
+<html><head>
+  <title> Red Shoes | Shop </title>
+  <meta name="Description" content=" Shoes, in red. ">
+  <meta name="robots" content="noindex, follow" />
+  <link rel="canonical" href="/shoes/red">
+  <link rel="alternate" hreflang="de" href="https://example.de/schuhe/rot">
+  <link rel="alternate" hreflang="x-default" href="/shoes/red">
+  <script>document.write("<h1>Not a heading</h1>")</script>
+  <style>h1 { color: red }</style>
+</head><body>
+  <h1> Red <span>Shoes</span> </h1>
+  <h2>Sizes</h2>
+  <a href="/shoes/blue">Blue</a> <a href="https://other.example/">Elsewhere</a>
+  <a href="#top">Top</a> <a href="mailto:shop@example.com">Mail</a>
+  <h1>Reviews</h1>
+</body></html>"""
+
+    def test_fields(self):
+        result = extract_seo_fields(self.page, 'https://example.com/shoes/red?ref=1')
+        self.assertEqual(result['meta_title'], 'Red Shoes | Shop')
+        self.assertEqual(result['meta_description'], 'Shoes, in red.')
+        self.assertEqual(result['meta_robots'], 'noindex, follow')
+        self.assertEqual(result['canonical'], 'https://example.com/shoes/red')
+        self.assertEqual(result['hreflang'], [
+            {'hreflang': 'de', 'href': 'https://example.de/schuhe/rot'},
+            {'hreflang': 'x-default', 'href': 'https://example.com/shoes/red'},
+        ])
+        # Text is stripped piece by piece and joined, as get_text(strip=True) did; script text is skipped
+        self.assertEqual(result['h1_tags'], ['RedShoes', 'Reviews'])
+        self.assertEqual(result['headings']['h2'], ['Sizes'])
+        self.assertEqual(result['links'], {'internal': 1, 'external': 1})
+
+    def test_open_graph_fallbacks(self):
+        result = extract_seo_fields('<title>  </title><meta property="og:title" content=" OG title ">'
+                                    '<meta property="og:description" content="OG description">')
+        self.assertEqual((result['meta_title'], result['meta_description']), ('OG title', 'OG description'))
+        self.assertEqual(extract_seo_fields('<p>No head</p>')['meta_title'], None)
+
+    def test_first_occurrence_wins(self):
+        result = extract_seo_fields('<title>One</title><title>Two</title>'
+                                    '<meta name="description" content="First">'
+                                    '<meta name="description" content="Second">'
+                                    '<link rel="canonical" href="/a"><link rel="canonical" href="/b">')
+        self.assertEqual((result['meta_title'], result['meta_description'], result['canonical']),
+                         ('One', 'First', '/a'))
+
+    def test_malformed_markup(self):
+        self.assertEqual(extract_seo_fields('<html><head><title>Unclosed title')['meta_title'], 'Unclosed title')
+        result = extract_seo_fields('<body><h1>Outer <h2>inner</h2></div><p>stray<h1 class="x">Last')
+        # An unclosed h1 holds everything after it, the nested one included, as with BeautifulSoup
+        self.assertEqual(result['h1_tags'], ['OuterinnerstrayLast', 'Last'])
+        self.assertEqual(result['headings']['h2'], ['inner'])
+        self.assertIsNone(extract_seo_fields('<meta name="description">')['meta_description'])
+
+    def test_fed_in_chunks(self):
+        extractor = SEOExtractor('https://example.com/')
+        for start in range(0, len(self.page), 7):
+            extractor.feed(self.page[start:start + 7])
+        extractor.close()
+        self.assertEqual(extractor.result(), extract_seo_fields(self.page, 'https://example.com/'))
+        self.assertTrue(extractor.head_complete)
+
+
+class CSVIngestTests(TestCase):
+    text = 'https://example.com/caf\u00e9,true\nhttps://example.com/se\u00f1or,FALSE\n\nhttps://example.com/a,\n'
+    rows = [('https://example.com/caf\u00e9', True), ('https://example.com/se\u00f1or', False),
+            ('https://example.com/a', None)]
+
+    def rows_of(self, content):
+        return list(iter_url_rows(SimpleUploadedFile('crawl.csv', content)))
+
+    def test_encodings(self):
+        for encoding, content in [
+            ('utf-8', self.text.encode('utf-8')),
+            ('utf-8-sig', self.text.encode('utf-8-sig')),
+            ('utf-16', self.text.encode('utf-16')),
+            ('cp1252', self.text.encode('cp1252')),
+        ]:
+            with self.subTest(encoding=encoding):
+                self.assertEqual(detect_encoding(content), encoding)
+                self.assertEqual(self.rows_of(content), self.rows)
+
+    def test_multibyte_character_cut_off_by_the_sample(self):
+        content = b'https://example.com/' + b'a' * (64 * 1024 - 21) + '\u00e9'.encode('utf-8')
+        self.assertEqual(detect_encoding(content[:64 * 1024]), 'utf-8')
+
+    def test_without_an_indexability_column(self):
+        self.assertEqual(self.rows_of(b'https://example.com/a\nhttps://example.com/b\n'),
+                         [('https://example.com/a', None), ('https://example.com/b', None)])
+
+    def test_the_upload_stays_readable(self):
+        upload = SimpleUploadedFile('crawl.csv', self.text.encode('utf-16'))
+        self.assertEqual(list(iter_url_rows(upload)), self.rows)
+        self.assertFalse(upload.closed)
+        # A pass given up early leaves it readable too
+        rows = iter_url_rows(upload)
+        next(rows)
+        rows.close()
+        self.assertFalse(upload.closed)
+        self.assertEqual(list(iter_url_rows(upload)), self.rows)
+
+    def test_process_csv_upload(self):
+        response = APIClient().post('/api/process-csv/', {
+            'file': SimpleUploadedFile('crawl.csv', self.text.encode('cp1252')),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()['folderStructure']), ['caf\u00e9', 'se\u00f1or', 'a'])
+
+
+class PageBodyReaderTests(TestCase):
+    head = b'<html><head><title>Caf\xc3\xa9</title></head><body>'
+
+    def read(self, body, chunk_size=16, content_type='text/html; charset=utf-8', **budget):
+        reader = PageBodyReader('https://example.com/', content_type, **budget)
+        for start in range(0, len(body), chunk_size):
+            if not reader.feed(body[start:start + chunk_size]):
+                break
+        return reader, reader.finish()
+
+    def test_byte_cap(self):
+        body = self.head + b'<h1>Title</h1>' + b'<p>filler</p>' * 50
+        reader, result = self.read(body, max_bytes=100, bytes_after_head=10_000)
+        self.assertEqual((reader.bytes_read, reader.truncated), (100, True))
+        self.assertEqual((result['meta_title'], result['h1_tags']), ('Caf\u00e9', ['Title']))
+
+    def test_body_ending_at_the_byte_cap_is_not_truncated(self):
+        body = self.head + b'<h1>Title</h1></body></html>'
+        for chunk_size in (7, len(body)):
+            with self.subTest(chunk_size=chunk_size):
+                reader, result = self.read(body, chunk_size, max_bytes=len(body), bytes_after_head=10_000)
+                self.assertEqual((reader.bytes_read, reader.truncated), (len(body), False))
+                self.assertEqual(result['h1_tags'], ['Title'])
+
+    def test_early_stop_after_the_head(self):
+        body = self.head + b'<h1>Title</h1>' + b'<p>filler</p>' * 1000 + b'<h1>Too late</h1>'
+        reader, result = self.read(body, max_bytes=1_000_000, bytes_after_head=64)
+        self.assertTrue(reader.truncated)
+        self.assertLess(reader.bytes_read, len(self.head) + 64 + 16)
+        self.assertEqual(result['h1_tags'], ['Title'])
+
+    def test_charset_from_the_meta_tag(self):
+        body = b'<html><head><meta charset="windows-1252"><title>Caf\xe9</title></head></html>'
+        # Sniffed from the first chunk, as large as FETCH_CHUNK_SIZE in practice
+        _, result = self.read(body, len(body), content_type='text/html')
+        self.assertEqual(result['meta_title'], 'Caf\u00e9')
+
+    def test_non_html_bodies_are_not_read(self):
+        reader = PageBodyReader('https://example.com/', 'application/pdf')
+        self.assertFalse(reader.feed(b'%PDF-1.7'))
+        self.assertEqual(reader.bytes_read, 0)
+
+
+@override_settings(FETCH_CACHE_BACKEND='none')
+class BulkURLCheckerTests(TestCase):
+    def checker(self, **limits):
+        # A scheduler that never holds a host back, so only the limits shape the run
+        return BulkURLChecker(scheduler=HostScheduler(rate=1000, burst=1000), **limits)
+
+    def test_per_host_limit(self):
+        with StandInOrigin(delay=0.1) as origin:
+            urls = [f'{origin.url}/page/{n}' for n in range(6)]
+            results = self.checker(concurrency=8, per_host_limit=2).run(urls)
+        self.assertEqual(origin.server.peak_in_flight, 2)
+        self.assertEqual([result['url'] for result in results], urls)
+        self.assertEqual({result['final_status_code'] for result in results}, {200})
+        self.assertEqual(results[0]['meta_title'], 'Stand-in origin')
+
+    def test_overall_concurrency(self):
+        with StandInOrigin(delay=0.1) as origin:
+            done = []
+            self.checker(concurrency=3, per_host_limit=10).run([f'{origin.url}/page/{n}' for n in range(7)],
+                                                               on_result=done.append)
+        self.assertEqual(origin.server.peak_in_flight, 3)
+        self.assertEqual(done, list(range(1, 8)))
+
+    def test_a_failed_check_does_not_fail_the_others(self):
+        unreachable = StandInOrigin()
+        unreachable.server.server_close()
+        with StandInOrigin() as origin:
+            results = self.checker().run([f'{unreachable.url}/', f'{origin.url}/'])
+        self.assertEqual(results[0]['url'], f'{unreachable.url}/')
+        self.assertIn('error', results[0])
+        self.assertEqual(results[1]['final_status_code'], 200)
+
+    @override_settings(CRAWL_HISTORY_ENABLED=False)
+    def test_bulk_check_endpoint(self):
+        with StandInOrigin() as origin:
+            response = APIClient().post('/api/bulk-check-url/', {
+                'urls': [f'{origin.url}/a', f'{origin.url}/redirect/2/b'],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([result['final_url'] for result in data['results']],
+                         [f'{origin.url}/a', f'{origin.url}/b'])
+        self.assertEqual((data['summary']['total'], data['summary']['failed']), (2, 0))
+
+    @override_settings(BULK_CHECK_MAX_URLS=2)
+    def test_too_many_urls(self):
+        response = APIClient().post('/api/bulk-check-url/', {'urls': ['https://example.com/'] * 3}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class HTTPClientTests(TestCase):
+    def setUp(self):
+        http_client.reset_session()
+
+    def tearDown(self):
+        # Its pooled connections point at origins that are gone
+        http_client.reset_session()
+
+    def test_connections_are_reused(self):
+        with StandInOrigin() as origin:
+            for n in range(5):
+                self.assertEqual(http_client.get(f'{origin.url}/page/{n}').status_code, 200)
+        self.assertEqual((origin.server.requests, origin.server.connections), (5, 1))
+
+    @override_settings(FETCH_CACHE_BACKEND='none')
+    def test_redirect_hops_share_a_connection(self):
+        with StandInOrigin() as origin:
+            result = check_url(f'{origin.url}/redirect/3/final')
+        self.assertEqual([step['status_code'] for step in result['redirect_steps']], [301, 301, 301, 200])
+        self.assertEqual((origin.server.requests, origin.server.connections), (4, 1))
+
+    @override_settings(HTTP_READ_TIMEOUT=0.05)
+    def test_default_timeout(self):
+        import requests
+
+        with StandInOrigin(delay=0.5) as origin:
+            with self.assertRaises(requests.Timeout):
+                http_client.get(f'{origin.url}/')
+
+    def test_reset_session(self):
+        session = http_client.get_session()
+        self.assertIs(http_client.get_session(), session)
+        http_client.reset_session()
+        self.assertIsNot(http_client.get_session(), session)
+
+
+class FetchCacheTests(TestCase):
+    def test_lru_eviction(self):
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        self.assertEqual(backend.get('a'), 1)  # Now the most recently used
+        backend.set('c', 3)
+        self.assertEqual((backend.get('a'), backend.get('b'), backend.get('c')), (1, None, 3))
+        self.assertEqual(len(backend), 2)
+        self.assertEqual(backend.stats(), {'hits': 3, 'misses': 1, 'hit_rate': 0.75})
+
+    def test_entries_expire(self):
+        backend = MemoryCacheBackend()
+        backend.set('a', 1, timeout=0.01)
+        backend.set('b', 2)
+        time.sleep(0.02)
+        self.assertEqual((backend.get('a'), backend.get('b'), len(backend)), (None, 2, 1))
+
+    def test_django_backend(self):
+        backend = DjangoCacheBackend(key_prefix='test:')
+        backend.set('a', {'x': 1}, 60)
+        self.assertEqual(backend.get('a'), {'x': 1})
+        backend.delete('a')
+        self.assertIsNone(backend.get('a'))
+
+    def test_fresh_then_stale(self):
+        fresh = fetch_cache.FetchCache(MemoryCacheBackend(), ttl=60, stale_ttl=60)
+        fresh.store('https://example.com/', 'bot', {'final_status_code': 200}, etag='"1"')
+        entry, is_fresh = fresh.get('https://example.com/', 'bot')
+        self.assertEqual((entry['result'], entry['etag'], is_fresh), ({'final_status_code': 200}, '"1"', True))
+        self.assertEqual(fresh.get('https://example.com/', 'other bot'), (None, False))
+
+        stale = fetch_cache.FetchCache(MemoryCacheBackend(), ttl=0, stale_ttl=60)
+        stale.store('https://example.com/', 'bot', {'final_status_code': 200})
+        entry, is_fresh = stale.get('https://example.com/', 'bot')
+        self.assertIsNotNone(entry)
+        self.assertFalse(is_fresh)
+
+    def test_transient_failures_are_not_cached(self):
+        self.assertEqual([fetch_cache.is_cacheable({'final_status_code': code}) for code in (200, 404, 429, 503)],
+                         [True, True, False, False])
+
+
+@override_settings(FETCH_CACHE_BACKEND='memory', FETCH_CACHE_STALE_TTL=60)
+class CheckURLCacheTests(TestCase):
+    def setUp(self):
+        # The process-wide cache is built from the settings on first use
+        fetch_cache._cache = None
+        self.addCleanup(setattr, fetch_cache, '_cache', None)
+
+    @override_settings(FETCH_CACHE_TTL=60)
+    def test_hit_and_bypass(self):
+        with StandInOrigin() as origin:
+            url = f'{origin.url}/page'
+            self.assertEqual(check_url(url)['cache_status'], 'miss')
+            hit = check_url(url)
+            self.assertEqual(origin.server.requests, 1)
+            self.assertEqual(check_url(url, use_cache=False)['cache_status'], 'bypass')
+            self.assertEqual(origin.server.requests, 2)
+        self.assertEqual((hit['cache_status'], hit['meta_title']), ('hit', 'Stand-in origin'))
+
+    @override_settings(FETCH_CACHE_TTL=0)
+    def test_stale_entries_are_revalidated(self):
+        with StandInOrigin() as origin:
+            url = f'{origin.url}/redirect/1/page'
+            first = check_url(url)
+            second = check_url(url)
+        self.assertEqual((first['cache_status'], second['cache_status']), ('miss', 'revalidated'))
+        # The 304 is reported as the status of the page it confirmed
+        self.assertEqual([step['status_code'] for step in second['redirect_steps']], [301, 200])
+        self.assertEqual((second['final_status_code'], second['meta_title']), (200, 'Stand-in origin'))
+        self.assertEqual(fetch_cache.get_fetch_cache().revalidations, 1)
+
+
+class RedirectGraphTests(TestCase):
+    def setUp(self):
+        http_client.reset_session()
+
+    def tearDown(self):
+        http_client.reset_session()
+
+    def test_shared_hops_are_followed_once(self):
+        graph = RedirectGraph(max_chain_length=2)
+        with StandInOrigin() as origin:
+            first = check_url(f'{origin.url}/redirect/2/page', use_cache=False, redirect_graph=graph)
+            second = check_url(f'{origin.url}/redirect/3/page', use_cache=False, redirect_graph=graph)
+            # The second chain only fetches its first hop and the final page
+            self.assertEqual(origin.server.requests, 3 + 2)
+        self.assertEqual(second['final_url'], first['final_url'])
+        self.assertEqual(second['meta_title'], 'Stand-in origin')
+        self.assertEqual([step['timings'] is None for step in second['redirect_steps']],
+                         [False, True, True, False])
+
+        stats = graph.stats()
+        self.assertEqual(stats['memoized_hops_reused'], 2)
+        self.assertEqual(stats['chain_length_histogram'], {'2': 1, '3': 1})
+        self.assertEqual(stats['long_chains'], [{'url': f'{origin.url}/redirect/3/page', 'hops': 3}])
+        self.assertEqual({target['url']: target['count'] for target in stats['top_hop_targets']}, {
+            f'{origin.url}/redirect/2/page': 1,
+            f'{origin.url}/redirect/1/page': 2,
+            f'{origin.url}/page': 2,
+        })
+        self.assertEqual(stats['unique_hops'], 3)
+
+    def test_loop(self):
+        graph = RedirectGraph()
+        graph.record_hop('https://example.com/a', 301, '/b')
+        graph.record_hop('https://example.com/b', 302, 'https://example.com/a')
+        result = check_url('https://example.com/a', use_cache=False, redirect_graph=graph)
+        self.assertEqual(result['redirect_error'], 'loop')
+        self.assertEqual([step['url'] for step in result['redirect_steps']],
+                         ['https://example.com/a', 'https://example.com/b'])
+        self.assertEqual(graph.stats()['loops'], ['https://example.com/a'])
+
+    @override_settings(REDIRECT_MAX_HOPS=3)
+    def test_too_many_redirects(self):
+        with StandInOrigin() as origin:
+            result = check_url(f'{origin.url}/redirect/5/page', use_cache=False)
+        self.assertEqual(result['redirect_error'], 'too_many_redirects')
+        self.assertEqual(len(result['redirect_steps']), 4)
+        self.assertEqual(result['final_status_code'], 301)
+
+
+class RobotsCacheTests(TestCase):
+    def setUp(self):
+        http_client.reset_session()
+
+    def tearDown(self):
+        http_client.reset_session()
+
+    def test_freshness_lifetime(self):
+        def lifetime(**headers):
+            return freshness_lifetime(headers, default_ttl=300, max_ttl=3600)
+
+        self.assertEqual(lifetime(), 300)
+        self.assertEqual(lifetime(**{'Cache-Control': 'public, max-age=60'}), 60)
+        self.assertEqual(lifetime(**{'Cache-Control': 's-maxage=30, max-age=60'}), 30)
+        self.assertEqual(lifetime(**{'Cache-Control': 'max-age=86400'}), 3600)
+        self.assertEqual(lifetime(**{'Cache-Control': 'max-age=soon'}), 0)
+        self.assertEqual(lifetime(**{'Cache-Control': 'no-cache'}), 0)
+        self.assertIsNone(lifetime(**{'Cache-Control': 'no-store, max-age=60'}))
+        self.assertEqual(lifetime(Expires='Thu, 01 Jan 1970 00:00:00 GMT'), 0)
+        self.assertEqual(lifetime(Expires='not a date'), 0)
+
+    def test_fresh_entries_are_served_from_the_cache(self):
+        cache = RobotsFetchCache(MemoryCacheBackend(), default_ttl=60, max_ttl=3600, stale_ttl=60)
+        with StandInOrigin(robots='User-agent: *\nDisallow: /private/\n') as origin:
+            first = cache.fetch(f'{origin.url}/robots.txt')
+            second = cache.fetch(f'{origin.url}/robots.txt')
+            self.assertEqual(origin.server.requests, 1)
+        self.assertEqual((first['cache_status'], second['cache_status']), ('miss', 'hit'))
+        self.assertEqual(second['content'], 'User-agent: *\nDisallow: /private/\n')
+
+    def test_expired_entries_are_revalidated(self):
+        cache = RobotsFetchCache(MemoryCacheBackend(), default_ttl=0, max_ttl=3600, stale_ttl=60)
+        with StandInOrigin(robots='User-agent: *\nDisallow: /private/\n') as origin:
+            cache.fetch(f'{origin.url}/robots.txt')
+            revalidated = cache.fetch(f'{origin.url}/robots.txt')
+            self.assertEqual(origin.server.requests, 2)
+        self.assertEqual(revalidated, {'status_code': 200, 'content': 'User-agent: *\nDisallow: /private/\n',
+                                       'cache_status': 'revalidated'})
+        self.assertEqual(cache.stats()['revalidations'], 1)
+
+    def test_missing_files_are_cached(self):
+        cache = RobotsFetchCache(MemoryCacheBackend(), default_ttl=60, max_ttl=3600, stale_ttl=60)
+        with StandInOrigin(robots=None) as origin:
+            cache.fetch(f'{origin.url}/robots.txt')
+            missing = cache.fetch(f'{origin.url}/robots.txt')
+            self.assertEqual(origin.server.requests, 1)
+        self.assertEqual((missing['status_code'], missing['cache_status']), (404, 'hit'))
+
+    def test_compiled_rules_are_reused(self):
+        cache = CompiledRobotsCache(max_entries=2)
+        first = cache.get('User-agent: *\nDisallow: /a/\n')
+        self.assertIs(cache.get('User-agent: *\nDisallow: /a/\n'), first)
+        cache.get('User-agent: *\nDisallow: /b/\n')
+        cache.get('User-agent: *\nDisallow: /c/\n')
+        # The first file was the least recently used of three
+        self.assertIsNot(cache.get('User-agent: *\nDisallow: /a/\n'), first)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 4, 'hit_rate': 0.2, 'entries': 2})
+
+
+class SitemapCheckTests(TestCase):
+    def setUp(self):
+        http_client.reset_session()
+
+    def tearDown(self):
+        http_client.reset_session()
+
+    def test_statuses_in_first_seen_order(self):
+        unreachable = StandInOrigin()
+        unreachable.server.server_close()
+        with StandInOrigin(robots=None) as origin:
+            results = check_sitemaps([f'{origin.url}/sitemap.xml', f'{unreachable.url}/sitemap.xml',
+                                      f'{origin.url}/robots.txt', f'{origin.url}/sitemap.xml'])
+        self.assertEqual([result['status'] for result in results], [200, 'Error', 404])
+
+    def test_slow_sitemaps_time_out_at_the_deadline(self):
+        with StandInOrigin() as fast, StandInOrigin(delay=2) as slow:
+            started = time.perf_counter()
+            results = check_sitemaps([f'{slow.url}/sitemap.xml', f'{fast.url}/sitemap.xml'], deadline=0.3)
+            elapsed = time.perf_counter() - started
+        self.assertEqual([result['status'] for result in results], ['Timeout', 200])
+        self.assertLess(elapsed, 1)
+
+    def test_slow_sitemap_checks_time_out(self):
+        with StandInOrigin(delay=2) as slow:
+            results = check_sitemaps([f'{slow.url}/sitemap.xml'], timeout=(1, 0.2))
+        self.assertEqual(results, [{'url': f'{slow.url}/sitemap.xml', 'status': 'Timeout'}])
+
+    @override_settings(SITEMAP_CHECK_DEADLINE=0.3)
+    def test_analyzer_returns_the_rules_at_the_deadline(self):
+        with StandInOrigin(delay=2) as slow:
+            content = f'User-agent: *\nDisallow: /private/\nSitemap: {slow.url}/sitemap.xml\n'
+            started = time.perf_counter()
+            response = APIClient().post('/api/robots-analyze/', {'content': content}, format='json')
+            elapsed = time.perf_counter() - started
+        self.assertEqual(response.status_code, 200)
+        parsed_data = response.json()['parsed_data']
+        self.assertEqual(parsed_data['agents'][0]['rules'], [{'path': '/private/', 'allowance': False}])
+        self.assertEqual(parsed_data['sitemaps'], [{'url': f'{slow.url}/sitemap.xml', 'status': 'Timeout'}])
+        self.assertLess(elapsed, 1)
+
+
+class DecisionMatrixTests(TestCase):
+    ROBOTS = [
+        'User-agent: *\nDisallow: /private/\n',
+        'User-agent: *\nDisallow: /private/\nDisallow: /tmp/\n\nUser-agent: Googlebot\nAllow: /\n',
+    ]
+    AGENTS = ['*', 'Googlebot', 'Bingbot']
+    URLS = ['https://example.com/', 'https://example.com/private/a', 'https://example.com/tmp/b',
+            'https://example.com/private/a', 'https://example.com/about']
+
+    def matrix(self):
+        return DecisionMatrix([CompiledRobots(content) for content in self.ROBOTS], self.AGENTS, self.URLS)
+
+    def test_pack_bits(self):
+        self.assertEqual(pack_bits(b''), '')
+        self.assertEqual(pack_bits(bytes([1, 0, 1, 1, 0, 0, 0, 0, 1])), 'sIA=')  # 0xb0 0x80
+
+    def test_columns(self):
+        matrix = self.matrix()
+        self.assertEqual([[list(column) for column in agent_columns] for agent_columns in matrix.columns], [
+            [[1, 0, 1, 0, 1], [1, 0, 1, 0, 1], [1, 0, 1, 0, 1]],
+            [[1, 0, 0, 0, 1], [1, 1, 1, 1, 1], [1, 0, 0, 0, 1]],
+        ])
+        # Agents that fall back to the same group share a column
+        self.assertIs(matrix.columns[1][0], matrix.columns[1][2])
+        self.assertEqual(matrix.differing_indexes(), [1, 2, 3])
+
+    def test_compact_formats_agree_with_verbose(self):
+        matrix = self.matrix()
+        verbose = matrix.verbose()
+        columnar = matrix.compact('columnar')
+        bitset = matrix.compact('bitset')
+        for url_index, url_result in enumerate(verbose):
+            for robots_index, robots_result in enumerate(url_result['robots_results']):
+                for agent in self.AGENTS:
+                    self.assertEqual(robots_result['results'][agent],
+                                     bool(columnar[robots_index]['results'][agent][url_index]))
+        self.assertEqual([result['results'] for result in bitset], [
+            {'*': 'qA==', 'Googlebot': 'qA==', 'Bingbot': 'qA=='},
+            {'*': 'iA==', 'Googlebot': '+A==', 'Bingbot': 'iA=='},
+        ])
+        self.assertEqual(bitset[1]['allowed_counts'], {'*': 2, 'Googlebot': 5, 'Bingbot': 2})
+
+    def test_view_only_differences(self):
+        response = APIClient().post('/api/robots-multi-test-url/', {
+            'robots_contents': self.ROBOTS,
+            'test_urls': self.URLS,
+            'user_agents': self.AGENTS,
+            'output_format': 'columnar',
+            'only_differences': True,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'format': 'columnar',
+            'agents': self.AGENTS,
+            'url_count': 3,
+            'results': [
+                {'robots_index': 0, 'results': {'*': [0, 1, 0], 'Googlebot': [0, 1, 0], 'Bingbot': [0, 1, 0]},
+                 'allowed_counts': {'*': 1, 'Googlebot': 1, 'Bingbot': 1}},
+                {'robots_index': 1, 'results': {'*': [0, 0, 0], 'Googlebot': [1, 1, 1], 'Bingbot': [0, 0, 0]},
+                 'allowed_counts': {'*': 0, 'Googlebot': 3, 'Bingbot': 0}},
+            ],
+            'url_indexes': [1, 2, 3],
+            'summary': {'urls': 5, 'differing_urls': 3},
+        })
+
+
+class RobotsParserTests(TestCase):
+    CONTENT = (
+        '# Comment\n'
+        'User-agent: Googlebot\n'
+        'User-agent: Bingbot\n'
+        'Disallow: /search\n'
+        'Allow: /search/about\n'
+        '\n'
+        'User-agent: *\n'
+        'Disallow: /search  # Inline comment\n'
+        'Disallow: /tmp/\n'
+        'Sitemap: https://example.com/sitemap.xml\n'
+        'Sitemap: https://example.com/sitemap.xml\n'
+    )
+
+    def test_groups_and_stats(self):
+        # The same groups, sitemaps and stats the three-pass analyzer returned for a well-formed file
+        analysis = parse_robots(self.CONTENT)
+        self.assertEqual((analysis['valid'], analysis['errors'], analysis['warnings']), (True, [], []))
+        self.assertEqual(analysis['parsed_data'], {
+            'agents': [
+                {'user_agent': ['Googlebot', 'Bingbot'], 'rule_count': 2, 'rules': [
+                    {'path': '/search', 'allowance': False}, {'path': '/search/about', 'allowance': True}]},
+                {'user_agent': ['*'], 'rule_count': 2, 'rules': [
+                    {'path': '/search', 'allowance': False}, {'path': '/tmp/', 'allowance': False}]},
+            ],
+            'sitemaps': [{'url': 'https://example.com/sitemap.xml', 'status': None}],
+            'host': None,
+            'clean_params': [],
+            'stats': {
+                'total_user_agents': 2,
+                'total_rules': 4,
+                'total_disallow_rules': 3,
+                'unique_disallow_rules': 2,
+                'total_allow_rules': 1,
+                'unique_allow_rules': 1,
+                'size_limit_exceeded': False,
+            },
+        })
+
+    def test_bom_and_line_endings(self):
+        expected = parse_robots(self.CONTENT)
+        self.assertEqual(parse_robots('\ufeff' + self.CONTENT.replace('\n', '\r\n')), expected)
+        self.assertEqual(parse_robots(self.CONTENT.replace('\n', '\r')), expected)
+
+    def test_errors_and_warnings(self):
+        analysis = parse_robots(
+            'Disallow: /early/\n'
+            'User-agent: *\n'
+            'Dissallow: /tmp/\n'
+            'Disallow: private/\n'
+            'Crawl-delay: soon\n'
+            'Noindex: /x/\n'
+            'this is not a directive\n'
+            '\n'
+            'User-agent: EmptyBot\n'
+            'User-agent: Googlebot\n'
+            'Allow: /\n'
+            'Crawl-delay: 2\n'
+            'User-agent: LonelyBot\n'
+            'Sitemap: /sitemap.xml\n'
+            'Host: example.com\n'
+            'Host: www.example.com\n'
+            'Clean-param: ref /articles/\n'
+        )
+        self.assertEqual(analysis['errors'], [
+            'Line 1: Rule before any user-agent line is ignored.',
+            "Line 5: Crawl-delay 'soon' is not a number.",
+            "Line 7: Unrecognized directive 'this is not a directive'",
+            "Line 14: Sitemap '/sitemap.xml' is not an absolute URL.",
+        ])
+        self.assertEqual(analysis['warnings'], [
+            "Line 3: 'dissallow' is read as 'disallow'.",
+            "Line 4: Path 'private/' should start with '/' or '*'.",
+            'Line 6: Noindex in robots.txt is not supported by Google.',
+            'Line 12: Crawl-delay is ignored by Google.',
+            'Line 16: Only the first Host directive is used.',
+            'Line 13: Group for LonelyBot has no rules.',
+        ])
+        parsed_data = analysis['parsed_data']
+        self.assertEqual([group['user_agent'] for group in parsed_data['agents']],
+                         [['*'], ['EmptyBot', 'Googlebot'], ['LonelyBot']])
+        self.assertEqual(parsed_data['agents'][0]['rules'],
+                         [{'path': '/tmp/', 'allowance': False}, {'path': 'private/', 'allowance': False}])
+        self.assertEqual(parsed_data['agents'][1]['crawl_delay'], 2.0)
+        self.assertEqual((parsed_data['sitemaps'], parsed_data['host'], parsed_data['clean_params']),
+                         ([], 'example.com', ['ref /articles/']))
+
+    def test_html_is_not_robots_txt(self):
+        analysis = parse_robots('<!DOCTYPE html>\n<html><body>User-agent: *</body></html>\n')
+        self.assertFalse(analysis['valid'])
+
+    def test_content_past_the_size_limit_is_ignored(self):
+        filler = 'Disallow: /filler/\n'
+        content = 'User-agent: *\n' + filler * (MAX_SIZE // len(filler)) + 'Disallow: /past-the-limit/\n'
+        analysis = parse_robots(content)
+        rules = analysis['parsed_data']['agents'][0]['rules']
+        self.assertTrue(analysis['parsed_data']['stats']['size_limit_exceeded'])
+        self.assertEqual(analysis['warnings'], ['Content is larger than 500 KiB; crawlers ignore the rest.'])
+        self.assertNotIn({'path': '/past-the-limit/', 'allowance': False}, rules)
+        self.assertEqual(analysis['errors'], [])
+
+
+class PolitenessTests(TestCase):
+    BACKOFF = {'min_rate': 0.5, 'backoff_base': 1, 'max_backoff': 60}
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('120'), 120)
+        self.assertEqual(parse_retry_after(formatdate(1030, usegmt=True), now=1000), 30)
+        self.assertEqual(parse_retry_after(formatdate(970, usegmt=True), now=1000), 0)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_token_bucket(self):
+        throttle = HostThrottle(rate=10, burst=2, now=0)
+        throttle.take(0)
+        throttle.take(0)
+        self.assertAlmostEqual(throttle.ready_at(0), 0.1)
+        throttle.refund()  # A cache hit never reached the host
+        self.assertEqual(throttle.ready_at(0), 0)
+
+    def test_backoff_and_recovery(self):
+        throttle = HostThrottle(rate=10, burst=2, now=0)
+        throttle.on_throttled(0, 5, **self.BACKOFF)
+        self.assertEqual((throttle.rate, throttle.ready_at(1)), (5, 5))
+        # Without Retry-After the wait doubles with every failure in a row
+        throttle.on_throttled(5, None, **self.BACKOFF)
+        throttle.on_throttled(5, None, **self.BACKOFF)
+        self.assertEqual((throttle.rate, throttle.blocked_until), (1.25, 5 + 4))
+        throttle.on_throttled(9, 600, **self.BACKOFF)
+        self.assertEqual((throttle.rate, throttle.blocked_until), (0.625, 9 + 60))
+        throttle.on_success()
+        throttle.on_success()
+        self.assertEqual((throttle.failures, throttle.rate), (0, 2.625))
+        for _ in range(10):
+            throttle.on_success()
+        self.assertEqual(throttle.rate, 10)
+
+    def test_crawl_delay_caps_the_rate(self):
+        throttle = HostThrottle(rate=10, burst=10, now=0)
+        throttle.set_crawl_delay(2)
+        throttle.take(0)
+        self.assertEqual(throttle.ready_at(0), 2)
+        throttle.on_success()
+        self.assertEqual(throttle.rate, 0.5)
+
+    @override_settings(POLITENESS_MAX_CRAWL_DELAY=30)
+    def test_scheduler(self):
+        scheduler = HostScheduler(rate=10, burst=1, max_retries=1)
+        throttled = {'final_status_code': 429, 'retry_after': '5'}
+        self.assertTrue(scheduler.record('example.com', throttled, attempt=1))
+        self.assertFalse(scheduler.record('example.com', throttled, attempt=2))
+        self.assertFalse(scheduler.record('example.com', {'final_status_code': 404}, attempt=1))
+        scheduler.set_crawl_delay('example.org', 3600)
+        self.assertEqual(scheduler.stats(), {
+            'throttled_responses': 2,
+            'retries': 1,
+            'hosts_backed_off': 1,  # A Crawl-delay lowers the ceiling, it is not a backoff
+            'crawl_delays': {'example.org': 30},
+        })
+        self.assertGreater(scheduler.throttle('example.com').ready_at(time.monotonic()), time.monotonic() + 4)
+
+    @override_settings(FETCH_CACHE_BACKEND='none', ROBOTS_CACHE_BACKEND='none')
+    def test_bulk_checker_honors_crawl_delay(self):
+        scheduler = HostScheduler(rate=1000, burst=1000, honor_crawl_delay=True)
+        with StandInOrigin(robots='User-agent: *\nCrawl-delay: 0.2\n') as origin:
+            started = time.perf_counter()
+            results = BulkURLChecker(scheduler=scheduler).run([f'{origin.url}/page/{n}' for n in range(4)])
+            elapsed = time.perf_counter() - started
+            self.assertEqual((origin.server.requests, origin.server.peak_in_flight), (5, 1))
+        self.assertEqual({result['final_status_code'] for result in results}, {200})
+        self.assertGreaterEqual(elapsed, 0.6)
+        self.assertEqual(scheduler.stats()['crawl_delays'], {'127.0.0.1': 0.2})
+
+
+class MetricsTests(TestCase):
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_labelled_with_their_route(self):
+        labels = {'method': 'GET', 'route': 'api/jobs/<uuid:job_id>/', 'status': '404'}
+        before = self.sample('http_request_duration_seconds_count', **labels)
+        unmatched_before = self.sample('http_request_duration_seconds_count',
+                                       method='GET', route='unmatched', status='404')
+        client = Client()
+        client.get('/api/jobs/00000000-0000-0000-0000-000000000000/')
+        client.get('/api/jobs/11111111-1111-1111-1111-111111111111/')
+        client.get('/no-such-page')
+        self.assertEqual(self.sample('http_request_duration_seconds_count', **labels), before + 2)
+        self.assertEqual(self.sample('http_request_duration_seconds_count',
+                                     method='GET', route='unmatched', status='404'), unmatched_before + 1)
+        self.assertEqual(self.sample('http_requests_in_progress', method='GET'), 0)
+
+    @override_settings(FETCH_CACHE_BACKEND='none')
+    def test_fetch_phases(self):
+        counts = {phase: self.sample('fetch_phase_duration_seconds_count', phase=phase)
+                  for phase in ('connect', 'ttfb', 'download', 'parse')}
+        http_client.reset_session()
+        self.addCleanup(http_client.reset_session)
+        with StandInOrigin() as origin:
+            result = check_url(f'{origin.url}/redirect/1/page')
+        first, second = (step['timings'] for step in result['redirect_steps'])
+        self.assertEqual((first['reused'], second['reused']), (False, True))
+        self.assertGreater(first['ttfb'], 0)
+        # The second hop reused the connection, so it has no setup phases to record
+        self.assertEqual({phase: self.sample('fetch_phase_duration_seconds_count', phase=phase) - count
+                          for phase, count in counts.items()},
+                         {'connect': 1, 'ttfb': 2, 'download': 2, 'parse': 1})
+        self.assertEqual(self.sample('url_checks_in_progress'), 0)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_endpoint(self):
+        self.assertEqual(Client().get('/metrics').status_code, 401)
+        response = Client().get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE_LATEST)
+        self.assertIn(b'cache_lookups_total{cache="robots_compiled",result="hit"}', response.content)
+        self.assertIn(b'http_request_duration_seconds_bucket', response.content)
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_summarize(self):
+        self.assertEqual(summarize([]), {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'p99': None, 'max': None})
+        summary = summarize([0.4, 0.1, 0.3, 0.2, 0.5])
+        self.assertAlmostEqual(summary.pop('mean'), 0.3)
+        self.assertEqual(summary, {'count': 5, 'p50': 0.3, 'p95': 0.5, 'p99': 0.5, 'max': 0.5})
+
+    def test_compare(self):
+        baseline = {'environment': {'commit': 'abc'}, 'results': [
+            {'scenario': 'parse_robots', 'case': '300_rules',
+             'p50': 2.0, 'p95': 4.0, 'p99': 0, 'peak_memory_bytes': 100},
+        ]}
+        report = compare({'results': [
+            {'scenario': 'parse_robots', 'case': '300_rules',
+             'p50': 1.0, 'p95': 4.0, 'p99': 1.0, 'peak_memory_bytes': 150},
+            {'scenario': 'parse_robots', 'case': '3000_rules', 'p50': 1.0},
+        ]}, baseline)
+        self.assertEqual(report['baseline_commit'], 'abc')
+        self.assertEqual(report['results'][0]['baseline'],
+                         {'p50': 0.5, 'p95': 1.0, 'p99': None, 'peak_memory_bytes': 1.5})
+        self.assertNotIn('baseline', report['results'][1])
+
+    def test_benchmark_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            options = ['--scenarios=parse_robots,check_url', '--repeat=2', '--requests=2', '--rule-counts=10']
+            call_command('benchmark', *options, f'--output={path}', stderr=io.StringIO())
+            call_command('benchmark', *options, f'--output={path}', f'--baseline={path}', stderr=io.StringIO())
+            with open(path, encoding='utf-8') as handle:
+                report = json.load(handle)
+        self.assertEqual([(result['scenario'], result['case']) for result in report['results']], [
+            ('parse_robots', '30_rules'),
+            ('check_url', 'page'),
+            ('check_url', 'redirect_chain'),
+            ('check_url', 'large_page'),
+        ])
+        self.assertEqual([result['count'] for result in report['results']], [2, 2, 2, 2])
+        self.assertTrue(all(result['peak_memory_bytes'] > 0 for result in report['results']))
+        self.assertEqual(set(report['results'][0]['baseline']), {'p50', 'p95', 'p99', 'peak_memory_bytes'})
+
+
+class StartupTests(TestCase):
+    def test_import_times(self):
+        stderr = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       300 |        300 |     requests.compat\n'
+            'import time:      1200 |       1500 |   requests\n'
+            'import time:       500 |        500 | django.utils\n'
+            'import time:        20 |         20 | json\n'
+            'Traceback lines and other noise\n'
+        )
+        times = import_times(stderr, top=2)
+        self.assertAlmostEqual(times['total'], 0.00202)
+        self.assertEqual(list(times['packages']), ['requests', 'django'])
+        self.assertAlmostEqual(times['packages']['requests'], 0.0015)
+
+    def test_fetch_libraries_are_imported_lazily(self):
+        # Each in a fresh interpreter. DRF imports requests with the views, but not aiohttp
+        check = ('import sys\n'
+                 'loaded = [name for name in {names} if name in sys.modules]\n'
+                 'if loaded:\n'
+                 '    raise SystemExit(f"Imported too early: {{loaded}}")\n')
+        run_stage(STAGES['job_worker'] + check.format(names=('requests', 'aiohttp', 'charset_normalizer')))
+        run_stage(STAGES['urlconf'] + check.format(names=('aiohttp',)) + (
+            'from backend_project.warmup import warm_up\n'
+            'warm_up()\n'
+            'if "aiohttp" not in sys.modules:\n'
+            '    raise SystemExit("The warm-up did not import aiohttp")\n'
+        ))
+
+    def test_first_request(self):
+        _, max_rss, _ = run_stage(STAGES['first_request'])
+        self.assertGreater(max_rss, 0)
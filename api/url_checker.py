@@ -0,0 +1,241 @@
+import time
+from urllib.parse import urljoin
+
+from django.conf import settings
+
+from . import http_client, metrics
+from .fetch_cache import (
+    get_fetch_cache, conditional_headers, is_cacheable,
+    CACHE_HIT, CACHE_MISS, CACHE_REVALIDATED, CACHE_BYPASS,
+)
+from .page_reader import PageBodyReader
+
+DEFAULT_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+                      'AppleWebKit/537.36 (KHTML, like Gecko) '
+                      'Chrome/115.0.0.0 Safari/537.36')
+# Redirect bodies larger than this are not drained; the connection is dropped instead.
+MAX_DRAIN_BYTES = 64 * 1024
+
+# I/O commands yielded by ``check_steps``
+FETCH = 'fetch'  # (url, headers): send back (streamed unfollowed response, its timings dict or None)
+DRAIN = 'drain'  # (response, timings): finish reading a redirect body so the connection is reused
+READ = 'read'  # (response, timings, reader): stream the body into the PageBodyReader, then close
+CLOSE = 'close'  # response
+
+
+def drain(response, timings):
+    """Finish reading a small body so its connection can go back to the pool."""
+    start = time.perf_counter()
+    read = 0
+    for chunk in response.iter_content(16 * 1024):
+        read += len(chunk)
+        if read > MAX_DRAIN_BYTES:
+            break
+    response.close()
+    if timings is not None:
+        timings['download'] = time.perf_counter() - start
+
+
+def read_body(response, timings, reader):
+    """Stream a response body into the SEO extractor within the byte budget."""
+    start = time.perf_counter()
+    try:
+        if not reader.done:
+            for chunk in response.iter_content(settings.FETCH_CHUNK_SIZE):
+                if not reader.feed(chunk):
+                    break
+    finally:
+        response.close()
+    if timings is not None:
+        # Time spent in the extractor is parse time, not download time
+        timings['download'] = time.perf_counter() - start - reader.parse_time
+
+
+def cached_hit(cached_entry, redirect_graph=None):
+    if redirect_graph is not None:
+        redirect_graph.record_chain(cached_entry['result']['redirect_steps'],
+                                    cached_entry['result'].get('redirect_error'))
+    return {**cached_entry['result'], 'cache_status': CACHE_HIT}
+
+
+def check_steps(url, user_agent, cached_entry=None, redirect_graph=None):
+    """The redirect-following and extraction of one check, without the I/O.
+
+    A generator shared by ``check_url`` and ``async_checks.check_url_async``:
+    it yields ``(action, argument)`` commands (``FETCH``, ``DRAIN``, ``READ``,
+    ``CLOSE``) and is sent back the response and its timings for ``FETCH``. It returns
+    ``(result, final_response, revalidated)`` for ``finish_check``.
+    """
+    start_time = time.perf_counter()
+
+    # Initialize variables
+    redirect_steps = []
+    current_url = url
+    headers = {'User-Agent': user_agent}
+
+    def fetch(target_url):
+        """Request one hop; returns ``(response, status_code, location, timings)``.
+
+        Hops already followed in this batch come from ``redirect_graph``
+        with no response object.
+        """
+        if redirect_graph is not None:
+            hop = redirect_graph.get_hop(target_url)
+            if hop is not None:
+                return None, hop['status_code'], hop['location'], None
+        request_headers = headers
+        # Revalidate a stale entry when the chain reaches its final page again
+        if cached_entry is not None and target_url == cached_entry['result']['final_url']:
+            request_headers = {**headers, **conditional_headers(cached_entry)}
+        response, timings = yield FETCH, (target_url, request_headers)
+        location = response.headers.get('Location') if response.is_redirect else None
+        if redirect_graph is not None and location:
+            redirect_graph.record_hop(target_url, response.status_code, location)
+        return response, response.status_code, location, timings
+
+    current_response, current_status_code, location, timings = yield from fetch(current_url)
+
+    # Record initial step
+    redirect_steps.append({
+        'url': current_url,
+        'status_code': current_status_code,
+        'timings': timings,  # None for hops memoized in the batch's redirect graph
+    })
+
+    # Follow redirects manually to build the steps
+    redirect_error = None
+    visited = {current_url}
+    while location:
+        # Handle relative URLs
+        next_url = urljoin(current_url, location)
+        if next_url in visited:
+            redirect_error = 'loop'
+            break
+        if len(redirect_steps) > settings.REDIRECT_MAX_HOPS:
+            redirect_error = 'too_many_redirects'
+            break
+
+        # Request next URL
+        if current_response is not None:
+            yield DRAIN, (current_response, timings)
+        current_url = next_url
+        visited.add(current_url)
+        current_response, current_status_code, location, timings = yield from fetch(current_url)
+
+        # Record the step
+        redirect_steps.append({
+            'url': current_url,
+            'status_code': current_status_code,
+            'timings': timings,
+        })
+
+    # Now current_response is the final response
+    final_url = current_url
+    final_status_code = current_status_code
+    if redirect_graph is not None:
+        redirect_graph.record_chain(redirect_steps, redirect_error)
+
+    if cached_entry is not None and final_status_code == 304:
+        # The page is unchanged: reuse the cached extraction
+        if current_response is not None:
+            yield CLOSE, current_response
+        cached_result = cached_entry['result']
+        redirect_steps[-1]['status_code'] = cached_result['final_status_code']
+        result = {
+            **cached_result,
+            'initial_status_code': redirect_steps[0]['status_code'],
+            'response_time': time.perf_counter() - start_time,
+            'parse_time': 0.0,
+            'redirect_steps': redirect_steps,
+        }
+        return result, current_response, True
+
+    # Stream the final response content through the single-pass extractor
+    if current_response is None:
+        # The chain stopped on a memoized hop; there is no body to read.
+        page = PageBodyReader(final_url, None)
+    else:
+        page = PageBodyReader(final_url, current_response.headers.get('Content-Type'))
+        yield READ, (current_response, timings, page)
+    seo_fields = page.finish()
+    response_time = time.perf_counter() - start_time
+
+    # Prepare the result
+    result = {
+        'url': url,
+        'final_url': final_url,
+        'initial_status_code': redirect_steps[0]['status_code'],
+        'final_status_code': final_status_code,
+        'response_time': response_time,
+        'parse_time': page.parse_time,  # Part of response_time spent extracting the SEO fields
+        'content_type': current_response.headers.get('Content-Type') if current_response is not None else None,
+        'redirect_steps': redirect_steps,
+        'is_redirected': len(redirect_steps) > 1,  # More than 1 step means redirected
+        'redirect_error': redirect_error,  # 'loop' or 'too_many_redirects' when the chain was cut short
+        # When the origin throttled us (429/503), for the bulk checker's backoff
+        'retry_after': (current_response.headers.get('Retry-After')
+                        if current_response is not None and final_status_code in (429, 503) else None),
+        **seo_fields,
+        'bytes_read': page.bytes_read,
+        'truncated': page.truncated,  # Extraction stopped before the end of the body
+    }
+    return result, current_response, False
+
+
+def finish_check(cache, url, user_agent, cached_entry, result, final_response, revalidated):
+    """Update the fetch cache with a finished check and return the result with its ``cache_status``."""
+    metrics.observe_check(result)
+    if revalidated:
+        cache.refresh(url, user_agent, cached_entry, result)
+        return {**result, 'cache_status': CACHE_REVALIDATED}
+    if cache is None:
+        return {**result, 'cache_status': CACHE_BYPASS}
+    if is_cacheable(result) and final_response is not None:
+        cache.store(url, user_agent, result,
+                    etag=final_response.headers.get('ETag'),
+                    last_modified=final_response.headers.get('Last-Modified'))
+    return {**result, 'cache_status': CACHE_MISS}
+
+
+def run_steps(steps):
+    """Drive ``check_steps`` with the shared blocking client."""
+    from .fetch_timing import response_timings  # Imports requests, like the client itself
+
+    outcome = None
+    try:
+        while True:
+            action, argument = steps.send(outcome)
+            outcome = None
+            if action == FETCH:
+                target_url, headers = argument
+                response = http_client.get(target_url, headers=headers, allow_redirects=False, stream=True)
+                outcome = response, response_timings(response)
+            elif action == DRAIN:
+                drain(*argument)
+            elif action == READ:
+                read_body(*argument)
+            elif action == CLOSE:
+                argument.close()
+    except StopIteration as stop:
+        return stop.value
+
+
+def check_url(url, user_agent=None, use_cache=True, redirect_graph=None):
+    """Follow the redirect chain of ``url`` and extract its SEO fields.
+
+    Returns the result dict served by ``check_url_status``; network and
+    parsing errors propagate to the caller. Results are served from the fetch
+    cache unless ``use_cache`` is False. Checks that are part of a batch pass
+    the batch's ``RedirectGraph`` to share redirect hops.
+    """
+    user_agent = user_agent or DEFAULT_USER_AGENT
+    cache = get_fetch_cache() if use_cache else None
+    cached_entry = None
+    if cache is not None:
+        cached_entry, is_fresh = cache.get(url, user_agent)
+        if is_fresh:
+            return cached_hit(cached_entry, redirect_graph)
+
+    with metrics.CHECKS_IN_PROGRESS.track_inprogress():
+        outcome = run_steps(check_steps(url, user_agent, cached_entry, redirect_graph))
+    return finish_check(cache, url, user_agent, cached_entry, *outcome)
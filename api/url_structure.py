@@ -0,0 +1,154 @@
+"""Incremental folder-structure aggregation for ``/process-csv/``.
+
+``URLStructureAggregator`` consumes URLs one at a time and produces the
+``folderStructure`` / ``secondLevelFolders`` / ``globalParams`` response of
+``ProcessCSVView``. Folders are counted in a ``FolderNode`` trie of
+configurable depth and the response dicts are rendered from it on demand;
+memory use follows the shape of the site rather than the row count.
+
+Aggregators built over consecutive chunks of the input can be merged in
+input order, which is what ``aggregate_parallel`` does to spread one large
+upload over several processes with exactly the serial output.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from urllib.parse import urlparse, parse_qs
+import logging
+
+from .folder_trie import FolderNode, serialize_folders, serialize_second_level
+
+logger = logging.getLogger(__name__)
+
+
+def folder_levels(path, depth=3):
+    """Split a URL path into ``depth`` folder names, padding missing levels with 'root'."""
+    path_segments = path.strip('/').split('/')
+    return [path_segments[level] if len(path_segments) > level else 'root' for level in range(depth)]
+
+
+class URLStructureAggregator:
+    def __init__(self, depth=3, first_seq=0):
+        self.depth = max(1, depth)
+        self.root = FolderNode('', first_seq)
+        self.global_params = {}
+        self.indexability_data_provided = False
+        # Sequence number of the next URL, used to order derived views by first occurrence.
+        self.seq = first_seq
+
+    def add(self, url, indexable=None):
+        seq = self.seq
+        self.seq += 1
+        if indexable is not None:
+            self.indexability_data_provided = True
+        try:
+            parsed_url = urlparse(url)
+            levels = folder_levels(parsed_url.path, self.depth)
+            non_indexable = 1 if indexable is False else 0
+
+            # Walk (and grow) the trie down to the deepest tracked level
+            node = self.root
+            last_level = self.depth - 1
+            for level, segment in enumerate(levels):
+                node = node.child(segment, url, seq, leaf=level == last_level)
+                node.visit(url, seq, non_indexable)
+                if level == 0:
+                    folder = node
+
+            # Parse query parameters
+            if parsed_url.query:
+                query_params = parse_qs(parsed_url.query)
+                level1 = levels[0]
+                for key, values in query_params.items():
+                    # Global params
+                    global_param = self.global_params.setdefault(key, {'count': 0, 'folders': {}})
+                    global_param['count'] += len(values)
+                    folder_data = global_param['folders'].setdefault(level1, {'count': 0, 'sampleUrl': url})
+                    folder_data['count'] += len(values)
+
+                # Folder-specific params
+                folder.add_params(query_params, url)
+        except Exception as e:
+            logger.debug('Error processing URL %s: %s', url, e)
+
+    def add_many(self, rows):
+        for url, indexable in rows:
+            self.add(url, indexable)
+        return self
+
+    def state(self):
+        """The raw aggregation state, as sent back from worker processes."""
+        return self.depth, self.root, self.global_params, self.indexability_data_provided, self.seq
+
+    @classmethod
+    def from_state(cls, state):
+        aggregator = cls()
+        (aggregator.depth, aggregator.root, aggregator.global_params,
+         aggregator.indexability_data_provided, aggregator.seq) = state
+        return aggregator
+
+    def merge(self, other):
+        """Fold in an aggregator built over the rows that followed this one's.
+
+        Counts add up, while samples and key order stay those of the first
+        occurrence, so merging chunk partials in order reproduces a serial run.
+        """
+        self.root.merge(other.root)
+        for key, param in other.global_params.items():
+            global_param = self.global_params.get(key)
+            if global_param is None:
+                self.global_params[key] = param
+                continue
+            global_param['count'] += param['count']
+            for folder_name, folder_data in param['folders'].items():
+                existing = global_param['folders'].get(folder_name)
+                if existing is None:
+                    global_param['folders'][folder_name] = folder_data
+                else:
+                    existing['count'] += folder_data['count']
+        self.indexability_data_provided = self.indexability_data_provided or other.indexability_data_provided
+        self.seq = max(self.seq, other.seq)
+        return self
+
+    def result(self):
+        # Counts are only reported when the upload had an indexability column.
+        with_indexability = self.indexability_data_provided
+        return {
+            'folderStructure': serialize_folders(self.root.children, self.depth, with_indexability),
+            'secondLevelFolders': serialize_second_level(self.root, with_indexability),
+            'globalParams': self.global_params,
+            'indexabilityDataProvided': self.indexability_data_provided,
+        }
+
+
+def aggregate_chunk(rows, depth, first_seq):
+    return URLStructureAggregator(depth, first_seq).add_many(rows).state()
+
+
+def iter_chunks(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def aggregate_parallel(rows, workers, chunk_size=20000, depth=3):
+    """Aggregate ``rows`` over a pool of ``workers`` processes.
+
+    Chunks are handed out as they are read, with at most two per worker in
+    flight, and the partial results are merged strictly in input order.
+    """
+    aggregator = URLStructureAggregator(depth)
+    in_flight = deque()
+    first_seq = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk in iter_chunks(rows, chunk_size):
+            in_flight.append(executor.submit(aggregate_chunk, chunk, depth, first_seq))
+            first_seq += len(chunk)
+            while len(in_flight) >= workers * 2:
+                aggregator.merge(URLStructureAggregator.from_state(in_flight.popleft().result()))
+        while in_flight:
+            aggregator.merge(URLStructureAggregator.from_state(in_flight.popleft().result()))
+    return aggregator
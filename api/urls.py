@@ -1,17 +1,34 @@
 from django.urls import path
 from .views import check_url_status  # Only import what's needed from views.py
+from .async_views import check_url_status_async, robots_analyze_async, robots_test_url_async
 from .contact_view import ContactMessageView  # Import from contact_views.py
-from .csv_views import ProcessCSVView  # Import from csv_views.py
-from .robots_views import RobotsTxtAnalyzerView, RobotsTxtComparisonView, TestURLAgainstRobotsView, MultiRobotsTestView
+from .csv_views import ProcessCSVView, CompareCSVView  # Import from csv_views.py
+from .bulk_views import BulkURLStatusView
+from .job_views import JobSubmitView, JobDetailView, JobCancelView, JobResultView
+from .history_views import CrawlHistoryView, CrawlChangesView
+from .robots_views import RobotsTxtAnalyzerView, RobotsTxtComparisonView, TestURLAgainstRobotsView, MultiRobotsTestView, RobotsCoverageView
 
 
 urlpatterns = [
     path('check-url/', check_url_status, name='check_url_status'),
+    path('bulk-check-url/', BulkURLStatusView.as_view(), name='bulk_check_url'),
     path('contact/', ContactMessageView.as_view(), name='contact'),
     path('process-csv/', ProcessCSVView.as_view(), name='process-csv'),
+    path('compare-csv/', CompareCSVView.as_view(), name='compare-csv'),
     path('robots-analyze/', RobotsTxtAnalyzerView.as_view(), name='robots_analyze'),
     path('robots-compare/', RobotsTxtComparisonView.as_view(), name='robots_compare'),
     path('robots-test-url/', TestURLAgainstRobotsView.as_view(), name='robots_test_url'),
     path('robots-multi-test-url/', MultiRobotsTestView.as_view(), name='robots_multi_test_url'),
+    path('robots-coverage/', RobotsCoverageView.as_view(), name='robots_coverage'),
+    # Async versions of the fetch-heavy endpoints, for ASGI workers
+    path('async/check-url/', check_url_status_async, name='check_url_status_async'),
+    path('async/robots-analyze/', robots_analyze_async, name='robots_analyze_async'),
+    path('async/robots-test-url/', robots_test_url_async, name='robots_test_url_async'),
+    path('jobs/', JobSubmitView.as_view(), name='job_submit'),
+    path('jobs/<uuid:job_id>/', JobDetailView.as_view(), name='job_detail'),
+    path('jobs/<uuid:job_id>/cancel/', JobCancelView.as_view(), name='job_cancel'),
+    path('jobs/<uuid:job_id>/result/', JobResultView.as_view(), name='job_result'),
+    path('crawl-history/', CrawlHistoryView.as_view(), name='crawl_history'),
+    path('crawl-history/changes/', CrawlChangesView.as_view(), name='crawl_changes'),
 
 ]
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""Project-level middleware."""
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from api import metrics
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that can also sit in an async middleware chain.
+
+    WhiteNoise's middleware is sync only, and one sync middleware makes
+    Django run every view of an ASGI worker through a single thread, async
+    views included. Static file lookups don't block, so under ASGI this
+    looks the file up inline and awaits the rest of the chain.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class MetricsMiddleware:
+    """Record the latency and the in-flight count of every request.
+
+    Requests are labelled with their URL pattern rather than their path, so
+    that ``/api/jobs/<uuid>/`` is one series, not one per job.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with metrics.REQUESTS_IN_PROGRESS.labels(request.method).track_inprogress():
+            start = perf_counter()
+            response = self.get_response(request)
+            self.observe(request, response, perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        with metrics.REQUESTS_IN_PROGRESS.labels(request.method).track_inprogress():
+            start = perf_counter()
+            response = await self.get_response(request)
+            self.observe(request, response, perf_counter() - start)
+        return response
+
+    def observe(self, request, response, duration):
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        metrics.REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(duration)
@@ -19,20 +19,14 @@ env = environ.Env(
     DEBUG=(bool, False)
 )
 
-# Reading .env file if it exists
-environ.Env.read_env()
-
-# Debug statement to check if .env file is read
-
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Read the .env file once, if there is one; otherwise rely on the environment.
+# Nothing is printed: settings are imported by every process, and by
+# management commands whose stdout is their output.
 if os.path.exists(os.path.join(BASE_DIR, '.env')):
     environ.Env.read_env(os.path.join(BASE_DIR, '.env'))
-    print("Loaded .env file")
-else:
-    print("No .env file found, relying on environment variables")
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -65,6 +59,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "backend_project.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -73,7 +68,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "backend_project.middleware.AsyncWhiteNoiseMiddleware",
 ]
 
 ROOT_URLCONF = "backend_project.urls"
@@ -183,6 +178,107 @@ EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
 EMAIL_USE_TLS = env.bool('EMAIL_USE_TLS', default=True)
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 CONTACT_EMAIL = env('CONTACT_EMAIL', default='default_contact_email@example.com')
+EMAIL_TIMEOUT = env.float('EMAIL_TIMEOUT', default=30)  # Per SMTP socket operation
+
+# Email outbox, sent by `manage.py send_outbox` (the mailer process), never waiting on jobs
+OUTBOX_BATCH_SIZE = env.int('OUTBOX_BATCH_SIZE', default=50)  # Emails sent over one SMTP connection
+OUTBOX_MAX_ATTEMPTS = env.int('OUTBOX_MAX_ATTEMPTS', default=5)
+OUTBOX_BACKOFF_BASE = env.float('OUTBOX_BACKOFF_BASE', default=30)  # Doubled after each failed attempt
+OUTBOX_MAX_BACKOFF = env.float('OUTBOX_MAX_BACKOFF', default=3600)
+OUTBOX_CLAIM_TIMEOUT = env.int('OUTBOX_CLAIM_TIMEOUT', default=300)  # Retry claimed emails of a crashed sender
+OUTBOX_POLL_INTERVAL = env.float('OUTBOX_POLL_INTERVAL', default=5)
+OUTBOX_SENT_TTL = env.int('OUTBOX_SENT_TTL', default=30 * 24 * 3600)  # Sent emails are purged after this
+
+# Outbound HTTP client
+HTTP_POOL_CONNECTIONS = env.int('HTTP_POOL_CONNECTIONS', default=100)  # Number of per-host pools kept
+HTTP_POOL_MAXSIZE = env.int('HTTP_POOL_MAXSIZE', default=32)  # Keep-alive connections per host
+HTTP_CONNECT_TIMEOUT = env.float('HTTP_CONNECT_TIMEOUT', default=5)
+HTTP_READ_TIMEOUT = env.float('HTTP_READ_TIMEOUT', default=10)
+# Connections open at once from one ASGI worker's async client (all hosts)
+ASYNC_HTTP_MAX_CONNECTIONS = env.int('ASYNC_HTTP_MAX_CONNECTIONS', default=500)
+
+# Page downloads in URL checks
+FETCH_MAX_BYTES = env.int('FETCH_MAX_BYTES', default=5 * 1024 * 1024)  # Hard cap per page
+FETCH_BYTES_AFTER_HEAD = env.int('FETCH_BYTES_AFTER_HEAD', default=256 * 1024)  # Read past </head> to find H1s
+FETCH_CHUNK_SIZE = env.int('FETCH_CHUNK_SIZE', default=64 * 1024)
+
+# Caches. Point CACHE_URL at a shared cache (e.g. dbcache://app_cache) to share
+# cached results between gunicorn workers.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Cached URL check results: 'memory' (per process), 'django' (CACHES) or 'none'
+FETCH_CACHE_BACKEND = env('FETCH_CACHE_BACKEND', default='memory')
+FETCH_CACHE_ALIAS = env('FETCH_CACHE_ALIAS', default='default')
+FETCH_CACHE_TTL = env.int('FETCH_CACHE_TTL', default=300)
+FETCH_CACHE_STALE_TTL = env.int('FETCH_CACHE_STALE_TTL', default=3600)  # Kept for revalidation after expiry
+FETCH_CACHE_MAX_ENTRIES = env.int('FETCH_CACHE_MAX_ENTRIES', default=2000)
+
+# Fetched robots.txt files: 'memory' (per process), 'django' (CACHES) or 'none'.
+# Cache-Control / Expires set the lifetime when present, capped at ROBOTS_CACHE_MAX_TTL.
+ROBOTS_CACHE_BACKEND = env('ROBOTS_CACHE_BACKEND', default='memory')
+ROBOTS_CACHE_ALIAS = env('ROBOTS_CACHE_ALIAS', default='default')
+ROBOTS_CACHE_TTL = env.int('ROBOTS_CACHE_TTL', default=3600)
+ROBOTS_CACHE_MAX_TTL = env.int('ROBOTS_CACHE_MAX_TTL', default=86400)
+ROBOTS_CACHE_STALE_TTL = env.int('ROBOTS_CACHE_STALE_TTL', default=86400)  # Kept for revalidation after expiry
+ROBOTS_CACHE_MAX_ENTRIES = env.int('ROBOTS_CACHE_MAX_ENTRIES', default=500)
+ROBOTS_PARSE_CACHE_MAX_ENTRIES = env.int('ROBOTS_PARSE_CACHE_MAX_ENTRIES', default=256)  # Compiled rule sets
+
+# Sitemap checks in robots.txt analysis
+SITEMAP_CHECK_CONCURRENCY = env.int('SITEMAP_CHECK_CONCURRENCY', default=8)
+SITEMAP_CHECK_TIMEOUT = env.float('SITEMAP_CHECK_TIMEOUT', default=5)  # Read timeout per check
+SITEMAP_CHECK_DEADLINE = env.float('SITEMAP_CHECK_DEADLINE', default=10)  # For all checks of one request
+
+# Redirect following
+REDIRECT_MAX_HOPS = env.int('REDIRECT_MAX_HOPS', default=10)
+REDIRECT_LONG_CHAIN_HOPS = env.int('REDIRECT_LONG_CHAIN_HOPS', default=3)  # Flagged in bulk redirect analysis
+
+# Uploads above this size are spooled to a temporary file instead of memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = env.int('FILE_UPLOAD_MAX_MEMORY_SIZE', default=2621440)
+
+# Folder levels analysed by /process-csv/ (overridable per request with depth)
+CSV_FOLDER_DEPTH = env.int('CSV_FOLDER_DEPTH', default=3)
+
+# Parallel /process-csv/ aggregation (requested with parallel=true)
+CSV_PARALLEL_WORKERS = env.int('CSV_PARALLEL_WORKERS', default=os.cpu_count() or 1)
+CSV_PARALLEL_CHUNK_SIZE = env.int('CSV_PARALLEL_CHUNK_SIZE', default=20000)
+
+# /compare-csv/: URLs listed per kind of change (added, removed, indexability)
+CSV_COMPARE_SAMPLE_SIZE = env.int('CSV_COMPARE_SAMPLE_SIZE', default=100)
+
+# Bulk URL checks
+BULK_CHECK_MAX_URLS = env.int('BULK_CHECK_MAX_URLS', default=5000)
+BULK_CHECK_CONCURRENCY = env.int('BULK_CHECK_CONCURRENCY', default=32)
+BULK_CHECK_PER_HOST_LIMIT = env.int('BULK_CHECK_PER_HOST_LIMIT', default=4)
+
+# Per-host pacing of bulk checks. Each host gets a token bucket of
+# POLITENESS_HOST_RATE requests/s; a 429/503 halves its rate (down to
+# POLITENESS_MIN_HOST_RATE) and blocks it for Retry-After or an exponential backoff.
+POLITENESS_HOST_RATE = env.float('POLITENESS_HOST_RATE', default=10)
+POLITENESS_HOST_BURST = env.int('POLITENESS_HOST_BURST', default=10)
+POLITENESS_MIN_HOST_RATE = env.float('POLITENESS_MIN_HOST_RATE', default=0.5)
+POLITENESS_BACKOFF_BASE = env.float('POLITENESS_BACKOFF_BASE', default=1)
+POLITENESS_MAX_BACKOFF = env.float('POLITENESS_MAX_BACKOFF', default=60)
+POLITENESS_MAX_RETRIES = env.int('POLITENESS_MAX_RETRIES', default=2)  # Per throttled URL
+POLITENESS_MAX_CRAWL_DELAY = env.float('POLITENESS_MAX_CRAWL_DELAY', default=30)  # Longer Crawl-delays are capped
+
+# Crawl history of URL check results (pruned by `manage.py prune_crawl_history`)
+CRAWL_HISTORY_ENABLED = env.bool('CRAWL_HISTORY_ENABLED', default=True)
+CRAWL_HISTORY_BATCH_SIZE = env.int('CRAWL_HISTORY_BATCH_SIZE', default=500)  # Checks stored per write
+CRAWL_HISTORY_COMPACT_AFTER_DAYS = env.int('CRAWL_HISTORY_COMPACT_AFTER_DAYS', default=30)  # Then only changes are kept
+CRAWL_HISTORY_RETENTION_DAYS = env.int('CRAWL_HISTORY_RETENTION_DAYS', default=365)
+
+# Background jobs (run by `manage.py run_jobs`)
+JOB_RESULT_TTL = env.int('JOB_RESULT_TTL', default=7 * 24 * 3600)  # Finished jobs are purged after this
+JOB_POLL_INTERVAL = env.float('JOB_POLL_INTERVAL', default=2)
+JOB_PROGRESS_INTERVAL = env.float('JOB_PROGRESS_INTERVAL', default=1)
+JOB_STALE_AFTER = env.int('JOB_STALE_AFTER', default=300)  # Requeue running jobs without a heartbeat
+JOB_MAX_ATTEMPTS = env.int('JOB_MAX_ATTEMPTS', default=3)
+JOB_INPUT_CHUNK_SIZE = env.int('JOB_INPUT_CHUNK_SIZE', default=1024 * 1024)
+
+# Prometheus metrics at /metrics; when set, scrapes must send "Authorization: Bearer <token>"
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
 
 # Security settings
 SECURE_SSL_REDIRECT = env.bool('SECURE_SSL_REDIRECT', default=True)
@@ -0,0 +1,32 @@
+"""Warm-up run by the gunicorn master before it forks workers (see ``gunicorn.conf.py``).
+
+Whatever the master builds here is shared copy-on-write by every worker,
+instead of each worker building it again while serving its first request:
+the views and the libraries they import, the URL resolver with its compiled
+patterns, and the translation catalogs.
+"""
+from importlib import import_module
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+from django.utils import translation
+
+# Imported on first use rather than with the URLconf
+LAZY_MODULES = (
+    'api.fetch_timing',  # requests and urllib3, for the blocking client
+    'api.async_checks',  # aiohttp, for the async views
+)
+
+
+def warm_up():
+    resolver = get_resolver()
+    # Imports every view, then compiles every URL pattern and builds the lookup tables
+    resolver.url_patterns
+    resolver.reverse_dict
+    for name in LAZY_MODULES:
+        import_module(name)
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('This field is required.')
+    # No worker may inherit a database connection; each opens its own
+    connections.close_all()
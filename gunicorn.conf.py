@@ -0,0 +1,33 @@
+"""Gunicorn settings for the ``web`` and ``asgi`` processes of the Procfile.
+
+The application is loaded and warmed up once in the master
+(``backend_project.warmup``) before workers are forked, so what it builds is
+shared copy-on-write by the workers rather than rebuilt by each of them.
+What holds connections is reset in each worker after the fork. With
+``preload_app``, a HUP restarts the workers on the code already loaded; a
+deploy restarts the whole process.
+"""
+import os
+
+preload_app = True
+
+
+def when_ready(server):
+    from backend_project.warmup import warm_up
+
+    warm_up()
+
+
+def post_fork(server, worker):
+    from api import http_client
+
+    # Pooled sockets must not be shared with the master or other workers
+    http_client.reset_session()
+
+
+def child_exit(server, worker):
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        from prometheus_client import multiprocess
+
+        # Drops the worker's in-progress gauges from what the other workers report
+        multiprocess.mark_process_dead(worker.pid)